@@ -0,0 +1,33 @@
+"""Add message_archive
+
+Revision ID: 0a6e7c5d93b2
+Revises: f2b8d4c61e39
+Create Date: 2026-10-19 17:52:40.118463
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6e7c5d93b2'
+down_revision = 'f2b8d4c61e39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('message_archive',
+    sa.Column('partition_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('range_start', sa.DateTime(), nullable=False),
+    sa.Column('range_end', sa.DateTime(), nullable=False),
+    sa.Column('path', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('partition_name')
+    )
+
+
+def downgrade():
+    op.drop_table('message_archive')
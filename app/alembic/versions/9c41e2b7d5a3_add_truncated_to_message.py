@@ -0,0 +1,25 @@
+"""Add truncated to message
+
+Revision ID: 9c41e2b7d5a3
+Revises: 4d237adc93fd
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '9c41e2b7d5a3'
+down_revision = '4d237adc93fd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('message', sa.Column('truncated', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    op.drop_column('message', 'truncated')
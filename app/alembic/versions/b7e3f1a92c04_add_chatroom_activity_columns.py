@@ -0,0 +1,57 @@
+"""Add last message activity columns to chatroom
+
+Revision ID: b7e3f1a92c04
+Revises: 9c41e2b7d5a3
+Create Date: 2026-10-19 14:03:27.540118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f1a92c04'
+down_revision = '9c41e2b7d5a3'
+branch_labels = None
+depends_on = None
+
+# Keep in sync with app.models.CHATROOM_PREVIEW_CHARS
+PREVIEW_CHARS = 200
+
+
+def upgrade():
+    op.add_column('chatroom', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+    op.add_column('chatroom', sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('chatroom', sa.Column('last_message_preview', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+    # Backfill from the existing history in one pass
+    op.execute(f"""
+        UPDATE chatroom
+        SET message_count = activity.message_count,
+            last_message_at = activity.last_message_at,
+            last_message_preview = activity.last_message_preview
+        FROM (
+            SELECT DISTINCT ON (chatroom_id)
+                chatroom_id,
+                count(*) OVER (PARTITION BY chatroom_id) AS message_count,
+                created_at AS last_message_at,
+                left(content, {PREVIEW_CHARS}) AS last_message_preview
+            FROM message
+            ORDER BY chatroom_id, created_at DESC, id DESC
+        ) AS activity
+        WHERE chatroom.id = activity.chatroom_id
+    """)
+
+    op.create_index(
+        'ix_chatroom_last_message_at',
+        'chatroom',
+        [sa.text('last_message_at DESC NULLS LAST'), sa.text('id DESC')],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_chatroom_last_message_at', table_name='chatroom')
+    op.drop_column('chatroom', 'last_message_preview')
+    op.drop_column('chatroom', 'message_count')
+    op.drop_column('chatroom', 'last_message_at')
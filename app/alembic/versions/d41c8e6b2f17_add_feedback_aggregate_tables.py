@@ -0,0 +1,59 @@
+"""Add feedback aggregate tables
+
+Revision ID: d41c8e6b2f17
+Revises: b7e3f1a92c04
+Create Date: 2026-10-19 15:26:08.912734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41c8e6b2f17'
+down_revision = 'b7e3f1a92c04'
+branch_labels = None
+depends_on = None
+
+# Keep in sync with app.models.FEEDBACK_LATENCY_BUCKETS
+LATENCY_BUCKETS = (0, 1, 2, 5, 10, 20, 30, 60)
+
+
+def upgrade():
+    op.create_table('feedback_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('reaction', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'reaction')
+    )
+    op.create_table('feedback_latency',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('reaction', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('latency_bucket', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'reaction', 'latency_bucket')
+    )
+
+    # Backfill from the feedback already stored on messages
+    op.execute("""
+        INSERT INTO feedback_daily (day, reaction, count)
+        SELECT created_at::date, comment_reaction, count(*)
+        FROM message
+        WHERE comment_reaction IS NOT NULL
+        GROUP BY 1, 2
+    """)
+    buckets = "ARRAY[" + ",".join(str(bound) for bound in LATENCY_BUCKETS) + "]"
+    op.execute(f"""
+        INSERT INTO feedback_latency (day, reaction, latency_bucket, count)
+        SELECT created_at::date, comment_reaction,
+               ({buckets})[greatest(width_bucket(execution_time, {buckets}), 1)], count(*)
+        FROM message
+        WHERE comment_reaction IS NOT NULL AND execution_time IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade():
+    op.drop_table('feedback_latency')
+    op.drop_table('feedback_daily')
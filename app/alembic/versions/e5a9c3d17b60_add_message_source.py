@@ -0,0 +1,32 @@
+"""Add message_source
+
+Revision ID: e5a9c3d17b60
+Revises: d41c8e6b2f17
+Create Date: 2026-10-19 16:48:52.207615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d17b60'
+down_revision = 'd41c8e6b2f17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('message_source',
+    sa.Column('message_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('node_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['message_id'], ['message.id'], ),
+    sa.PrimaryKeyConstraint('message_id', 'rank')
+    )
+
+
+def downgrade():
+    op.drop_table('message_source')
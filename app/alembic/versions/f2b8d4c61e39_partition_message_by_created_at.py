@@ -0,0 +1,114 @@
+"""Partition message by created_at
+
+Revision ID: f2b8d4c61e39
+Revises: e5a9c3d17b60
+Create Date: 2026-10-19 17:35:14.630981
+
+Rebuilds ``message`` as a table range-partitioned by month on
+``created_at`` (see app.core.partitions). Partitioned tables need the
+partition key in every unique constraint, so the primary key becomes
+(id, created_at), ids stay unique through the existing sequence, and the
+foreign keys pointing at message.id (previous_message_id and
+message_source.message_id) are replaced by plain indexes.
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4c61e39'
+down_revision = 'e5a9c3d17b60'
+branch_labels = None
+depends_on = None
+
+# Partitions are created up to this many months past the current one; the
+# partition maintenance keeps extending them (MESSAGE_PARTITION_MONTHS_AHEAD)
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, sender, content, chatroom_id, previous_message_id, execution_time, truncated, "
+    "comment_reaction, comment_content, created_at, updated_at"
+)
+
+
+def _add_months(moment, months):
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _create_message_table(name, partitioned):
+    op.execute(f"""
+        CREATE TABLE {name} (
+            id INTEGER NOT NULL DEFAULT nextval('message_id_seq'),
+            sender VARCHAR NOT NULL,
+            content VARCHAR NOT NULL,
+            chatroom_id INTEGER NOT NULL,
+            previous_message_id INTEGER,
+            execution_time INTEGER,
+            truncated BOOLEAN NOT NULL DEFAULT false,
+            comment_reaction VARCHAR,
+            comment_content VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        ){' PARTITION BY RANGE (created_at)' if partitioned else ''}
+    """)
+
+
+def upgrade():
+    conn = op.get_bind()
+    op.drop_constraint('message_source_message_id_fkey', 'message_source', type_='foreignkey')
+    # Keep the id sequence when the old table is dropped
+    op.execute("ALTER SEQUENCE message_id_seq OWNED BY NONE")
+
+    _create_message_table('message_partitioned', partitioned=True)
+    op.execute("CREATE TABLE message_default PARTITION OF message_partitioned DEFAULT")
+    oldest = conn.execute(sa.text("SELECT min(created_at) FROM message")).scalar()
+    now = datetime.now(timezone.utc)
+    start = _add_months(oldest or now, 0)
+    last = _add_months(now, MONTHS_AHEAD)
+    while start <= last:
+        end = _add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE message_p{start:%Y_%m} PARTITION OF message_partitioned "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        start = end
+
+    op.execute(f"INSERT INTO message_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM message")
+    op.drop_table('message')
+    op.rename_table('message_partitioned', 'message')
+    op.execute("ALTER SEQUENCE message_id_seq OWNED BY message.id")
+
+    op.create_primary_key('message_pkey', 'message', ['id', 'created_at'])
+    op.create_foreign_key('message_chatroom_id_fkey', 'message', 'chatroom', ['chatroom_id'], ['id'])
+    # Indexes on a partitioned table are created on every partition
+    op.create_index('ix_message_chatroom_id_created_at', 'message', ['chatroom_id', 'created_at'])
+    op.create_index('ix_message_previous_message_id', 'message', ['previous_message_id'])
+    op.create_index(
+        'ix_message_commented_created_at',
+        'message',
+        ['created_at'],
+        postgresql_where=sa.text('comment_reaction IS NOT NULL OR comment_content IS NOT NULL'),
+    )
+
+
+def downgrade():
+    op.execute("ALTER SEQUENCE message_id_seq OWNED BY NONE")
+    _create_message_table('message_unpartitioned', partitioned=False)
+    op.execute(f"INSERT INTO message_unpartitioned ({COLUMNS}) SELECT {COLUMNS} FROM message")
+    op.drop_table('message')
+    op.rename_table('message_unpartitioned', 'message')
+    op.execute("ALTER SEQUENCE message_id_seq OWNED BY message.id")
+
+    op.create_primary_key('message_pkey', 'message', ['id'])
+    op.create_foreign_key('message_chatroom_id_fkey', 'message', 'chatroom', ['chatroom_id'], ['id'])
+    op.create_unique_constraint('message_previous_message_id_key', 'message', ['previous_message_id'])
+    op.create_foreign_key(
+        'message_previous_message_id_fkey', 'message', 'message', ['previous_message_id'], ['id']
+    )
+    op.create_foreign_key(
+        'message_source_message_id_fkey', 'message_source', 'message', ['message_id'], ['id']
+    )
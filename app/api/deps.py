@@ -1,9 +1,12 @@
+import secrets
 from collections.abc import Generator
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
 from sqlmodel import Session
 
+from app.core.config import settings
 from app.core.db import engine
 
 def get_db() -> Generator[Session, None, None]:
@@ -11,3 +14,29 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 SessionDep = Annotated[Session, Depends(get_db)]
+
+def require_admin(x_admin_token: Annotated[str | None, Header()] = None) -> None:
+    """Admin-only routes: hidden unless PROFILING_ADMIN_TOKEN is set, then token-checked."""
+    if not settings.PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.PROFILING_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+AdminDep = Depends(require_admin)
+
+class ServerStarting(Exception):
+    """Raised by ``require_ready`` until the models and index are loaded."""
+
+def server_starting_handler(request: Request, exc: ServerStarting) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server is starting, please retry later."},
+        headers={"Retry-After": str(settings.CHAT_RETRY_AFTER_SECONDS)},
+    )
+
+def require_ready(request: Request) -> None:
+    """Routes that need the loaded index: 503 with Retry-After while the server is starting."""
+    if not request.app.state.startup.ready:
+        raise ServerStarting()
+
+ReadyDep = Depends(require_ready)
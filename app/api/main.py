@@ -1,7 +1,10 @@
 from fastapi import APIRouter
 
-from app.api.routes import utils, chatrooms
+from app.api.routes import utils, bulk, chatrooms, feedback, profiling
 
 api_router = APIRouter()
 api_router.include_router(utils.router)
 api_router.include_router(chatrooms.router)
+api_router.include_router(feedback.router)
+api_router.include_router(bulk.router)
+api_router.include_router(profiling.router)
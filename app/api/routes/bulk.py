@@ -0,0 +1,57 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app import crud
+from app.api.deps import ReadyDep, SessionDep
+from app.core.bulk import create_bulk_chatroom, run_bulk
+from app.core.config import settings
+from app.core.sse import dumps
+
+router = APIRouter(prefix="/bulk", tags=["bulk"])
+
+class BulkChatRequest(BaseModel):
+    questions: list[str] = Field(min_length=1)
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    top_k: int = Field(default=5, ge=1, le=50)
+    # Store every answer as a chat turn, in chatroom_id or a new chatroom
+    persist: bool = False
+    chatroom_id: Optional[int] = None
+
+@router.post("/chat", dependencies=[ReadyDep])
+async def bulk_chat(
+    *,
+    session: SessionDep,
+    request_in: BulkChatRequest,
+    request: Request,
+) -> Any:
+    """
+    Answer many questions with the chat pipeline, streaming one NDJSON
+    record per question in completion order.
+    """
+    if len(request_in.questions) > settings.BULK_CHAT_MAX_QUESTIONS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.BULK_CHAT_MAX_QUESTIONS} questions per request")
+    chatroom_id = None
+    if request_in.persist:
+        chatroom_id = request_in.chatroom_id
+        if chatroom_id is None:
+            chatroom_id = await run_in_threadpool(create_bulk_chatroom, f"[bulk] {request_in.questions[0]}")
+        elif not crud.get_chatroom(session=session, id=chatroom_id):
+            return {"error": "Chatroom not found."}
+
+    concurrency = min(request_in.concurrency or settings.BULK_CHAT_MAX_CONCURRENCY, settings.BULK_CHAT_MAX_CONCURRENCY)
+
+    async def records():
+        async for record in run_bulk(
+            request.app.state, request_in.questions, concurrency, request_in.top_k, chatroom_id
+        ):
+            yield dumps(record) + b"\n"
+
+    return StreamingResponse(
+        records(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
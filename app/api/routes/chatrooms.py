@@ -1,28 +1,32 @@
-from typing import Any
-from fastapi import APIRouter, Query
-from pydantic import BaseModel
+from typing import Any, Literal, Optional
 
-from app.api.deps import SessionDep
+from app.api.deps import ReadyDep, SessionDep
 
-from fastapi.responses import StreamingResponse
-import json
 from app import crud
 from app.dto_models.chatroom import MessageCommentUpdateRequest, MessageSenderEnum
 from app.utils import get_pagination_info
-from fastapi import APIRouter, Request
+from app.core.admission import AdmissionRejected
+from app.core.chat import CHAT_DISCONNECTS, start_generation
+from app.core.config import settings
+from app.core.partitions import read_archived_messages
+from app.core.sse import ClientDisconnected, SSEWriter, encode_event, event_stream_response
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from fastapi.responses import StreamingResponse
-import json
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+import asyncio
 import logging
 import time
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
-
 router = APIRouter(prefix="/chatrooms", tags=["chatrooms"])
 
+# List endpoints can return only the first N characters of each message content
+PREVIEW_CHARS_QUERY = Query(None, ge=1, description="Truncate message content to this many characters")
+
 class TestRequest(BaseModel):
     message: str
+    # Optionally restrict retrieval to these node types ("text", "table", "figure")
+    node_types: Optional[list[Literal["text", "table", "figure"]]] = None
 
 @router.get("")
 async def get_chatrooms(
@@ -30,9 +34,10 @@ async def get_chatrooms(
     session: SessionDep,
     limit: int = Query(10, le=100),
     offset: int = Query(0, ge=0),
+    order_by: Literal["created_at", "last_message_at"] = Query("created_at"),
 ) -> Any:
-    """Retrieve chatrooms."""
-    result = crud.get_chatrooms(session=session, limit=limit, offset=offset)
+    """Retrieve chatrooms with their message count and last-message preview."""
+    result = crud.get_chatrooms(session=session, limit=limit, offset=offset, order_by=order_by)
     chatrooms = result["chatrooms"]
     total = result["total"]
 
@@ -46,7 +51,7 @@ async def get_chatrooms(
         }
     }
     
-    return response
+    return ORJSONResponse(response)
 
 @router.post("")
 async def create_chatroom(
@@ -63,9 +68,10 @@ async def get_messages(
     session: SessionDep,
     limit: int = Query(10, le=100),
     offset: int = Query(0, ge=0),
+    preview_chars: Optional[int] = PREVIEW_CHARS_QUERY,
 ) -> Any:
     """Retrieve messages with comment."""
-    result = crud.get_messages_with_comment(session=session, limit=limit, offset=offset)
+    result = crud.get_messages_with_comment(session=session, limit=limit, offset=offset, preview_chars=preview_chars)
     messages = result["messages"]
     total = result["total"]
 
@@ -79,7 +85,7 @@ async def get_messages(
         }
     }
 
-    return response
+    return ORJSONResponse(response)
 
 @router.post("/messages/{message_id}/comments")
 async def upsert_comment(
@@ -89,14 +95,46 @@ async def upsert_comment(
     request_in: MessageCommentUpdateRequest,
 ) -> Any:
     """Update a message comment if the sender is 'ASSISTANT'."""
-    message = crud.get_message(session=session, id=message_id)
+    message = crud.get_message(session=session, id=message_id, created_at=request_in.created_at)
     if not message or message.sender != MessageSenderEnum.ASSISTANT:
         return {"error": "Message not found."}
 
-    crud.update_message_comment(session=session, message_id=message_id, comment_reaction=request_in.comment_reaction, comment_content=request_in.comment_content)
+    crud.update_message_comment(session=session, message_id=message_id, comment_reaction=request_in.comment_reaction, comment_content=request_in.comment_content, created_at=message.created_at)
     return {"message": "Comment success."}
 
-@router.post("/{chatroom_id}/chat")
+@router.get("/messages/{message_id}/sources", dependencies=[ReadyDep])
+async def get_message_sources(
+    *,
+    session: SessionDep,
+    message_id: int,
+    request: Request,
+) -> Any:
+    """Retrieved context an assistant message was generated from, with node text read from the index."""
+    # Deferred so importing the API does not pull in llama_index
+    from app.core.rag import resolve_node
+
+    index = request.app.state.index
+    rows = crud.get_message_sources(session=session, message_id=message_id)
+
+    def resolve_sources():
+        sources = []
+        for rank, node_id, score in rows:
+            node = resolve_node(index, node_id)
+            sources.append({
+                "rank": rank,
+                "node_id": node_id,
+                "score": score,
+                # None when the node is not in the currently loaded index
+                "text": node.text if node is not None else None,
+                "metadata": node.metadata if node is not None else None,
+            })
+        return sources
+
+    # Node lookups read the index from disk
+    sources = await run_in_threadpool(resolve_sources)
+    return ORJSONResponse({"data": sources})
+
+@router.post("/{chatroom_id}/chat", dependencies=[ReadyDep])
 async def chat_in_chatroom(
     *,
     session: SessionDep,
@@ -111,98 +149,110 @@ async def chat_in_chatroom(
     
     start_time = time.time() 
     try: 
-        # Use pre-initialized retriever, synthesizer, and query engine
-        retriever = request.app.state.retriever
-        query_engine = request.app.state.query_engine
+        # Start the upstream generation, or attach to an identical one in flight
+        buffer, _ = await start_generation(request.app.state, request_in.message, request_in.node_types)
 
-        # Retrieve relevant information
-        retrieved_docs = retriever.retrieve(request_in.message)
+        response_parts = []
 
-        # Extract the text from the retrieved documents
-        context = " ".join([doc.text for doc in retrieved_docs])
+        async def collect_tokens():
+            # Keep every token for the persisted answer while the writer frames them
+            async for chunk in buffer.subscribe():
+                response_parts.append(chunk)
+                yield chunk
 
-        # Use the query engine to process the request with context
-        response = query_engine.query(
-            f"""{request_in.message}
-            Context: {context}
-            """
-        )
+        def persist_turn(full_response, execution_time, truncated=False, sources=()):
+            crud.create_turn(
+                session=session,
+                chatroom_id=chatroom_id,
+                question=request_in.message,
+                answer=full_response,
+                execution_time=execution_time,
+                truncated=truncated,
+                sources=sources
+            )
+            if not chatroom.title:
+                title = request_in.message[:100]
+                description = (full_response.replace("\n", " "))[:100]
+                crud.update_chatroom_comment(
+                    session=session,
+                    chatroom_id=chatroom_id,
+                    title=title,
+                    description=description
+                )
 
         async def generate_response():
-            full_response = ""
-            # Collect source nodes to ensure uniqueness
-            seen_node_ids = []
+            # Unique source nodes in rank order: node id -> score
+            sources = {}
             referenced_context_parts = []
+            writer = SSEWriter(request)
 
             try:
-                # Iterate over the generator from response
-                for chunk in response.response_gen:
-                    if chunk:
-                        # Yield the chunk as SSE data
-                        yield f"data: {json.dumps({'type': 'message', 'content': chunk})}\n\n"
-                        # Process the chunk as in your example
-                        full_response += chunk
-
-                # Collect unique source nodes from this chunk
-                for node in response.source_nodes:
+                # Stream the tokens fanned out from the shared generation as coalesced SSE frames
+                async for frame in writer.stream(collect_tokens()):
+                    yield frame
+                full_response = "".join(response_parts)
+
+                # None when every earlier subscriber left the shared generation
+                # before this request attached: it stopped with a partial answer
+                source_nodes = buffer.result
+
+                # Collect unique source nodes
+                for node in source_nodes or ():
                     logging.debug(f"Processing node: {node}")
-                    if node.node.node_id not in seen_node_ids:
+                    if node.node.node_id not in sources:
                         text = node.node.text.replace("\n", " ")
-                        seen_node_ids.append(node.node.node_id)
-                        index = seen_node_ids.index(node.node.node_id) + 1  # 1-based index
-                        referenced_context_parts.append(f"{index}: {text}")
-
+                        sources[node.node.node_id] = node.score
+                        referenced_context_parts.append(f"{len(sources)}: {text}")  # 1-based index
+
+            except (ClientDisconnected, asyncio.CancelledError, GeneratorExit) as e:
+                # The client went away mid-answer: keep what was generated so far
+                logging.info(f"Client disconnected from chatroom {chatroom_id} stream")
+                CHAT_DISCONNECTS.inc()
+                persist_turn("".join(response_parts), time.time() - start_time, truncated=True)
+                if isinstance(e, ClientDisconnected):
+                    return
+                raise
 
             except Exception as e:
                 logging.error(f"Error during response generation: {e}")
-                yield f"data: {json.dumps({'type': 'done', 'content': 'An unexpected error occurred'})}\n\n"
+                yield encode_event({'type': 'done', 'content': 'An unexpected error occurred'})
                 return
 
             execution_time = time.time() - start_time
+            truncated = source_nodes is None
+
+            # Stored before the final frames so a disconnect from here on loses
+            # nothing. Only the answer is stored; sources are kept as node ids
+            # and their text is resolved from the index on demand
+            persist_turn(full_response, execution_time, truncated=truncated, sources=list(sources.items()))
+
+            if truncated:
+                logging.info(f"Shared generation for chatroom {chatroom_id} stopped before completion")
+                yield encode_event({'type': 'done', 'content': 'The answer was interrupted, please retry.'})
+                return
 
-            # Print the full response (for debugging or logging)
-            print(full_response)
             # Combine all unique referenced context parts
             referenced_context = "\n\nreferenced context:\n" + "\n".join(referenced_context_parts)
-            # Print the formatted referenced context
-            print(f"Referenced Context:\n{referenced_context}")
             # Yield the referenced context
-            yield f"data: {json.dumps({'type': 'message', 'content': referenced_context})}\n\n"
-
-            full_response += referenced_context
-            user_message = crud.create_message(
-                session=session,
-                sender=MessageSenderEnum.USER,
-                content=request_in.message,
-                chatroom_id=chatroom_id,
-            )
-            crud.create_message(
-                session=session,
-                sender=MessageSenderEnum.ASSISTANT,
-                content=full_response,
-                chatroom_id=chatroom_id,
-                previous_message_id=user_message.id,
-                execution_time=execution_time
-            )
-            if not chatroom.title:
-                title = request_in.message[:100]
-                description = (full_response.replace("\n", " "))[:100]
-                crud.update_chatroom_comment(
-                    session=session,
-                    chatroom_id=chatroom_id,
-                    title=title,
-                    description=description
-                )
+            yield encode_event({'type': 'message', 'content': referenced_context})
 
             # Signal completion
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+            yield encode_event({'type': 'done'})
 
-        return StreamingResponse(generate_response(), media_type="text/event-stream")
+        return event_stream_response(generate_response())
+
+    except AdmissionRejected as e:
+        logging.warning(f"Chat request rejected by admission control: {e.reason}")
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Server is busy, please retry later."},
+            headers={"Retry-After": str(settings.CHAT_RETRY_AFTER_SECONDS)},
+        )
 
     except Exception as e:
         logging.error(f"Error in process_query: {e}")
         return StreamingResponse(
-            (f"data: {json.dumps({'type': 'error', 'content': 'An unexpected error occurred'})}\n\n" for _ in range(1)),
+            (encode_event({'type': 'error', 'content': 'An unexpected error occurred'}) for _ in range(1)),
             media_type="text/event-stream")
 
 @router.delete("/{chatroom_id}")
@@ -215,6 +265,33 @@ async def delete_chatroom(
     crud.delete_chatroom(session=session, chatroom_id=chatroom_id)
     return {"message": "Chatroom deleted."}
 
+@router.get("/{chatroom_id}/messages/archived")
+async def get_archived_messages_by_chatroom(
+    *,
+    session: SessionDep,
+    chatroom_id: int,
+    limit: int = Query(10, le=100),
+    offset: int = Query(0, ge=0),
+) -> Any:
+    """Retrieve a chatroom's messages from archived (Parquet) partitions, newest first."""
+    result = await run_in_threadpool(
+        read_archived_messages, session=session, chatroom_id=chatroom_id, limit=limit, offset=offset
+    )
+    messages = result["messages"]
+    total = result["total"]
+
+    pagination_info = get_pagination_info(total, limit, offset)
+    response = {
+        "data": messages,
+        "pagination": {
+            "count": len(messages),
+            "total": total,
+            **pagination_info
+        }
+    }
+
+    return ORJSONResponse(response)
+
 @router.get("/{chatroom_id}/messages")
 async def get_messages_by_chatroom(
     *,
@@ -222,9 +299,12 @@ async def get_messages_by_chatroom(
     chatroom_id: int,
     limit: int = Query(10, le=100),
     offset: int = Query(0, ge=0),
+    preview_chars: Optional[int] = PREVIEW_CHARS_QUERY,
 ) -> Any:
     """Retrieve messages for a specified chatroom with pagination."""
-    result = crud.get_messages_by_chatroom_id(session=session, chatroom_id=chatroom_id, limit=limit, offset=offset)
+    result = crud.get_messages_by_chatroom_id(
+        session=session, chatroom_id=chatroom_id, limit=limit, offset=offset, preview_chars=preview_chars
+    )
 
     messages = result["messages"]
     total = result["total"]
@@ -239,4 +319,4 @@ async def get_messages_by_chatroom(
         }
     }
     
-    return response
+    return ORJSONResponse(response)
@@ -0,0 +1,23 @@
+from datetime import date
+from typing import Any, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import ORJSONResponse
+
+from app import crud
+from app.api.deps import SessionDep
+
+router = APIRouter(prefix="/feedback", tags=["feedback"])
+
+@router.get("/analytics")
+async def get_feedback_analytics(
+    *,
+    session: SessionDep,
+    start: Optional[date] = Query(None, description="First day (inclusive) the answers were given"),
+    end: Optional[date] = Query(None, description="Last day (inclusive) the answers were given"),
+) -> Any:
+    """
+    LIKE/DISLIKE counts and like rate per day, and answer-latency histograms
+    per reaction, from aggregates kept up to date as feedback arrives.
+    """
+    return ORJSONResponse(crud.get_feedback_analytics(session=session, start=start, end=end))
@@ -0,0 +1,38 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import AdminDep
+from app.core.config import settings
+
+router = APIRouter(prefix="/admin/profile", tags=["admin"], dependencies=[AdminDep])
+
+@router.post("", response_class=PlainTextResponse)
+async def profile_worker(
+    request: Request,
+    seconds: float = Query(10.0, gt=0),
+) -> str:
+    """Sample every thread of this worker for `seconds` and return collapsed stacks."""
+    if seconds > settings.PROFILING_MAX_SECONDS:
+        raise HTTPException(status_code=422, detail=f"seconds must be at most {settings.PROFILING_MAX_SECONDS}")
+    sampler = request.app.state.profiler
+    profile = sampler.start(f"worker {seconds:g}s")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop(profile)
+    return profile.collapsed()
+
+@router.get("/requests")
+async def list_request_profiles(request: Request) -> list[dict]:
+    """Recent per-request profiles, newest first."""
+    return [profile.summary() for profile in request.app.state.profiles.list()]
+
+@router.get("/requests/{profile_id}", response_class=PlainTextResponse)
+async def get_request_profile(request: Request, profile_id: str) -> str:
+    """Collapsed stacks of one profiled request."""
+    profile = request.app.state.profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.collapsed()
@@ -1,6 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
+from app.core.metrics import REGISTRY
+
 router = APIRouter(prefix="/utils", tags=["utils"])
 
 class TestRequest(BaseModel):
@@ -8,4 +11,27 @@ class TestRequest(BaseModel):
 
 @router.get("/health-check/")
 async def health_check() -> bool:
+    """Legacy liveness check; use /health/ready to know whether chat can be served."""
     return True
+
+@router.get("/health/live")
+async def liveness(request: Request) -> JSONResponse:
+    """The process is up; fails only when model loading failed for good."""
+    startup = request.app.state.startup
+    if startup.failed:
+        return JSONResponse(status_code=503, content={"status": startup.status, "error": startup.error})
+    return JSONResponse(content={"status": "alive"})
+
+@router.get("/health/ready")
+async def readiness(request: Request) -> JSONResponse:
+    """Models are loaded and warmed up, so requests can be routed here."""
+    startup = request.app.state.startup
+    content = {"status": startup.status, "phases": startup.phases}
+    if startup.error:
+        content["error"] = startup.error
+    return JSONResponse(status_code=200 if startup.ready else 503, content=content)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    """Export process metrics in Prometheus text format."""
+    return REGISTRY.render()
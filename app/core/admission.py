@@ -0,0 +1,60 @@
+import asyncio
+
+from app.core.metrics import Counter, Gauge
+
+CHAT_IN_FLIGHT = Gauge("chat_generations_in_flight", "Chat generations currently holding an admission slot.")
+CHAT_QUEUE_DEPTH = Gauge("chat_admission_queue_depth", "Chat requests waiting for an admission slot.")
+CHAT_SHED = Counter("chat_requests_shed_total", "Chat requests rejected by admission control.", ["reason"])
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted and should be retried later."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"Request shed: {reason}")
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Bound the number of concurrent chat generations.
+
+    Up to ``max_in_flight`` generations run at once. Further requests wait in a
+    queue of at most ``max_queue`` entries for up to ``queue_timeout`` seconds;
+    anything beyond that is shed immediately so latency degrades gracefully.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                CHAT_SHED.inc(reason="queue_full")
+                raise AdmissionRejected("queue_full")
+
+            self.waiting += 1
+            CHAT_QUEUE_DEPTH.set(self.waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                CHAT_SHED.inc(reason="queue_timeout")
+                raise AdmissionRejected("queue_timeout")
+            finally:
+                self.waiting -= 1
+                CHAT_QUEUE_DEPTH.set(self.waiting)
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        CHAT_IN_FLIGHT.set(self.in_flight)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        CHAT_IN_FLIGHT.set(self.in_flight)
+        self._semaphore.release()
@@ -0,0 +1,139 @@
+from typing import Any
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+
+from app.core.config import settings
+from app.core.embedding_store import EmbeddingStore, _normalize
+
+# Upper bound on the (queries x corpus) score block held in memory at once
+MAX_SCORE_BLOCK = 1 << 26
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Column indices and values of the ``top_k`` largest scores of each row, unordered."""
+    top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    return top, np.take_along_axis(scores, top, axis=1)
+
+
+def _best_first(indices: np.ndarray, scores: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(-scores, axis=1)
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+class BatchRetriever:
+    """
+    Exact cosine top-k for many queries at once.
+
+    The whole corpus is held as one normalized float32 matrix, and a batch of
+    query embeddings is scored with a single matrix product (split into
+    blocks so at most ``MAX_SCORE_BLOCK`` scores exist at a time). Results
+    match ``VectorIndexRetriever`` over the same embeddings, up to ties.
+    """
+
+    def __init__(self, node_ids: list[str], matrix: np.ndarray, get_node: Any) -> None:
+        self.node_ids = node_ids
+        self.matrix = _normalize(np.asarray(matrix, dtype=np.float32))
+        self._get_node = get_node
+
+    @classmethod
+    def from_index(cls, index: Any) -> "BatchRetriever":
+        """Corpus of an in-memory ``VectorStoreIndex`` (pickle mode)."""
+        embedding_dict = index.vector_store.data.embedding_dict
+        node_ids = list(embedding_dict)
+        matrix = np.asarray([embedding_dict[node_id] for node_id in node_ids], dtype=np.float32)
+        return cls(node_ids, matrix, lambda i: index.docstore.get_node(node_ids[i]))
+
+    @classmethod
+    def from_store(cls, store: EmbeddingStore, rescore_factor: int | None = None) -> "StoreBatchRetriever":
+        """Batch retriever over an on-disk ``EmbeddingStore``, scanned in place."""
+        if rescore_factor is None:
+            rescore_factor = settings.EMBEDDING_STORE_RESCORE_FACTOR
+        return StoreBatchRetriever(store, rescore_factor)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def search(self, queries: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)`` of shape ``(len(queries), top_k)``, best first."""
+        queries = _normalize(np.asarray(queries, dtype=np.float32))
+        top_k = min(top_k, len(self.node_ids))
+        indices = np.empty((len(queries), top_k), dtype=np.int64)
+        scores = np.empty((len(queries), top_k), dtype=np.float32)
+        block_rows = max(1, MAX_SCORE_BLOCK // max(1, len(self.node_ids)))
+        for start in range(0, len(queries), block_rows):
+            top, top_scores = _top_k(queries[start:start + block_rows] @ self.matrix.T, top_k)
+            end = start + len(top)
+            indices[start:end], scores[start:end] = _best_first(top, top_scores)
+        return indices, scores
+
+    def node(self, index: int) -> BaseNode:
+        return self._get_node(int(index))
+
+
+class StoreBatchRetriever:
+    """
+    ``BatchRetriever`` counterpart for an ``EmbeddingStore``.
+
+    Shards are scored one at a time from their memory-mapped (possibly
+    quantized) matrices, and only the running top-k of each query is kept,
+    so memory stays bounded by one shard's score block however large the
+    store is. Results match ``EmbeddingStore.search`` with the same
+    ``rescore_factor``. Indices number the store's rows across shards.
+    """
+
+    def __init__(self, store: EmbeddingStore, rescore_factor: int = 0) -> None:
+        self.store = store
+        self.rescore_factor = rescore_factor
+        self._offsets = np.cumsum([0] + [len(shard.embeddings) for shard in store.shards])
+        self._node_ids: list[str] | None = None
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def node_ids(self) -> list[str]:
+        """Node ids by index, read from the shards' id sidecars on first use."""
+        if self._node_ids is None:
+            self._node_ids = [node_id for shard in self.store.shards for node_id in shard.ids()]
+        return self._node_ids
+
+    @property
+    def nbytes(self) -> int:
+        return self.store.nbytes
+
+    def search(self, queries: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)`` of shape ``(len(queries), top_k)``, best first."""
+        queries = _normalize(np.asarray(queries, dtype=np.float32))
+        top_k = min(top_k, len(self))
+        rescore = self.rescore_factor > 0 and self.store.dtype != "float32"
+        candidate_k = top_k * self.rescore_factor if rescore else top_k
+        indices = np.empty((len(queries), top_k), dtype=np.int64)
+        scores = np.empty((len(queries), top_k), dtype=np.float32)
+        largest_shard = int(np.diff(self._offsets).max(initial=1))
+        block_rows = max(1, MAX_SCORE_BLOCK // largest_shard)
+        for start in range(0, len(queries), block_rows):
+            block = queries[start:start + block_rows]
+            best = np.empty((len(block), 0), dtype=np.int64)
+            best_scores = np.empty((len(block), 0), dtype=np.float32)
+            for shard_index, shard in enumerate(self.store.shards):
+                rows, row_scores = _top_k(shard.scores(block.T).T, min(candidate_k, len(shard.embeddings)))
+                if rescore and shard.exact is not None:
+                    exact = np.asarray(shard.exact[rows.ravel()]).reshape(rows.shape + (-1,))
+                    row_scores = np.einsum("qkd,qd->qk", exact, block)
+                best = np.concatenate([best, rows + self._offsets[shard_index]], axis=1)
+                best_scores = np.concatenate([best_scores, row_scores], axis=1)
+                if best.shape[1] > top_k:
+                    keep, best_scores = _top_k(best_scores, top_k)
+                    best = np.take_along_axis(best, keep, axis=1)
+            end = start + len(block)
+            indices[start:end], scores[start:end] = _best_first(best, best_scores)
+        return indices, scores
+
+    def node(self, index: int) -> BaseNode:
+        shard = int(np.searchsorted(self._offsets, index, side="right")) - 1
+        return self.store.node(shard, int(index) - int(self._offsets[shard]))
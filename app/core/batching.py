@@ -0,0 +1,101 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any
+
+from app.core.embeddings import embed_queries
+from app.core.metrics import Histogram
+
+EMBED_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Queries embedded per forward pass by the micro-batcher.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+EMBED_QUEUE_SECONDS = Histogram(
+    "embedding_queue_seconds",
+    "Time a query waited in the micro-batcher before its forward pass started.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+_STOP = object()
+
+
+class _Pending:
+    __slots__ = ("text", "future", "enqueued_at")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class EmbeddingBatcher:
+    """
+    Coalesce concurrent query embeddings into batched forward passes.
+
+    Callers block on ``get_query_embedding`` (or hold the future returned by
+    ``submit``) while a single worker thread drains the queue: it takes the
+    first waiting query, keeps collecting for at most ``max_wait`` seconds
+    or until ``max_batch_size`` queries are gathered, embeds them in one
+    pass and resolves every future. An idle batcher adds no latency beyond
+    ``max_wait``, and under load batches fill before the wait runs out.
+
+    Exposes ``get_query_embedding`` and ``model_name`` so it can stand in
+    for the embed model in ``CachedQueryEmbedder``.
+    """
+
+    def __init__(self, embed_model: Any, max_batch_size: int = 32, max_wait: float = 0.005) -> None:
+        self.embed_model = embed_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.model_name = getattr(embed_model, "model_name", type(embed_model).__name__)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        pending = _Pending(text)
+        self._queue.put(pending)
+        return pending.future
+
+    def get_query_embedding(self, text: str) -> list[float]:
+        return self.submit(text).result()
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first: _Pending) -> tuple[list[_Pending], bool]:
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+
+            started_at = time.monotonic()
+            EMBED_BATCH_SIZE.observe(len(batch))
+            for pending in batch:
+                EMBED_QUEUE_SECONDS.observe(started_at - pending.enqueued_at)
+            try:
+                embeddings = embed_queries(self.embed_model, [pending.text for pending in batch])
+            except Exception as e:
+                for pending in batch:
+                    pending.future.set_exception(e)
+                continue
+            for pending, embedding in zip(batch, embeddings):
+                pending.future.set_result(embedding)
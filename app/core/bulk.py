@@ -0,0 +1,325 @@
+"""
+Batch question answering on the chat pipeline.
+
+``run_bulk`` answers many questions with the same steps as a chat turn
+(retrieval, a second retrieval for the question plus its context, the
+similarity cutoff, then the streaming synthesizer), but at higher
+throughput:
+
+- questions are embedded and retrieved ``BULK_CHAT_RETRIEVAL_BATCH`` at a
+  time with ``embed_queries`` and one ``BatchRetriever`` search;
+- LLM calls run on a thread pool shared by every bulk request in the
+  process (``BulkLimiter``) against the shared client;
+- results are yielded in completion order.
+
+Answers can optionally be persisted as chat turns. Served as ``POST
+/bulk/chat`` (NDJSON) and as a CLI::
+
+    python -m app.core.bulk questions.txt --output answers.ndjson --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any
+
+from app.core.chat import build_query
+from app.core.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+BULK_QUESTIONS = Counter("bulk_chat_questions_total", "Bulk chat questions answered, by outcome.", ["outcome"])
+BULK_ANSWER_SECONDS = Histogram("bulk_chat_answer_seconds", "LLM time per bulk chat answer.")
+
+_retriever_lock = threading.Lock()
+
+
+class BulkLimiter:
+    """
+    Process-wide limits shared by every bulk run.
+
+    At most ``max_in_flight`` LLM calls run at once, on one shared thread
+    pool, whatever the number of concurrent bulk requests. Persisting
+    answers additionally take one of ``max_persisting`` slots while their
+    Session is open, so bulk runs stay within the database pool and leave
+    its overflow to interactive traffic.
+    """
+
+    def __init__(self, max_in_flight: int, max_persisting: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="bulk-chat")
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.persist_slots = threading.BoundedSemaphore(max_persisting)
+
+    @classmethod
+    def from_settings(cls) -> "BulkLimiter":
+        from app.core.config import settings
+        from app.core.db import engine
+
+        return cls(settings.BULK_CHAT_MAX_CONCURRENCY, min(settings.BULK_CHAT_MAX_CONCURRENCY, engine.pool.size()))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_batch_retriever(state: Any) -> Any:
+    """The ``BatchRetriever`` over the loaded index, built on first use and per index version."""
+    from app.core.batch_retrieval import BatchRetriever
+    from app.core.embedding_store import EmbeddingStore
+
+    with _retriever_lock:
+        cached = getattr(state, "batch_retriever", None)
+        if cached is None or cached[0] != state.index_version:
+            if isinstance(state.index, EmbeddingStore):
+                retriever = BatchRetriever.from_store(state.index)
+            else:
+                retriever = BatchRetriever.from_index(state.index)
+            state.batch_retriever = cached = (state.index_version, retriever)
+        return cached[1]
+
+
+def prepare_batch(state: Any, retriever: Any, questions: list[str], top_k: int) -> list[tuple[str, list]]:
+    """
+    ``(query_str, source_nodes)`` for each question, as ``_generate`` would
+    build them, with both retrieval passes batched.
+    """
+    import numpy as np
+    from llama_index.core.schema import NodeWithScore
+
+    from app.core.embeddings import embed_queries
+    from app.core.rag import initialize_postprocessors
+
+    def retrieve(texts):
+        embeddings = np.asarray(embed_queries(state.embed_model, texts), dtype=np.float32)
+        indices, scores = retriever.search(embeddings, top_k)
+        return [
+            [NodeWithScore(node=retriever.node(i), score=float(score)) for i, score in zip(row, row_scores)]
+            for row, row_scores in zip(indices, scores)
+        ]
+
+    first_pass = retrieve(questions)
+    query_strs = [build_query(question, nodes) for question, nodes in zip(questions, first_pass)]
+    postprocessors = initialize_postprocessors()
+    prepared = []
+    for query_str, nodes in zip(query_strs, retrieve(query_strs)):
+        for postprocessor in postprocessors:
+            nodes = postprocessor.postprocess_nodes(nodes)
+        prepared.append((query_str, nodes))
+    return prepared
+
+
+def _sources(nodes: list) -> list[tuple[str, float | None]]:
+    """Unique ``(node_id, score)`` pairs in rank order."""
+    sources = {}
+    for node in nodes:
+        sources.setdefault(node.node.node_id, node.score)
+    return list(sources.items())
+
+
+def answer_question(
+    state: Any,
+    index: int,
+    question: str,
+    query_str: str,
+    nodes: list,
+    chatroom_id: int | None,
+    started: float,
+) -> dict[str, Any]:
+    """
+    Run the synthesizer for one prepared question; persists the turn when
+    ``chatroom_id`` is set. ``execution_time`` counts from ``started`` (when
+    the question's retrieval began), like a chat turn's.
+    """
+    llm_start = time.perf_counter()
+    response = state.synthesizer.synthesize(query_str, nodes=nodes)
+    response_gen = getattr(response, "response_gen", None)
+    answer = "".join(response_gen) if response_gen is not None else str(response)
+    now = time.perf_counter()
+    BULK_ANSWER_SECONDS.observe(now - llm_start)
+    execution_time = now - started
+
+    sources = _sources(nodes)
+    record = {
+        "index": index,
+        "question": question,
+        "answer": answer,
+        "sources": [{"node_id": node_id, "score": score} for node_id, score in sources],
+        "execution_time": execution_time,
+        "error": None,
+    }
+    if chatroom_id is not None:
+        from sqlmodel import Session
+
+        from app import crud
+        from app.core.db import engine
+
+        with state.bulk_limiter.persist_slots, Session(engine) as session:
+            _, assistant_message = crud.create_turn(
+                session=session,
+                chatroom_id=chatroom_id,
+                question=question,
+                answer=answer,
+                execution_time=execution_time,
+                sources=sources,
+            )
+        record["chatroom_id"] = chatroom_id
+        record["message_id"] = assistant_message.id
+    return record
+
+
+def create_bulk_chatroom(title: str) -> int:
+    from sqlmodel import Session
+
+    from app import crud
+    from app.core.db import engine
+
+    with Session(engine) as session:
+        chatroom = crud.create_chatroom(session=session)
+        crud.update_chatroom_comment(
+            session=session,
+            chatroom_id=chatroom.id,
+            title=title[:100],
+            description="Bulk chat results",
+        )
+        return chatroom.id
+
+
+async def run_bulk(
+    state: Any,
+    questions: list[str],
+    concurrency: int,
+    top_k: int = 5,
+    chatroom_id: int | None = None,
+    batch_size: int | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Yield one record per question, in completion order.
+
+    Retrieval for the next batch overlaps the LLM calls of the previous
+    ones; at most ``concurrency`` LLM calls of this run are in flight, within
+    the process-wide ``state.bulk_limiter``. Failed questions
+    yield a record with ``error`` set instead of stopping the run. With
+    ``chatroom_id`` every answer is persisted to that chatroom.
+    """
+    from app.core.config import settings
+
+    batch_size = batch_size or settings.BULK_CHAT_RETRIEVAL_BATCH
+    loop = asyncio.get_running_loop()
+    retriever = await loop.run_in_executor(None, get_batch_retriever, state)
+    limiter: BulkLimiter = state.bulk_limiter
+    slots = asyncio.Semaphore(concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks: set[asyncio.Task] = set()
+
+    def failed(index: int, question: str, error: BaseException) -> dict[str, Any]:
+        logger.warning(f"Bulk chat question {index} failed: {error}")
+        return {"index": index, "question": question, "answer": None, "sources": [], "error": str(error)}
+
+    async def answer(index: int, question: str, query_str: str, nodes: list, started: float) -> None:
+        try:
+            await limiter.slots.acquire()
+            try:
+                future = limiter.executor.submit(
+                    answer_question, state, index, question, query_str, nodes, chatroom_id, started
+                )
+            except BaseException:
+                limiter.slots.release()
+                raise
+            # Released when the call actually ends, even if this run is cancelled meanwhile
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(limiter.slots.release))
+            record = await asyncio.wrap_future(future)
+        except Exception as e:
+            record = failed(index, question, e)
+        finally:
+            slots.release()
+        await results.put(record)
+
+    async def feed() -> None:
+        for start in range(0, len(questions), batch_size):
+            batch = questions[start:start + batch_size]
+            started = time.perf_counter()
+            try:
+                prepared = await loop.run_in_executor(None, prepare_batch, state, retriever, batch, top_k)
+            except Exception as e:
+                for offset, question in enumerate(batch):
+                    await results.put(failed(start + offset, question, e))
+                continue
+            for offset, (query_str, nodes) in enumerate(prepared):
+                # Retrieval runs ahead only as far as there are free LLM slots
+                await slots.acquire()
+                task = asyncio.create_task(answer(start + offset, batch[offset], query_str, nodes, started))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        for _ in range(len(questions)):
+            record = await results.get()
+            BULK_QUESTIONS.inc(outcome="error" if record["error"] else "ok")
+            yield record
+    finally:
+        # The consumer stopped early (e.g. the client went away): start no new calls
+        feeder.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+
+def read_questions(path: str) -> list[str]:
+    """Questions from a text file (one per line) or JSONL with a ``question`` or ``query`` field."""
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+            return [row.get("question") or row["query"] for row in rows]
+        return [line.strip() for line in f if line.strip()]
+
+
+def main() -> None:
+    from app.core.config import settings
+    from app.core.sse import dumps
+    from app.core.startup import StartupState, load_models
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="Text file with one question per line, or JSONL.")
+    parser.add_argument("--output", default="-", help="NDJSON output path ('-' for stdout).")
+    parser.add_argument("--concurrency", type=int, default=settings.BULK_CHAT_MAX_CONCURRENCY)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_CHAT_RETRIEVAL_BATCH)
+    parser.add_argument("--persist", action="store_true", help="Store answers as chat turns.")
+    parser.add_argument("--chatroom-id", type=int, help="Chatroom to persist to (default: a new one).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    questions = read_questions(args.questions)
+    state = SimpleNamespace(startup=StartupState(), bulk_limiter=BulkLimiter.from_settings())
+    load_models(state)
+    chatroom_id = args.chatroom_id
+    if args.persist and chatroom_id is None:
+        chatroom_id = create_bulk_chatroom(f"[bulk] {questions[0]}" if questions else "[bulk]")
+
+    async def run(out):
+        started = time.perf_counter()
+        errors = 0
+        async for record in run_bulk(
+            state, questions, args.concurrency, args.top_k, chatroom_id if args.persist else None, args.batch_size
+        ):
+            errors += record["error"] is not None
+            out.write(dumps(record).decode() + "\n")
+        elapsed = time.perf_counter() - started
+        logger.info(f"Answered {len(questions)} questions in {elapsed:.1f}s "
+                    f"({len(questions) / elapsed:.2f}/s), {errors} errors")
+
+    if args.output == "-":
+        asyncio.run(run(sys.stdout))
+    else:
+        with open(args.output, "w") as out:
+            asyncio.run(run(out))
+
+
+if __name__ == "__main__":
+    main()
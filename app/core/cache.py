@@ -0,0 +1,378 @@
+import json
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+from sqlalchemy import Engine, text
+
+from app.core.config import settings
+from app.core.metrics import Counter
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by result.", ["cache", "backend", "result"])
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entries evicted to honour cache size limits.", ["cache", "backend"])
+
+# Encodings of the values the shared backends store. They are never
+# pickled, so write access to the cache store cannot run code in a worker.
+_FLOAT32 = b"f32:"
+_JSON = b"jsn:"
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    Float vectors (embeddings) as little-endian float32 after a shape
+    header; anything else as JSON.
+    """
+    if isinstance(value, np.ndarray) or (
+        isinstance(value, list) and value and all(isinstance(item, float) for item in value)
+    ):
+        array = np.asarray(value, dtype="<f4")
+        header = struct.pack(f"<B{array.ndim}I", array.ndim, *array.shape)
+        return _FLOAT32 + header + array.tobytes()
+    return _JSON + json.dumps(value).encode()
+
+
+def decode_value(data: bytes) -> Any:
+    """Inverse of ``encode_value``; float vectors come back as (nested) lists."""
+    data = bytes(data)
+    prefix, body = data[:4], data[4:]
+    if prefix == _FLOAT32:
+        ndim = body[0]
+        shape = struct.unpack_from(f"<{ndim}I", body, 1)
+        return np.frombuffer(body, dtype="<f4", offset=1 + 4 * ndim).reshape(shape).tolist()
+    if prefix == _JSON:
+        return json.loads(body)
+    raise ValueError("Unknown cache value encoding")
+
+
+class CacheBackend(ABC):
+    """
+    Key/value cache shared by the chat path.
+
+    All backends honour the same contract: ``max_entries`` bounds the number
+    of stored entries (least recently used are evicted first), ``default_ttl``
+    applies when ``set`` is called without a TTL (``None`` never expires),
+    and every lookup is recorded in the ``cache_requests_total`` metric.
+
+    The shared backends store values with ``encode_value``, so they hold
+    JSON-serializable values and float vectors. They refresh an entry's
+    recency at most every ``_TOUCH_INTERVAL`` seconds so that most hits are
+    plain reads; eviction order is exact only to that granularity. For them
+    ``max_entries`` is a high-water mark: each instance estimates the size
+    from its own inserts and, once the estimate passes the mark, counts the
+    entries and evicts down to ``1 - _TRIM_HEADROOM`` of it in one batch.
+    Other workers' inserts are picked up by recounting after every
+    ``_TRIM_HEADROOM`` share of ``max_entries`` own inserts, so with N
+    workers the store can briefly exceed the mark by about N such shares.
+    """
+
+    backend_name = ""
+
+    _TOUCH_INTERVAL = 60.0
+    _TRIM_HEADROOM = 0.1
+
+    def __init__(self, name: str, max_entries: int, default_ttl: float | None) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._size_estimate: int | None = None
+        self._inserts_since_count = 0
+
+    def _expires_at(self, ttl: float | None) -> float | None:
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        CACHE_REQUESTS.inc(cache=self.name, backend=self.backend_name, result="hit" if hit else "miss")
+
+    def _record_evictions(self, count: int) -> None:
+        if count > 0:
+            CACHE_EVICTIONS.inc(count, cache=self.name, backend=self.backend_name)
+
+    def _entry_added(self, conn: Any) -> None:
+        """Count a new entry towards the size estimate; trim in a batch once it passes ``max_entries``."""
+        if self._size_estimate is not None:
+            self._size_estimate += 1
+            self._inserts_since_count += 1
+            if (
+                self._size_estimate <= self.max_entries
+                and self._inserts_since_count < self.max_entries * self._TRIM_HEADROOM
+            ):
+                return
+        self._inserts_since_count = 0
+        size = self._count(conn)
+        if size > self.max_entries:
+            size -= self._trim(conn, size - int(self.max_entries * (1 - self._TRIM_HEADROOM)))
+        self._size_estimate = size
+
+    def _count(self, conn: Any) -> int:
+        raise NotImplementedError
+
+    def _trim(self, conn: Any, count: int) -> int:
+        """Evict the ``count`` least recently used entries; returns how many were evicted."""
+        raise NotImplementedError
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: str) -> Any | None:
+        value = self._get(key)
+        self._record(value is not None)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self._set(key, value, self._expires_at(ttl))
+
+    @abstractmethod
+    def _get(self, key: str) -> Any | None: ...
+
+    @abstractmethod
+    def _set(self, key: str, value: Any, expires_at: float | None) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU cache; fastest, but private to one worker."""
+
+    backend_name = "memory"
+
+    def __init__(self, name: str, max_entries: int, default_ttl: float | None = None) -> None:
+        super().__init__(name, max_entries, default_ttl)
+        self._entries: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any, expires_at: float | None) -> None:
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        self._record_evictions(evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache stored in a SQLite file, shared by every worker on one host.
+
+    Point ``path`` at a tmpfs such as ``/dev/shm`` to keep it in memory.
+    """
+
+    backend_name = "sqlite"
+
+    def __init__(self, name: str, path: str, max_entries: int, default_ttl: float | None = None) -> None:
+        super().__init__(name, max_entries, default_ttl)
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entry ("
+                "cache TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL, PRIMARY KEY (cache, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_accessed_at ON cache_entry (cache, accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key: str) -> Any | None:
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM cache_entry WHERE cache = ? AND key = ?", (self.name, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        if expires_at is not None and expires_at <= now:
+            conn.execute("DELETE FROM cache_entry WHERE cache = ? AND key = ?", (self.name, key))
+            return None
+        try:
+            value = decode_value(value)
+        except ValueError:
+            # Written in an older encoding; recomputed and overwritten by the caller
+            return None
+        if now - accessed_at >= self._TOUCH_INTERVAL:
+            conn.execute("UPDATE cache_entry SET accessed_at = ? WHERE cache = ? AND key = ?", (now, self.name, key))
+        return value
+
+    def _set(self, key: str, value: Any, expires_at: float | None) -> None:
+        conn = self._connection()
+        params = (encode_value(value), expires_at, time.time(), self.name, key)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                "UPDATE cache_entry SET value = ?, expires_at = ?, accessed_at = ? WHERE cache = ? AND key = ?",
+                params,
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "INSERT INTO cache_entry (value, expires_at, accessed_at, cache, key) VALUES (?, ?, ?, ?, ?)",
+                    params,
+                )
+                self._entry_added(conn)
+
+    def _count(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT count(*) FROM cache_entry WHERE cache = ?", (self.name,)).fetchone()[0]
+
+    def _trim(self, conn: sqlite3.Connection, count: int) -> int:
+        cursor = conn.execute(
+            "DELETE FROM cache_entry WHERE cache = ? AND key IN ("
+            "SELECT key FROM cache_entry WHERE cache = ? ORDER BY accessed_at LIMIT ?)",
+            (self.name, self.name, count),
+        )
+        self._record_evictions(cursor.rowcount)
+        return cursor.rowcount
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entry WHERE cache = ? AND key = ?", (self.name, key))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache_entry WHERE cache = ?", (self.name,))
+
+
+class PostgresCache(CacheBackend):
+    """
+    Cache stored in the UNLOGGED ``cache_entry`` Postgres table (created by
+    the migrations), shared by every node.
+
+    UNLOGGED tables skip the WAL, so writes are cheap and the contents are
+    simply truncated after a crash, which is acceptable for a cache.
+    """
+
+    backend_name = "postgres"
+
+    def __init__(self, name: str, engine: Engine, max_entries: int, default_ttl: float | None = None) -> None:
+        super().__init__(name, max_entries, default_ttl)
+        self.engine = engine
+
+    def _get(self, key: str) -> Any | None:
+        now = time.time()
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text(
+                    "SELECT value, accessed_at FROM cache_entry WHERE cache = :cache AND key = :key "
+                    "AND (expires_at IS NULL OR expires_at > :now)"
+                ),
+                {"now": now, "cache": self.name, "key": key},
+            ).first()
+            if row is None:
+                return None
+            try:
+                value = decode_value(row.value)
+            except ValueError:
+                # Written in an older encoding; recomputed and overwritten by the caller
+                return None
+            if now - row.accessed_at >= self._TOUCH_INTERVAL:
+                conn.execute(
+                    text("UPDATE cache_entry SET accessed_at = :now WHERE cache = :cache AND key = :key"),
+                    {"now": now, "cache": self.name, "key": key},
+                )
+                conn.commit()
+        return value
+
+    def _set(self, key: str, value: Any, expires_at: float | None) -> None:
+        with self.engine.begin() as conn:
+            inserted = conn.execute(
+                text(
+                    "INSERT INTO cache_entry (cache, key, value, expires_at, accessed_at) "
+                    "VALUES (:cache, :key, :value, :expires_at, :now) "
+                    "ON CONFLICT (cache, key) DO UPDATE SET value = EXCLUDED.value, "
+                    "expires_at = EXCLUDED.expires_at, accessed_at = EXCLUDED.accessed_at "
+                    "RETURNING xmax = 0"
+                ),
+                {
+                    "cache": self.name,
+                    "key": key,
+                    "value": encode_value(value),
+                    "expires_at": expires_at,
+                    "now": time.time(),
+                },
+            ).scalar()
+            if inserted:
+                self._entry_added(conn)
+
+    def _count(self, conn: Any) -> int:
+        return conn.execute(text("SELECT count(*) FROM cache_entry WHERE cache = :cache"), {"cache": self.name}).scalar()
+
+    def _trim(self, conn: Any, count: int) -> int:
+        result = conn.execute(
+            text(
+                "DELETE FROM cache_entry WHERE cache = :cache AND key IN ("
+                "SELECT key FROM cache_entry WHERE cache = :cache ORDER BY accessed_at LIMIT :count)"
+            ),
+            {"cache": self.name, "count": count},
+        )
+        self._record_evictions(result.rowcount)
+        return result.rowcount
+
+    def delete(self, key: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM cache_entry WHERE cache = :cache AND key = :key"), {"cache": self.name, "key": key})
+
+    def clear(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM cache_entry WHERE cache = :cache"), {"cache": self.name})
+
+
+def create_cache(name: str, max_entries: int | None = None, default_ttl: float | None = None) -> CacheBackend:
+    """Create the cache named ``name`` on the backend selected by ``CACHE_BACKEND``."""
+    max_entries = settings.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    default_ttl = settings.CACHE_DEFAULT_TTL_SECONDS if default_ttl is None else default_ttl
+
+    if settings.CACHE_BACKEND == "memory":
+        return LRUCache(name, max_entries=max_entries, default_ttl=default_ttl)
+    if settings.CACHE_BACKEND == "sqlite":
+        path = settings.CACHE_SQLITE_PATH or os.path.join(tempfile.gettempdir(), "chatbot-cache.sqlite3")
+        return SQLiteCache(name, path=path, max_entries=max_entries, default_ttl=default_ttl)
+    if settings.CACHE_BACKEND == "postgres":
+        from app.core.db import engine
+
+        return PostgresCache(name, engine=engine, max_entries=max_entries, default_ttl=default_ttl)
+    raise ValueError(f"Unknown cache backend: {settings.CACHE_BACKEND}")
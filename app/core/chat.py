@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import uuid
+from typing import Any
+
+from app.core.admission import AdmissionController
+from app.core.coalescing import BroadcastBuffer, SingleFlight, normalize_question
+from app.core.config import settings
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+CHAT_DISCONNECTS = Counter("chat_client_disconnects_total", "Chat streams abandoned by the client before completion.")
+CHAT_UPSTREAM_CANCELLED = Counter("chat_upstream_cancelled_total", "Upstream LLM generations cancelled because no client was listening.")
+
+
+def build_query(message: str, retrieved_docs: list) -> str:
+    """The question with the text of its first-pass retrieval, as sent to the query engine."""
+    # Extract the text from the retrieved documents
+    context = " ".join([doc.text for doc in retrieved_docs])
+    return f"""{message}
+            Context: {context}
+            """
+
+
+def _generate(
+    state: Any,
+    message: str,
+    node_types: tuple[str, ...] | None,
+    loop: asyncio.AbstractEventLoop,
+    buffer: BroadcastBuffer,
+) -> list | None:
+    """
+    Run retrieval and the streaming LLM call, publishing tokens to ``buffer``.
+
+    Stops early and returns ``None`` once every subscriber has disconnected.
+    """
+    # Deferred so importing the API does not pull in llama_index
+    from llama_index.core.schema import QueryBundle
+
+    from app.core.rag import initialize_query_engine, initialize_retriever, node_type_filters
+
+    retriever = state.retriever
+    query_engine = state.query_engine
+    if node_types:
+        # Only consider nodes of the requested types (e.g. tables)
+        retriever = initialize_retriever(
+            state.index, filters=node_type_filters(node_types), embed_model=state.embed_model
+        )
+        query_engine = initialize_query_engine(retriever, state.synthesizer)
+
+    # Retrieve relevant information, reusing cached query embeddings
+    retrieved_docs = retriever.retrieve(
+        QueryBundle(query_str=message, embedding=state.query_embedder.embed(message))
+    )
+
+    if buffer.cancelled.is_set():
+        CHAT_UPSTREAM_CANCELLED.inc()
+        return None
+
+    # Use the query engine to process the request with context
+    query_str = build_query(message, retrieved_docs)
+    response = query_engine.query(
+        QueryBundle(query_str=query_str, embedding=state.query_embedder.embed(query_str))
+    )
+
+    for chunk in response.response_gen:
+        if buffer.cancelled.is_set():
+            # Closing the generator closes the upstream HTTP stream
+            response.response_gen.close()
+            CHAT_UPSTREAM_CANCELLED.inc()
+            return None
+        if chunk:
+            loop.call_soon_threadsafe(buffer.publish, chunk)
+
+    return response.source_nodes
+
+
+async def start_generation(
+    state: Any,
+    message: str,
+    node_types: list[str] | None = None,
+) -> tuple[BroadcastBuffer, bool]:
+    """
+    Start (or join) the upstream generation for ``message``.
+
+    ``node_types`` optionally restricts retrieval to nodes of those types.
+
+    Concurrent requests asking the same normalized question against the same
+    index version share one retrieval and one LLM stream. Only requests that
+    start a new generation take an admission slot; this raises
+    ``AdmissionRejected`` when the server is saturated. Returns the buffer to
+    subscribe to and whether this request started the generation.
+    """
+    flights: SingleFlight = state.chat_flights
+    admission: AdmissionController = state.chat_admission
+    node_types = tuple(sorted(set(node_types))) if node_types else None
+    if settings.CHAT_COALESCING_ENABLED:
+        key = (state.index_version, normalize_question(message), node_types)
+    else:
+        key = (uuid.uuid4().hex,)
+
+    async def producer(buffer: BroadcastBuffer) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+            source_nodes = await loop.run_in_executor(None, _generate, state, message, node_types, loop, buffer)
+            buffer.close(result=source_nodes)
+        finally:
+            admission.release()
+
+    if key not in flights:
+        await admission.acquire()
+        # Another request may have started the same generation while we queued
+        buffer, is_leader = flights.join(key, producer)
+        if not is_leader:
+            admission.release()
+    else:
+        buffer, is_leader = flights.join(key, producer)
+
+    if not is_leader:
+        logger.debug(f"Coalesced chat request onto in-flight generation: {key}")
+    return buffer, is_leader
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import re
+import threading
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different spellings share one flight."""
+    return _WHITESPACE_RE.sub(" ", question).strip().casefold()
+
+
+class BroadcastBuffer:
+    """
+    Append-only token buffer fanned out to any number of async subscribers.
+
+    Every subscriber replays the buffer from the first chunk, so requests that
+    join a generation late still receive the complete answer. When the last
+    subscriber leaves before the generation finishes, ``cancelled`` is set so
+    the producer can stop the upstream stream.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[str] = []
+        self._changed = asyncio.Event()
+        self.closed = False
+        self.error: BaseException | None = None
+        self.result: Any = None
+        self.subscribers = 0
+        # Checked by producers running in worker threads
+        self.cancelled = threading.Event()
+
+    def publish(self, chunk: str) -> None:
+        if self.closed:
+            return
+        self._chunks.append(chunk)
+        self._notify()
+
+    def close(self, result: Any = None, error: BaseException | None = None) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.result = result
+        self.error = error
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        self.subscribers += 1
+        try:
+            while True:
+                changed = self._changed
+                while position < len(self._chunks):
+                    yield self._chunks[position]
+                    position += 1
+                if self.closed:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.closed:
+                self.cancelled.set()
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent upstream generations that share the same key.
+
+    The first caller for a key starts the producer in a background task; every
+    caller that arrives while it is still running attaches to the same buffer.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[tuple, BroadcastBuffer] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, key: tuple) -> bool:
+        buffer = self._flights.get(key)
+        return buffer is not None and not buffer.cancelled.is_set()
+
+    def join(
+        self,
+        key: tuple,
+        producer: Callable[[BroadcastBuffer], Awaitable[None]],
+    ) -> tuple[BroadcastBuffer, bool]:
+        """Return the buffer for ``key`` and whether this caller started it."""
+        buffer = self._flights.get(key)
+        # A generation abandoned by all its subscribers cannot be joined
+        if buffer is not None and not buffer.cancelled.is_set():
+            return buffer, False
+
+        buffer = BroadcastBuffer()
+        self._flights[key] = buffer
+        asyncio.create_task(self._run(key, buffer, producer))
+        return buffer, True
+
+    async def _run(
+        self,
+        key: tuple,
+        buffer: BroadcastBuffer,
+        producer: Callable[[BroadcastBuffer], Awaitable[None]],
+    ) -> None:
+        try:
+            await producer(buffer)
+        except BaseException as e:
+            logger.error(f"Error in coalesced generation: {e}")
+            buffer.close(error=e)
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            buffer.close()
+            if self._flights.get(key) is buffer:
+                del self._flights[key]
@@ -82,12 +82,107 @@ class Settings(BaseSettings):
     DEEPSEEK_API_BASE: str = "https://api.novita.ai/v3/openai"
     DEEPSEEK_MODEL_NAME: str = "deepseek/deepseek_v3"
 
+    # Point the pickled LLM at another OpenAI-compatible endpoint, e.g. the
+    # stub server in benchmarks/load/stub_llm.py
+    LLM_API_BASE_OVERRIDE: str | None = None
+
     TOKENIZERS_PARALLELISM: bool = False
 
+    LOG_LEVEL: str = "INFO"
+
+    # Load and warm up models after the server starts accepting connections;
+    # /utils/health/ready reports when they are usable
+    STARTUP_LOAD_IN_BACKGROUND: bool = True
+
     HUGGING_FACE_EMBEDDING_MODEL_NAME: str = "dmis-lab/biobert-v1.1"
 
+    # Embedding inference: "torch", an ONNX Runtime export ("onnx") or its
+    # dynamically int8-quantized variant ("onnx_int8"). Exports are cached
+    # under EMBEDDING_ONNX_DIR (default artifacts/onnx) and refused when
+    # their cosine agreement with torch is below EMBEDDING_MIN_AGREEMENT
+    EMBEDDING_BACKEND: Literal["torch", "onnx", "onnx_int8"] = "torch"
+    EMBEDDING_ONNX_DIR: str | None = None
+    EMBEDDING_ONNX_QUANTIZATION: Literal["arm64", "avx2", "avx512", "avx512_vnni"] = "avx512_vnni"
+    EMBEDDING_MIN_AGREEMENT: float = 0.99
+
+    # Micro-batch concurrent query embeddings; a query waits at most
+    # EMBED_BATCH_MAX_WAIT_MS for others to share its forward pass
+    EMBED_BATCHING_ENABLED: bool = True
+    EMBED_BATCH_MAX_SIZE: int = 32
+    EMBED_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # "index" loads the pickled VectorStoreIndex, "embedding_store" the
+    # sharded on-disk store written by `preprocess.py --streaming`
+    VECTOR_STORE_BACKEND: Literal["index", "embedding_store"] = "index"
+
+    # Embedding store matrix type written by `preprocess.py --streaming`, and
+    # how many candidates per result to re-score in float32 (0 disables)
+    EMBEDDING_STORE_DTYPE: Literal["float32", "float16", "int8"] = "float32"
+    EMBEDDING_STORE_RESCORE_FACTOR: int = 4
+
     PDF_FILE_PATH: str = None
 
+    # JSON list of text cleaning rules; defaults to app.core.text_cleaner.DEFAULT_RULES
+    CLEAN_TEXT_RULES_PATH: str | None = None
+
+    # Figure interpretation during preprocess
+    CAPTION_BATCH_SIZE: int = 8
+    CAPTION_NUM_THREADS: int | None = None
+    # Append PaddleOCR text to figure captions; off by default since it runs
+    # one image at a time and changes the indexed figure text
+    CAPTION_OCR_ENABLED: bool = False
+
+    # Share one upstream generation between concurrent identical questions
+    CHAT_COALESCING_ENABLED: bool = True
+
+    # Admission control for chat generations
+    CHAT_MAX_IN_FLIGHT: int = 16
+    CHAT_MAX_QUEUE: int = 32
+    CHAT_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    CHAT_RETRY_AFTER_SECONDS: int = 5
+
+    # Bulk chat (POST /bulk/chat, python -m app.core.bulk): questions are
+    # embedded and retrieved BULK_CHAT_RETRIEVAL_BATCH at a time, and at most
+    # BULK_CHAT_MAX_CONCURRENCY LLM calls run at once across all bulk
+    # requests of a worker; persisting answers also stay within the DB pool size
+    BULK_CHAT_MAX_QUESTIONS: int = 10_000
+    BULK_CHAT_MAX_CONCURRENCY: int = 16
+    BULK_CHAT_RETRIEVAL_BATCH: int = 256
+
+    # Cache tier shared by the chat path: "memory" (per worker), "sqlite"
+    # (all workers on one host) or "postgres" (all nodes)
+    CACHE_BACKEND: Literal["memory", "sqlite", "postgres"] = "memory"
+    CACHE_SQLITE_PATH: str | None = None
+    CACHE_MAX_ENTRIES: int = 10_000
+    CACHE_DEFAULT_TTL_SECONDS: float | None = 24 * 60 * 60
+
+    # SSE framing: coalesce tokens for up to this long / this many characters
+    SSE_FLUSH_INTERVAL_SECONDS: float = 0.05
+    SSE_COALESCE_MAX_CHARS: int = 512
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+
+    # Monthly partitions of the message table are created this many months
+    # ahead. With MESSAGE_ARCHIVE_AFTER_MONTHS set, partitions older than that
+    # are moved to Parquet files under MESSAGE_ARCHIVE_DIR (default
+    # artifacts/archive). Maintenance is meant to run from cron
+    # (python -m app.core.partitions); with MESSAGE_PARTITION_MAINTENANCE_ENABLED
+    # every API worker also tries it every MESSAGE_PARTITION_MAINTENANCE_SECONDS
+    MESSAGE_PARTITION_MONTHS_AHEAD: int = 3
+    MESSAGE_ARCHIVE_AFTER_MONTHS: int | None = None
+    MESSAGE_ARCHIVE_DIR: str | None = None
+    MESSAGE_PARTITION_MAINTENANCE_ENABLED: bool = False
+    MESSAGE_PARTITION_MAINTENANCE_SECONDS: float = 6 * 60 * 60
+
+    # Admin-only sampling profiler (/admin/profile); disabled unless a token
+    # is set. Requests sent with "X-Profile: 1" and the token in
+    # "X-Admin-Token" are profiled individually, as are a random
+    # PROFILING_REQUEST_SAMPLE_RATE share of all requests
+    PROFILING_ADMIN_TOKEN: str | None = None
+    PROFILING_SAMPLE_INTERVAL_MS: float = 10.0
+    PROFILING_MAX_SECONDS: float = 60.0
+    PROFILING_REQUEST_SAMPLE_RATE: float = 0.0
+    PROFILING_MAX_STORED: int = 50
+
     @model_validator(mode="after")
     def _set_default_emails_from(self) -> Self:
         if not self.EMAILS_FROM_NAME:
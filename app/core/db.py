@@ -1,9 +1,26 @@
+from sqlalchemy import event
 from sqlmodel import Session, create_engine
 
 from app.core.config import settings
+from app.core.metrics import Gauge
 
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
+DB_POOL_CAPACITY = Gauge("db_pool_capacity", "Connections the pool can hand out at once (size + max overflow).")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool.")
+
+DB_POOL_CAPACITY.set(engine.pool.size() + max(0, getattr(engine.pool, "_max_overflow", 0)))
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    DB_POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record) -> None:
+    DB_POOL_CHECKED_OUT.dec()
+
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
 # otherwise, SQLModel might fail to initialize relationships properly
@@ -0,0 +1,338 @@
+import json
+import os
+import threading
+from typing import Any
+
+import numpy as np
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle, TextNode
+from llama_index.core.vector_stores import FilterOperator, MetadataFilters
+
+# Node types written by the preprocess pipeline into node metadata
+NODE_TYPES = ("text", "table", "figure")
+
+MANIFEST_FILE = "manifest.json"
+IDS_FILE = "ids.json"
+
+# Storage types for the scanned embedding matrix
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+# Quantized rows are widened to float32 this many at a time while scanning
+SCAN_BLOCK_ROWS = 16_384
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 quantization with one float32 scale per row."""
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales = np.where(scales > 0, scales, 1).astype(np.float32)
+    quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales
+
+
+class EmbeddingStoreWriter:
+    """
+    Append-only on-disk embedding store written in fixed-size shards.
+
+    Each shard directory holds ``embeddings.npy`` (L2-normalized float32
+    rows), ``nodes.jsonl`` with the node id, text and metadata, ``offsets.npy``
+    with the byte offset of every jsonl line, ``node_types.npy`` with the
+    index of each node's type in ``NODE_TYPES`` and ``ids.json`` with the
+    node ids in row order. Only the current shard is
+    held in memory, so writing any number of nodes uses constant memory.
+
+    With ``dtype`` of ``float16`` or ``int8`` the scanned ``embeddings.npy``
+    is quantized (int8 rows carry a per-row scale in ``scales.npy``), and
+    unless ``keep_float32`` is false the exact rows are also written to
+    ``embeddings_f32.npy`` for re-scoring the top candidates.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_name: str,
+        shard_size: int = 4096,
+        dtype: str = "float32",
+        keep_float32: bool = True,
+    ) -> None:
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.path = path
+        self.model_name = model_name
+        self.shard_size = shard_size
+        self.dtype = dtype
+        self.keep_float32 = keep_float32 and dtype != "float32"
+        self.shard_count = 0
+        self.node_count = 0
+        self.dim = None
+        self._embeddings: list[list[float]] = []
+        self._nodes: list[TextNode] = []
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, nodes: list[TextNode], embeddings: list[list[float]]) -> None:
+        for node, embedding in zip(nodes, embeddings):
+            self._nodes.append(node)
+            self._embeddings.append(embedding)
+            if len(self._nodes) >= self.shard_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._nodes:
+            return
+        shard_dir = os.path.join(self.path, f"shard-{self.shard_count:05d}")
+        os.makedirs(shard_dir, exist_ok=True)
+
+        matrix = _normalize(np.asarray(self._embeddings, dtype=np.float32))
+        self.dim = matrix.shape[1]
+        if self.dtype == "int8":
+            quantized, scales = quantize_int8(matrix)
+            np.save(os.path.join(shard_dir, "embeddings.npy"), quantized)
+            np.save(os.path.join(shard_dir, "scales.npy"), scales)
+        else:
+            np.save(os.path.join(shard_dir, "embeddings.npy"), matrix.astype(self.dtype))
+        if self.keep_float32:
+            np.save(os.path.join(shard_dir, "embeddings_f32.npy"), matrix)
+
+        offsets = []
+        node_types = []
+        ids = []
+        with open(os.path.join(shard_dir, "nodes.jsonl"), "wb") as f:
+            for node in self._nodes:
+                offsets.append(f.tell())
+                node_types.append(NODE_TYPES.index(node.metadata.get("node_type", "text")))
+                ids.append(node.node_id)
+                record = {
+                    "id": node.node_id,
+                    "text": node.get_content(),
+                    "metadata": node.metadata,
+                    "excluded_embed_metadata_keys": node.excluded_embed_metadata_keys,
+                    "excluded_llm_metadata_keys": node.excluded_llm_metadata_keys,
+                }
+                f.write(json.dumps(record).encode() + b"\n")
+        np.save(os.path.join(shard_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        np.save(os.path.join(shard_dir, "node_types.npy"), np.asarray(node_types, dtype=np.uint8))
+        with open(os.path.join(shard_dir, IDS_FILE), "w") as f:
+            json.dump(ids, f)
+
+        self.node_count += len(self._nodes)
+        self.shard_count += 1
+        self._nodes = []
+        self._embeddings = []
+
+    def close(self) -> None:
+        """Flush the last partial shard and write the manifest."""
+        self._flush()
+        manifest = {
+            "model_name": self.model_name,
+            "dim": self.dim,
+            "dtype": self.dtype,
+            "float32_copy": self.keep_float32,
+            "shard_count": self.shard_count,
+            "node_count": self.node_count,
+        }
+        with open(os.path.join(self.path, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+
+
+class _Shard:
+    def __init__(self, path: str, float32_copy: bool = False) -> None:
+        self.path = path
+        # Memory-mapped so only the pages touched by a scan are resident
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self.node_types = np.load(os.path.join(path, "node_types.npy"))
+        scales_path = os.path.join(path, "scales.npy")
+        self.scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        if self.embeddings.dtype == np.float32:
+            self.exact = self.embeddings
+        elif float32_copy:
+            # Only the rows of re-scored candidates are ever paged in
+            self.exact = np.load(os.path.join(path, "embeddings_f32.npy"), mmap_mode="r")
+        else:
+            self.exact = None
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        Approximate cosine scores of every row against a normalized float32
+        query, or a ``(rows, queries)`` matrix for ``(dim, queries)`` of them.
+        """
+        if self.embeddings.dtype == np.float32:
+            return self.embeddings @ query
+        # NumPy has no BLAS path for float16/int8, so widen one block at a
+        # time instead of materializing the whole matrix as float32
+        scores = np.empty((len(self.embeddings),) + query.shape[1:], dtype=np.float32)
+        for start in range(0, len(scores), SCAN_BLOCK_ROWS):
+            block = np.asarray(self.embeddings[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            scores *= self.scales.reshape((-1,) + (1,) * (query.ndim - 1))
+        return scores
+
+    def ids(self) -> list[str]:
+        """Node ids in row order."""
+        ids_path = os.path.join(self.path, IDS_FILE)
+        if os.path.exists(ids_path):
+            with open(ids_path) as f:
+                return json.load(f)
+        # Stores written before the ids sidecar existed
+        with open(os.path.join(self.path, "nodes.jsonl"), "rb") as f:
+            return [json.loads(line)["id"] for line in f]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the matrix scanned per query, including int8 scales."""
+        return self.embeddings.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def node(self, row: int) -> TextNode:
+        with open(os.path.join(self.path, "nodes.jsonl"), "rb") as f:
+            f.seek(int(self.offsets[row]))
+            record = json.loads(f.readline())
+        return TextNode(
+            id_=record["id"],
+            text=record["text"],
+            metadata=record["metadata"],
+            excluded_embed_metadata_keys=record["excluded_embed_metadata_keys"],
+            excluded_llm_metadata_keys=record["excluded_llm_metadata_keys"],
+        )
+
+
+class EmbeddingStore:
+    """Read side of an on-disk embedding store written by ``EmbeddingStoreWriter``."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        self.model_name = manifest["model_name"]
+        self.dim = manifest["dim"]
+        self.dtype = manifest.get("dtype", "float32")
+        self.node_count = manifest["node_count"]
+        self.shards = [
+            _Shard(os.path.join(path, f"shard-{i:05d}"), manifest.get("float32_copy", False))
+            for i in range(manifest["shard_count"])
+        ]
+        self._locations: dict[str, tuple[int, int]] | None = None
+        self._locations_lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        stat = os.stat(os.path.join(self.path, MANIFEST_FILE))
+        return f"{stat.st_mtime_ns}-{self.node_count}"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(shard.nbytes for shard in self.shards)
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        node_types: list[str] | None = None,
+        rescore_factor: int = 0,
+    ) -> list[tuple[float, int, int]]:
+        """
+        Return ``(score, shard, row)`` for the ``top_k`` most similar rows.
+
+        Scores come from the stored (possibly quantized) matrix. With
+        ``rescore_factor`` above zero, ``top_k * rescore_factor`` candidates
+        are re-scored against the exact float32 rows where the store has them.
+        """
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        type_codes = [NODE_TYPES.index(t) for t in node_types] if node_types else None
+        rescore = rescore_factor > 0 and self.dtype != "float32"
+        candidate_k = top_k * rescore_factor if rescore else top_k
+
+        candidates = []
+        for shard_index, shard in enumerate(self.shards):
+            scores = shard.scores(query)
+            if type_codes is not None:
+                scores = np.where(np.isin(shard.node_types, type_codes), scores, -np.inf)
+            k = min(candidate_k, len(scores))
+            rows = np.argpartition(-scores, k - 1)[:k]
+            rows = rows[np.isfinite(scores[rows])]
+            if rescore and shard.exact is not None:
+                rows = np.sort(rows)  # sequential reads from the memory map
+                scores = np.asarray(shard.exact[rows]) @ query
+                candidates.extend((float(score), shard_index, int(row)) for score, row in zip(scores, rows))
+            else:
+                candidates.extend((float(scores[row]), shard_index, int(row)) for row in rows)
+
+        candidates.sort(reverse=True)
+        return candidates[:top_k]
+
+    def node(self, shard: int, row: int) -> TextNode:
+        return self.shards[shard].node(row)
+
+    def get_node(self, node_id: str) -> TextNode | None:
+        """
+        Look a node up by id. The id index is built from the shards' id
+        sidecars on first use; this does file I/O, so call it off the event loop.
+        """
+        if self._locations is None:
+            with self._locations_lock:
+                if self._locations is None:
+                    locations = {}
+                    for shard_index, shard in enumerate(self.shards):
+                        for row, shard_node_id in enumerate(shard.ids()):
+                            locations[shard_node_id] = (shard_index, row)
+                    self._locations = locations
+        location = self._locations.get(node_id)
+        return self.node(*location) if location is not None else None
+
+
+def _node_types_from_filters(filters: MetadataFilters | None) -> list[str] | None:
+    if filters is None:
+        return None
+    node_types = None
+    for f in filters.filters:
+        if f.key != "node_type" or f.operator not in (FilterOperator.EQ, FilterOperator.IN):
+            raise ValueError(f"Unsupported filter for embedding store: {f}")
+        node_types = list(f.value) if f.operator == FilterOperator.IN else [f.value]
+    return node_types
+
+
+class EmbeddingStoreRetriever(BaseRetriever):
+    """Exact top-k retriever that scans an ``EmbeddingStore`` shard by shard."""
+
+    def __init__(
+        self,
+        store: EmbeddingStore,
+        embed_model: Any,
+        similarity_top_k: int = 5,
+        filters: MetadataFilters | None = None,
+        rescore_factor: int = 0,
+    ) -> None:
+        super().__init__()
+        self._store = store
+        self._embed_model = embed_model
+        self._similarity_top_k = similarity_top_k
+        self._node_types = _node_types_from_filters(filters)
+        self._rescore_factor = rescore_factor
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        embedding = query_bundle.embedding
+        if embedding is None:
+            embedding = self._embed_model.get_query_embedding(query_bundle.query_str)
+        hits = self._store.search(
+            np.asarray(embedding), self._similarity_top_k, self._node_types, self._rescore_factor
+        )
+        return [NodeWithScore(node=self._store.node(shard, row), score=score) for score, shard, row in hits]
+
+
+def write_index_to_store(index: Any, path: str, model_name: str, **writer_kwargs: Any) -> EmbeddingStore:
+    """Copy the nodes and embeddings of an in-memory ``VectorStoreIndex`` into an embedding store."""
+    writer = EmbeddingStoreWriter(path, model_name, **writer_kwargs)
+    embedding_dict = index.vector_store.data.embedding_dict
+    for node_id in embedding_dict:
+        writer.append([index.docstore.get_node(node_id)], [embedding_dict[node_id]])
+    writer.close()
+    return EmbeddingStore(path)
+
+
+def embed_text(node: TextNode) -> str:
+    """Text used to embed a node, matching what ``VectorStoreIndex`` embeds."""
+    return node.get_content(metadata_mode=MetadataMode.EMBED)
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+from typing import Any
+
+import numpy as np
+
+from app.core.cache import CacheBackend
+from app.core.config import settings
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx_int8")
+
+VALIDATION_FILE = "validation.json"
+
+# Compared across backends when an export is built; a mix of short queries
+# and passage-length text like what the index holds
+VALIDATION_TEXTS = [
+    "What is HER-2/neu?",
+    "Which oncogene correlates with relapse in breast cancer?",
+    "How was gene amplification measured in the tumour samples?",
+    "Amplification of the HER-2/neu gene was a significant predictor of both overall survival and time to relapse in patients with breast cancer.",
+    "The oncogene encodes a protein that is similar to, but distinct from, the epidermal growth factor receptor.",
+    "Patients whose tumours had more than five copies of the gene relapsed sooner than those without amplification.",
+    "Table 2 summarizes the association between amplification and the number of positive lymph nodes.",
+    "DNA was extracted from each tumour and analysed by Southern blot hybridization.",
+]
+
+
+class CachedQueryEmbedder:
+    """Query embeddings memoized in a shared cache, keyed by model and text."""
+
+    def __init__(self, embed_model: Any, cache: CacheBackend) -> None:
+        self.embed_model = embed_model
+        self.cache = cache
+        self.model_name = getattr(embed_model, "model_name", type(embed_model).__name__)
+
+    def _key(self, text: str) -> str:
+        return f"{self.model_name}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+    def embed(self, text: str) -> list[float]:
+        key = self._key(text)
+        embedding = self.cache.get(key)
+        if embedding is None:
+            embedding = self.embed_model.get_query_embedding(text)
+            self.cache.set(key, embedding)
+        return embedding
+
+
+def embed_queries(embed_model: Any, texts: list[str]) -> list[list[float]]:
+    """Query embeddings for ``texts`` in as few forward passes as the model allows."""
+    # HuggingFaceEmbedding batches natively; keep its query prompt
+    if hasattr(embed_model, "_embed"):
+        return embed_model._embed(texts, prompt_name="query")
+    return [embed_model.get_query_embedding(text) for text in texts]
+
+
+def cosine_agreement(reference: Any, candidate: Any) -> np.ndarray:
+    """Row-wise cosine similarity between two embedding matrices of the same texts."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    return np.einsum("ij,ij->i", reference, candidate) / np.maximum(norms, 1e-12)
+
+
+def onnx_export_dir(model_name: str, backend: str) -> str:
+    root = settings.EMBEDDING_ONNX_DIR or os.path.join(
+        os.path.dirname(__file__), "..", "..", "artifacts", "onnx"
+    )
+    return os.path.join(root, model_name.replace("/", "--"), backend)
+
+
+def _onnx_model_kwargs(backend: str) -> dict[str, Any]:
+    if backend == "onnx_int8":
+        return {"file_name": f"onnx/model_qint8_{settings.EMBEDDING_ONNX_QUANTIZATION}.onnx"}
+    return {}
+
+
+def export_onnx(model_name: str, backend: str) -> str:
+    """
+    Export ``model_name`` for ONNX Runtime once and return the export directory.
+
+    ``onnx_int8`` additionally applies dynamic int8 quantization to the
+    exported graph. Every new export is validated against the torch model
+    and the agreement is recorded next to it in ``validation.json``.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    path = onnx_export_dir(model_name, backend)
+    if os.path.exists(os.path.join(path, VALIDATION_FILE)):
+        return path
+
+    # sentence-transformers converts through optimum when no ONNX graph exists
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save_pretrained(path)
+    if backend == "onnx_int8":
+        export_dynamic_quantized_onnx_model(model, settings.EMBEDDING_ONNX_QUANTIZATION, path)
+
+    validation = validate_backend(model_name, backend, path)
+    with open(os.path.join(path, VALIDATION_FILE), "w") as f:
+        json.dump(validation, f)
+    return path
+
+
+def validate_backend(model_name: str, backend: str, path: str | None = None) -> dict[str, Any]:
+    """Cosine agreement of ``backend`` with the torch model over ``VALIDATION_TEXTS``."""
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    reference = HuggingFaceEmbedding(model_name=model_name).get_text_embedding_batch(VALIDATION_TEXTS)
+    candidate = HuggingFaceEmbedding(
+        model_name=path or onnx_export_dir(model_name, backend),
+        backend="onnx",
+        model_kwargs=_onnx_model_kwargs(backend),
+    ).get_text_embedding_batch(VALIDATION_TEXTS)
+    agreement = cosine_agreement(reference, candidate)
+    return {
+        "model_name": model_name,
+        "backend": backend,
+        "min_cosine": float(agreement.min()),
+        "mean_cosine": float(agreement.mean()),
+        "texts": len(VALIDATION_TEXTS),
+    }
+
+
+def create_embed_model(model_name: str | None = None, backend: str | None = None) -> Any:
+    """
+    Build the embedding model for ``EMBEDDING_BACKEND``.
+
+    ONNX backends are exported on first use and loaded from the export
+    directory afterwards. An export whose recorded agreement with torch is
+    below ``EMBEDDING_MIN_AGREEMENT`` is refused rather than served.
+    """
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    model_name = model_name or settings.HUGGING_FACE_EMBEDDING_MODEL_NAME
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    if backend == "torch":
+        return HuggingFaceEmbedding(model_name=model_name)
+
+    path = export_onnx(model_name, backend)
+    with open(os.path.join(path, VALIDATION_FILE)) as f:
+        validation = json.load(f)
+    if validation["min_cosine"] < settings.EMBEDDING_MIN_AGREEMENT:
+        raise ValueError(
+            f"{backend} export of {model_name} agrees with torch only to cosine "
+            f"{validation['min_cosine']:.4f} (< {settings.EMBEDDING_MIN_AGREEMENT})"
+        )
+    return HuggingFaceEmbedding(model_name=path, backend="onnx", model_kwargs=_onnx_model_kwargs(backend))
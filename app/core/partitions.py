@@ -0,0 +1,355 @@
+"""
+Monthly partitions of the ``message`` table and their Parquet archive.
+
+``message`` is range-partitioned on ``created_at`` with one partition per
+month (``message_pYYYY_MM``) plus ``message_default`` for anything outside
+them. ``maintain_partitions`` keeps partitions ahead of time and, when
+configured, moves partitions older than ``MESSAGE_ARCHIVE_AFTER_MONTHS``
+to zstd-compressed Parquet files registered in ``message_archive``. Then
+``read_archived_messages`` serves them. Maintenance is run from cron::
+
+    python -m app.core.partitions --list
+    python -m app.core.partitions --archive-after-months 6
+
+or, with ``MESSAGE_PARTITION_MAINTENANCE_ENABLED``, periodically by the API
+workers (``run_partition_maintenance``); an advisory lock lets only one of
+them do the work at a time.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import text
+from sqlmodel import select
+
+from app.core.config import settings
+from app.models import MessageArchive
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "message_p"
+DEFAULT_PARTITION = "message_default"
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})_(\d{{2}})$")
+
+# pg_try_advisory_lock key so only one worker maintains partitions at a time
+MAINTENANCE_LOCK_ID = 0x6D736770
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "artifacts", "archive")
+ARCHIVE_BATCH_ROWS = 10_000
+ARCHIVE_ROW_GROUP_ROWS = 65_536
+
+# Column order of the message table and the archive files
+MESSAGE_COLUMNS = (
+    "id",
+    "sender",
+    "content",
+    "chatroom_id",
+    "previous_message_id",
+    "execution_time",
+    "truncated",
+    "comment_reaction",
+    "comment_content",
+    "created_at",
+    "updated_at",
+)
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARTITION_PREFIX}{start:%Y_%m}"
+
+
+def list_partitions(conn: Any) -> list[tuple[str, datetime, datetime]]:
+    """``(name, start, end)`` of the attached monthly partitions, oldest first."""
+    names = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'message'
+    """)).scalars().all()
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            start = datetime(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append((name, start, add_months(start, 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(conn: Any, start: datetime) -> str:
+    """
+    Create and attach the partition for the month starting at ``start``.
+
+    Rows of that month that landed in the default partition are moved into
+    it first, since attaching fails while the default holds any of them.
+    """
+    name = partition_name(start)
+    end = add_months(start, 1)
+    conn.execute(text(f"CREATE TABLE {name} (LIKE message INCLUDING DEFAULTS)"))
+    conn.execute(
+        text(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE created_at >= :start AND created_at < :end
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """),
+        {"start": start, "end": end},
+    )
+    conn.execute(text(
+        f"ALTER TABLE message ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    ))
+    return name
+
+
+def ensure_partitions(conn: Any, now: datetime, months_ahead: int) -> list[str]:
+    """Create the partitions of the current month and ``months_ahead`` following ones."""
+    existing = {name for name, _, _ in list_partitions(conn)}
+    created = []
+    for offset in range(months_ahead + 1):
+        start = add_months(month_start(now), offset)
+        if partition_name(start) not in existing:
+            created.append(create_partition(conn, start))
+    return created
+
+
+def _require_pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Message archives need pyarrow: uv sync --extra archive") from e
+    return pyarrow
+
+
+def _archive_schema(pa: Any) -> Any:
+    return pa.schema([
+        ("id", pa.int64()),
+        ("sender", pa.string()),
+        ("content", pa.string()),
+        ("chatroom_id", pa.int64()),
+        ("previous_message_id", pa.int64()),
+        ("execution_time", pa.int64()),
+        ("truncated", pa.bool_()),
+        ("comment_reaction", pa.string()),
+        ("comment_content", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+
+
+def _export_partition(conn: Any, name: str, path: str) -> tuple[int, Any]:
+    """Write partition ``name`` to ``path``; returns its row count and latest update."""
+    pa = _require_pyarrow()
+    schema = _archive_schema(pa)
+    # One snapshot for the export and the fingerprint it is checked against
+    conn.execution_options(isolation_level="REPEATABLE READ")
+    try:
+        with conn.begin():
+            row_count, last_update = conn.execute(text(f"SELECT count(*), max(updated_at) FROM {name}")).one()
+            # Sorted by chatroom so row-group statistics prune chatroom reads
+            result = conn.execute(text(
+                f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM {name} ORDER BY chatroom_id, created_at"
+            ).execution_options(stream_results=True))
+            with pa.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+                for rows in result.partitions(ARCHIVE_BATCH_ROWS):
+                    arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)]
+                    writer.write_table(
+                        pa.Table.from_arrays(arrays, schema=schema), row_group_size=ARCHIVE_ROW_GROUP_ROWS
+                    )
+    finally:
+        conn.execution_options(isolation_level="READ COMMITTED")
+    return row_count, last_update
+
+
+def archive_partition(conn: Any, name: str, start: datetime, end: datetime, archive_dir: str) -> bool:
+    """
+    Move partition ``name`` to ``archive_dir/name.parquet`` and drop it.
+
+    The export runs without blocking the table. The partition is then
+    locked against writes and checked against the exported snapshot, and
+    only the detach and drop hold the parent's lock. A partition written
+    to during the export (e.g. new feedback) is left for the next run.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.parquet")
+    partial_path = path + ".partial"
+    row_count, last_update = _export_partition(conn, name, partial_path)
+
+    with conn.begin():
+        conn.execute(text(f"LOCK TABLE {name} IN EXCLUSIVE MODE"))
+        current = tuple(conn.execute(text(f"SELECT count(*), max(updated_at) FROM {name}")).one())
+        if current != (row_count, last_update):
+            logger.info(f"Partition {name} changed while archiving; retrying next run")
+            os.remove(partial_path)
+            return False
+        os.replace(partial_path, path)
+        conn.execute(text(f"ALTER TABLE message DETACH PARTITION {name}"))
+        conn.execute(
+            text("""
+                INSERT INTO message_archive (partition_name, range_start, range_end, path, row_count, archived_at)
+                VALUES (:name, :start, :end, :path, :row_count, :archived_at)
+            """),
+            {
+                "name": name,
+                "start": start,
+                "end": end,
+                "path": os.path.abspath(path),
+                "row_count": row_count,
+                "archived_at": datetime.now(timezone.utc),
+            },
+        )
+        conn.execute(text(f"DROP TABLE {name}"))
+    logger.info(f"Archived partition {name} ({row_count} messages) to {path}")
+    return True
+
+
+def maintain_partitions(
+    engine: Any,
+    now: datetime | None = None,
+    months_ahead: int | None = None,
+    archive_after_months: int | None = None,
+    archive_dir: str | None = None,
+) -> dict[str, Any]:
+    """Create upcoming partitions and archive cold ones; a no-op while another worker does."""
+    now = now or datetime.now(timezone.utc)
+    months_ahead = settings.MESSAGE_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    if archive_after_months is None:
+        archive_after_months = settings.MESSAGE_ARCHIVE_AFTER_MONTHS
+    archive_dir = archive_dir or settings.MESSAGE_ARCHIVE_DIR or ARCHIVE_DIR
+
+    report: dict[str, Any] = {"created": [], "archived": []}
+    with engine.connect() as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": MAINTENANCE_LOCK_ID}).scalar()
+        conn.commit()
+        if not locked:
+            report["skipped"] = True
+            return report
+        try:
+            with conn.begin():
+                report["created"] = ensure_partitions(conn, now, months_ahead)
+            if archive_after_months is not None:
+                cutoff = add_months(month_start(now), -archive_after_months)
+                partitions = list_partitions(conn)
+                # Exports pick their own isolation level, so no transaction may be open
+                conn.commit()
+                for name, start, end in partitions:
+                    if end <= cutoff and archive_partition(conn, name, start, end, archive_dir):
+                        report["archived"].append(name)
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+            conn.commit()
+    return report
+
+
+async def run_partition_maintenance(interval: float) -> None:
+    """Run ``maintain_partitions`` every ``interval`` seconds until cancelled."""
+    from app.core.db import engine
+
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            report = await loop.run_in_executor(None, maintain_partitions, engine)
+            if report["created"] or report["archived"]:
+                logger.info(f"Partition maintenance: {report}")
+        except Exception:
+            logger.exception("Partition maintenance failed")
+        await asyncio.sleep(interval)
+
+
+def read_archived_messages(
+    session: Any,
+    chatroom_id: int,
+    limit: int,
+    offset: int,
+) -> dict[str, Any]:
+    """
+    Newest-first page of a chatroom's archived messages, shaped like the live listing.
+
+    Archives are read newest month first. Each file only has its matching
+    rows counted, which reads the ``chatroom_id`` column of the row groups
+    whose statistics can match, and only files overlapping the requested
+    page are loaded. Within a file the rows are already in ``created_at``
+    order, so the page is sliced from its end rather than sorted.
+    """
+    paths = session.exec(select(MessageArchive.path).order_by(MessageArchive.range_start.desc())).all()
+    if not paths:
+        return {"messages": [], "total": 0}
+
+    pa = _require_pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    schema = _archive_schema(pa)
+    condition = pc.field("chatroom_id") == chatroom_id
+    messages: list[dict[str, Any]] = []
+    total = 0
+    skip = offset
+    for path in paths:
+        dataset = ds.dataset(path, format="parquet", schema=schema)
+        count = dataset.count_rows(filter=condition)
+        total += count
+        if len(messages) >= limit or count == 0:
+            continue
+        if skip >= count:
+            skip -= count
+            continue
+        # Rows of this file are oldest first: the newest-first window
+        # [skip, skip + n) is the oldest-first window ending ``skip`` from the end
+        take = min(limit - len(messages), count - skip)
+        rows = dataset.to_table(filter=condition).slice(count - skip - take, take).to_pylist()
+        messages.extend(reversed(rows))
+        skip = 0
+    return {"messages": messages, "total": total}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list", action="store_true", help="Only list partitions and archives.")
+    parser.add_argument("--months-ahead", type=int)
+    parser.add_argument("--archive-after-months", type=int)
+    parser.add_argument("--archive-dir")
+    args = parser.parse_args()
+
+    from app.core.db import engine
+
+    if args.list:
+        with engine.connect() as conn:
+            for name, start, end in list_partitions(conn):
+                rows = conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+                print(f"{name:>20}  {start:%Y-%m-%d} .. {end:%Y-%m-%d}  {rows:>10} rows")
+            rows = conn.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar()
+            print(f"{DEFAULT_PARTITION:>20}  {'(outside partitions)':>24}  {rows:>10} rows")
+            for name, path, row_count in conn.execute(
+                text("SELECT partition_name, path, row_count FROM message_archive ORDER BY range_start")
+            ):
+                print(f"{name:>20}  archived to {path} ({row_count} rows)")
+        return
+
+    report = maintain_partitions(
+        engine,
+        months_ahead=args.months_ahead,
+        archive_after_months=args.archive_after_months,
+        archive_dir=args.archive_dir,
+    )
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Sampling profiler for live API workers.
+
+A single background thread snapshots the Python stack of every thread in
+the process (``sys._current_frames``) at a fixed interval while at least
+one profiling session is open, and folds the stacks into the collapsed
+format read by flamegraph.pl, speedscope and inferno::
+
+    MainThread;run (asyncio/runners.py:86);...;embed (app/core/batching.py:80) 42
+
+Sessions are either timed (``/admin/profile?seconds=N``) or span a single
+request (``ProfilingMiddleware``). No thread runs and no per-request work
+is done beyond a header lookup unless a session is open.
+"""
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any
+
+from app.core.metrics import Gauge
+
+PROFILING_SESSIONS = Gauge("profiling_sessions_active", "Open sampling profiler sessions.")
+
+# Leaf frames of threads parked waiting for work; skipped so profiles show
+# where time is spent rather than which threads are idle
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+_SITE_PACKAGES = re.compile(r".*[/\\](?:site|dist)-packages[/\\]")
+_THREAD_NUMBER = re.compile(r"\d+")
+_STDLIB = os.path.dirname(os.__file__) + os.sep
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to site-packages, the stdlib or the working directory, for readable frames."""
+    short = _SITE_PACKAGES.sub("", filename)
+    if short == filename:
+        for prefix in (_STDLIB, os.getcwd() + os.sep):
+            if filename.startswith(prefix):
+                short = filename[len(prefix):]
+                break
+    return short.replace("\\", "/")
+
+
+class Profile:
+    """Collapsed stacks gathered by one profiling session."""
+
+    def __init__(self, label: str) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.started_at = time.time()
+        self.duration: float | None = None
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format, heaviest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "samples": self.samples,
+        }
+
+
+class Sampler:
+    """
+    Process-wide stack sampler shared by every open session.
+
+    The sampling thread starts with the first session and exits when the
+    last one is stopped, so an idle sampler costs nothing.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._sessions: set[Profile] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._labels: dict[Any, str] = {}
+
+    @property
+    def active(self) -> bool:
+        return bool(self._sessions)
+
+    def start(self, label: str) -> Profile:
+        profile = Profile(label)
+        with self._lock:
+            self._sessions.add(profile)
+            PROFILING_SESSIONS.set(len(self._sessions))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: Profile) -> Profile:
+        with self._lock:
+            self._sessions.discard(profile)
+            PROFILING_SESSIONS.set(len(self._sessions))
+        profile.duration = time.time() - profile.started_at
+        return profile
+
+    def _frame_label(self, code: Any) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, thread_name: str, frame: Any) -> str | None:
+        leaf = frame.f_code
+        if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+            return None
+        labels = []
+        while frame is not None:
+            labels.append(self._frame_label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread_name)
+        labels.reverse()
+        return ";".join(labels)
+
+    def sample(self) -> list[str]:
+        """Collapsed stacks of every busy thread but the sampler itself."""
+        own = threading.get_ident()
+        # Number-free names group pool workers ("AnyIO worker thread", "ThreadPoolExecutor-N_N")
+        names = {thread.ident: _THREAD_NUMBER.sub("N", thread.name) for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = self._collapse(names.get(ident, f"thread-{ident}"), frame)
+            if stack is not None:
+                stacks.append(stack)
+        return stacks
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                sessions = list(self._sessions)
+            stacks = self.sample()
+            with self._lock:
+                # Sessions stopped while sampling are final and left untouched
+                for profile in sessions:
+                    if profile in self._sessions:
+                        profile.samples += 1
+                        profile.stacks.update(stacks)
+            time.sleep(self.interval)
+
+
+class ProfileStore:
+    """The most recent request profiles, oldest evicted first."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Profile | None:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list[Profile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+
+class ProfilingMiddleware:
+    """
+    Profile individual requests.
+
+    A request is profiled when it carries ``header: 1`` together with the
+    admin token, or at random with probability ``sample_rate``. The profile
+    covers the whole response, streamed bodies included, and is kept in
+    ``store``; explicitly requested profiles also get an ``X-Profile-Id``
+    response header.
+
+    Samples come from every thread of the worker, so requests running
+    concurrently show up in each other's profiles; profile on a quiet
+    worker for clean attribution.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        sampler: Sampler,
+        store: ProfileStore,
+        admin_token: str,
+        header: str = "x-profile",
+        sample_rate: float = 0.0,
+    ) -> None:
+        self.app = app
+        self.sampler = sampler
+        self.store = store
+        self.admin_token = admin_token
+        self.header = header.lower().encode()
+        self.sample_rate = sample_rate
+
+    def _requested(self, scope: dict[str, Any]) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(self.header) not in (b"1", b"true"):
+            return False
+        return secrets.compare_digest(headers.get(b"x-admin-token", b""), self.admin_token.encode())
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = self._requested(scope)
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.sampler.start(f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message: dict[str, Any]) -> None:
+            if requested and message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.store.add(self.sampler.stop(profile))
@@ -0,0 +1,63 @@
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.response_synthesizers import get_response_synthesizer
+from llama_index.core.postprocessor import SimilarityPostprocessor
+from llama_index.core.prompts import PromptTemplate
+from llama_index.core.vector_stores import FilterOperator, MetadataFilter, MetadataFilters
+
+from app.core.config import settings
+from app.core.embedding_store import EmbeddingStore, EmbeddingStoreRetriever
+
+def initialize_retriever(index, similarity_top_k=5, filters=None, embed_model=None):
+    if isinstance(index, EmbeddingStore):
+        return EmbeddingStoreRetriever(
+            index,
+            embed_model=embed_model,
+            similarity_top_k=similarity_top_k,
+            filters=filters,
+            rescore_factor=settings.EMBEDDING_STORE_RESCORE_FACTOR,
+        )
+    return VectorIndexRetriever(
+        index=index,
+        similarity_top_k=similarity_top_k,
+        filters=filters,
+    )
+
+def initialize_synthesizer(llm):
+    qa_prompt_tmpl = (
+        "You are a helpful assistant. Below is some context retrieved from documents, followed by the chat history. "
+        "Please respond to the user's message using the provided context. Format your response as bullet points, "
+        "and after each statement, reference the original sentence from the context that supports it by saying (Ref: sentence).\n\n"
+        "Context:\n"
+        "---------------------\n"
+        "{context_str}\n"
+        "---------------------\n"
+        "Given the context information and not prior knowledge, "
+        "answer the query.\n"
+        "Query: {query_str}\n"
+        "Answer: "
+    )
+    qa_prompt = PromptTemplate(qa_prompt_tmpl)
+    return get_response_synthesizer(llm=llm, streaming=True, text_qa_template=qa_prompt)
+
+def initialize_postprocessors():
+    return [SimilarityPostprocessor(similarity_cutoff=0.7)]
+
+def initialize_query_engine(retriever, synthesizer):
+    return RetrieverQueryEngine(
+        retriever=retriever,
+        response_synthesizer=synthesizer,
+        node_postprocessors=initialize_postprocessors(),
+    )
+
+def node_type_filters(node_types):
+    """Restrict retrieval to nodes whose ``node_type`` metadata is in ``node_types``."""
+    return MetadataFilters(
+        filters=[MetadataFilter(key="node_type", value=list(node_types), operator=FilterOperator.IN)]
+    )
+
+def resolve_node(index, node_id):
+    """The node ``node_id`` of ``index`` (pickled index or embedding store), or ``None``."""
+    if isinstance(index, EmbeddingStore):
+        return index.get_node(node_id)
+    return index.docstore.get_node(node_id, raise_error=False)
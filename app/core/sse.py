@@ -0,0 +1,154 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in the project dependencies
+    orjson = None
+
+HEARTBEAT = b": keep-alive\n\n"
+
+_END = object()
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode ``payload`` as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def encode_event(payload: Any) -> bytes:
+    """Encode one SSE ``data:`` frame."""
+    return b"data: " + dumps(payload) + b"\n\n"
+
+
+def event_stream_response(frames: AsyncIterator[bytes], status_code: int = 200) -> StreamingResponse:
+    """Wrap pre-encoded SSE frames in a response that proxies will not buffer."""
+    return StreamingResponse(
+        frames,
+        status_code=status_code,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class ClientDisconnected(Exception):
+    """Raised by ``SSEWriter.stream`` when the client has gone away."""
+
+
+class SSEWriter:
+    """
+    Turn a token stream into coalesced, pre-encoded SSE frames.
+
+    Tokens are buffered until ``flush_interval`` seconds have passed since the
+    first buffered token or ``max_chars`` characters are pending, then emitted
+    as a single ``message`` frame. While the stream is idle a keep-alive
+    comment is sent every ``heartbeat_interval`` seconds, and the request is
+    polled for disconnects so the caller can stop the upstream generation.
+    """
+
+    def __init__(
+        self,
+        request: Request | None = None,
+        *,
+        flush_interval: float | None = None,
+        max_chars: int | None = None,
+        heartbeat_interval: float | None = None,
+    ) -> None:
+        self.request = request
+        self.flush_interval = settings.SSE_FLUSH_INTERVAL_SECONDS if flush_interval is None else flush_interval
+        self.max_chars = settings.SSE_COALESCE_MAX_CHARS if max_chars is None else max_chars
+        self.heartbeat_interval = settings.SSE_HEARTBEAT_SECONDS if heartbeat_interval is None else heartbeat_interval
+        self.disconnected = False
+
+    async def _is_disconnected(self) -> bool:
+        if self.request is not None and not self.disconnected:
+            self.disconnected = await self.request.is_disconnected()
+        return self.disconnected
+
+    @staticmethod
+    async def _pump(tokens: AsyncIterator[str], queue: asyncio.Queue) -> None:
+        try:
+            async for token in tokens:
+                if token:
+                    queue.put_nowait(token)
+        except Exception as e:
+            queue.put_nowait(e)
+        else:
+            queue.put_nowait(_END)
+
+    async def stream(self, tokens: AsyncIterator[str]) -> AsyncIterator[bytes]:
+        """
+        Yield encoded frames for ``tokens``.
+
+        Raises ``ClientDisconnected`` once a disconnect is detected, and
+        re-raises any error produced by the token source.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(self._pump(tokens, queue))
+
+        pending: list[str] = []
+        pending_chars = 0
+        flush_at = None
+        last_write = loop.time()
+
+        try:
+            while True:
+                now = loop.time()
+                wake_at = last_write + self.heartbeat_interval
+                if flush_at is not None:
+                    wake_at = min(wake_at, flush_at)
+
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=max(wake_at - now, 0))
+                except asyncio.TimeoutError:
+                    item = None
+
+                if isinstance(item, str):
+                    pending.append(item)
+                    pending_chars += len(item)
+                    if flush_at is None:
+                        flush_at = loop.time() + self.flush_interval
+                    # Drain whatever else is already queued without waiting
+                    while pending_chars < self.max_chars and not queue.empty():
+                        item = queue.get_nowait()
+                        if not isinstance(item, str):
+                            break
+                        pending.append(item)
+                        pending_chars += len(item)
+
+                now = loop.time()
+                finished = item is _END or isinstance(item, Exception)
+                if pending and (finished or pending_chars >= self.max_chars or now >= flush_at):
+                    if await self._is_disconnected():
+                        raise ClientDisconnected()
+                    yield encode_event({"type": "message", "content": "".join(pending)})
+                    pending.clear()
+                    pending_chars = 0
+                    flush_at = None
+                    last_write = now
+                elif item is None and now >= last_write + self.heartbeat_interval:
+                    if await self._is_disconnected():
+                        raise ClientDisconnected()
+                    yield HEARTBEAT
+                    last_write = now
+
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            aclose = getattr(tokens, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -0,0 +1,197 @@
+"""
+Model loading, warm-up and readiness tracking for the API process.
+
+Run as a module to profile startup: ``python -m app.core.startup`` reports
+the import time of every module pulled in by ``app.main`` (via
+``python -X importtime``), and ``--load`` additionally times each loading
+phase against the local artifacts.
+"""
+import argparse
+import logging
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any
+
+from app.core.config import settings
+from app.core.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+STARTUP_PHASE_SECONDS = Gauge("startup_phase_seconds", "Time spent in each startup loading phase.", ["phase"])
+STARTUP_READY = Gauge("startup_ready", "1 once models are loaded and warmed up, else 0.")
+
+ARTIFACTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "artifacts")
+
+# Embedded once at startup so the first real query does not pay for lazy
+# weight loading, allocator growth and kernel selection
+WARM_UP_QUERY = "What is this document about?"
+
+
+class StartupState:
+    """Progress of model loading, shared by the loader thread and the health routes."""
+
+    def __init__(self) -> None:
+        self.status = "starting"
+        self.error: str | None = None
+        self.phases: dict[str, float] = {}
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def failed(self) -> bool:
+        return self.status == "failed"
+
+    def mark_ready(self) -> None:
+        self.status = "ready"
+        self._ready.set()
+        STARTUP_READY.set(1)
+
+    def mark_failed(self, error: BaseException) -> None:
+        self.status = "failed"
+        self.error = f"{type(error).__name__}: {error}"
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+            STARTUP_PHASE_SECONDS.set(self.phases[name], phase=name)
+            logger.info("Startup phase %s took %.2fs", name, self.phases[name])
+
+
+def load_models(state: Any) -> None:
+    """
+    Load the index, embedding model and LLM onto ``state`` and warm them up.
+
+    Heavy libraries (llama_index, torch, sentence-transformers) are imported
+    here rather than at module import so the API can bind and answer
+    liveness probes while this runs.
+    """
+    from app.core.batching import EmbeddingBatcher
+    from app.core.cache import create_cache
+    from app.core.embedding_store import EmbeddingStore
+    from app.core.embeddings import CachedQueryEmbedder, create_embed_model
+    from app.core.rag import initialize_query_engine, initialize_retriever, initialize_synthesizer
+
+    startup = state.startup
+    with startup.phase("index"):
+        if settings.VECTOR_STORE_BACKEND == "embedding_store":
+            state.index = EmbeddingStore(os.path.join(ARTIFACTS_DIR, "embedding_store"))
+            state.embed_model = create_embed_model(state.index.model_name)
+            state.index_version = state.index.version
+        else:
+            index_path = os.path.join(ARTIFACTS_DIR, "index.pkl")
+            with open(index_path, "rb") as f:
+                state.index = pickle.load(f)
+            state.embed_model = state.index._embed_model
+            if settings.EMBEDDING_BACKEND != "torch":
+                # Swap the pickled torch model for the validated ONNX export
+                state.embed_model = create_embed_model(state.embed_model.model_name)
+                state.index._embed_model = state.embed_model
+            # Identifies the loaded index so coalesced answers never cross index builds
+            index_stat = os.stat(index_path)
+            state.index_version = f"{index_stat.st_mtime_ns}-{index_stat.st_size}"
+
+    with startup.phase("llm"):
+        with open(os.path.join(ARTIFACTS_DIR, "llm.pkl"), "rb") as f:
+            state.llm = pickle.load(f)
+        if settings.LLM_API_BASE_OVERRIDE:
+            state.llm.api_base = settings.LLM_API_BASE_OVERRIDE
+
+    with startup.phase("query_engine"):
+        state.retriever = initialize_retriever(state.index, embed_model=state.embed_model)
+        state.synthesizer = initialize_synthesizer(state.llm)
+        state.query_engine = initialize_query_engine(state.retriever, state.synthesizer)
+        query_embed_model = state.embed_model
+        if settings.EMBED_BATCHING_ENABLED:
+            state.embed_batcher = EmbeddingBatcher(
+                state.embed_model,
+                max_batch_size=settings.EMBED_BATCH_MAX_SIZE,
+                max_wait=settings.EMBED_BATCH_MAX_WAIT_MS / 1000,
+            )
+            query_embed_model = state.embed_batcher
+        # Cache hits skip the batcher entirely
+        state.query_embedder = CachedQueryEmbedder(query_embed_model, create_cache("query_embedding"))
+
+    with startup.phase("warm_up"):
+        # Straight to the model so the dummy query is never cached
+        state.embed_model.get_query_embedding(WARM_UP_QUERY)
+
+    startup.mark_ready()
+
+
+def load_models_in_background(state: Any) -> threading.Thread:
+    """Run ``load_models`` on a daemon thread, recording failure instead of raising."""
+
+    def run() -> None:
+        try:
+            load_models(state)
+        except Exception as e:
+            logger.exception("Failed to load preprocessed data and index")
+            state.startup.mark_failed(e)
+
+    thread = threading.Thread(target=run, name="startup-loader", daemon=True)
+    thread.start()
+    return thread
+
+
+def import_times(module: str = "app.main") -> list[tuple[str, int, int]]:
+    """``(module, self_us, cumulative_us)`` for every import made by importing ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profile API startup.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--load", action="store_true", help="Also time each model loading phase.")
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    print(f"Slowest imports (cumulative) for `import {args.module}`:")
+    for name, _, cumulative_us in sorted(rows, key=lambda row: -row[2])[: args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+
+    per_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        per_package[name.split(".")[0]] += self_us
+    print("Import time by top-level package (self):")
+    for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+
+    if args.load:
+        logging.basicConfig(level=logging.INFO)
+
+        state = SimpleNamespace(startup=StartupState())
+        load_models(state)
+        print("Loading phases:")
+        for phase, seconds in state.startup.phases.items():
+            print(f"  {seconds * 1000:9.1f} ms  {phase}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,74 @@
+from bisect import bisect_right
+from collections import Counter
+from datetime import date, datetime, timezone
+
 from sqlalchemy import func
-from sqlmodel import Session, desc, select, delete
-from app.dto_models.chatroom import MessageSenderEnum
-from app.models import Chatroom, Message
-from sqlalchemy.orm import selectinload, aliased, joinedload
-
-from app.utils import to_dict
-
-def get_chatrooms(*, session: Session, limit: int, offset: int):
-    """Retrieve chatrooms."""
-    chatrooms = session.exec(
-        select(Chatroom)
-        .order_by(desc(Chatroom.created_at))
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, desc, select, delete, update
+from app.dto_models.chatroom import MessageCommentReactionEnum, MessageSenderEnum
+from app.models import (
+    CHATROOM_PREVIEW_CHARS,
+    FEEDBACK_LATENCY_BUCKETS,
+    Chatroom,
+    FeedbackDaily,
+    FeedbackLatency,
+    Message,
+    MessageSource,
+)
+from sqlalchemy.orm import selectinload, aliased
+from app.core.partitions import add_months, month_start
+
+# Columns selected by the list endpoints; rows come back as tuples and are
+# zipped into plain dicts instead of being loaded as ORM entities
+CHATROOM_LIST_COLUMNS = (
+    Chatroom.id,
+    Chatroom.title,
+    Chatroom.description,
+    Chatroom.created_at,
+    Chatroom.updated_at,
+    Chatroom.last_message_at,
+    Chatroom.message_count,
+    Chatroom.last_message_preview,
+)
+
+def _message_columns(entity, preview_chars: int | None = None):
+    """Message list columns of ``entity``; ``content`` is cut to ``preview_chars`` in SQL when set."""
+    content = entity.content if preview_chars is None else func.left(entity.content, preview_chars).label("content")
+    return (
+        entity.id,
+        entity.sender,
+        content,
+        entity.chatroom_id,
+        entity.previous_message_id,
+        entity.execution_time,
+        entity.truncated,
+        entity.comment_reaction,
+        entity.comment_content,
+        entity.created_at,
+        entity.updated_at,
+    )
+
+def _rows_to_dicts(rows, columns):
+    names = [column.key for column in columns]
+    return [dict(zip(names, row)) for row in rows]
+
+def get_chatrooms(*, session: Session, limit: int, offset: int, order_by: str = "created_at"):
+    """
+    Retrieve chatrooms, newest first or (``order_by="last_message_at"``) most
+    recently active first, with their denormalized last-message preview.
+    """
+    if order_by == "last_message_at":
+        # Matches ix_chatroom_last_message_at, so the page is an index scan
+        ordering = (Chatroom.last_message_at.desc().nullslast(), Chatroom.id.desc())
+    else:
+        ordering = (desc(Chatroom.created_at),)
+    rows = session.exec(
+        select(*CHATROOM_LIST_COLUMNS)
+        .order_by(*ordering)
         .limit(limit)
         .offset(offset)
     ).all()
+    chatrooms = _rows_to_dicts(rows, CHATROOM_LIST_COLUMNS)
 
     total_count = session.exec(
         select(func.count())
@@ -35,21 +90,39 @@ def create_chatroom(*, session: Session) -> Chatroom:
 
 def delete_chatroom(*, session: Session, chatroom_id: int):
     """Delete a chatroom and its associated messages and messages comments."""
+    # Take the deleted reactions out of the feedback aggregates
+    reacted = session.exec(
+        select(Message.created_at, Message.comment_reaction, Message.execution_time)
+        .where(Message.chatroom_id == chatroom_id, Message.comment_reaction.isnot(None))
+    ).all()
+    _apply_feedback_deltas(session=session, deltas=[
+        (created_at.date(), reaction, execution_time, -1) for created_at, reaction, execution_time in reacted
+    ])
+    session.exec(delete(MessageSource).where(
+        MessageSource.message_id.in_(select(Message.id).where(Message.chatroom_id == chatroom_id))
+    ))
     session.exec(delete(Message).where(Message.chatroom_id == chatroom_id))
     session.exec(delete(Chatroom).where(Chatroom.id == chatroom_id))
     session.commit()
 
-def get_messages_by_chatroom_id(*, session: Session, chatroom_id: int, limit: int, offset: int):
+def get_messages_by_chatroom_id(
+        *,
+        session: Session,
+        chatroom_id: int,
+        limit: int,
+        offset: int,
+        preview_chars: int | None = None
+    ):
     """Retrieve all messages for a specified chatroom_id along with their comments."""
-    messages = session.exec(
-        select(Message)
+    columns = _message_columns(Message, preview_chars)
+    rows = session.exec(
+        select(*columns)
         .where(Message.chatroom_id == chatroom_id)
         .order_by(desc(Message.created_at))
         .limit(limit)
         .offset(offset)
     ).all()
-
-    print('---messages', messages)
+    messages = _rows_to_dicts(rows, columns)
 
     total_count = session.exec(
         select(func.count())
@@ -69,20 +142,79 @@ def create_message(
         content: str,
         chatroom_id: int,
         previous_message_id: int = None,
-        execution_time: int = None
+        execution_time: int = None,
+        truncated: bool = False
     ) -> Message:
     message = Message(
         sender=sender,
         content=content,
         chatroom_id=chatroom_id,
         previous_message_id=previous_message_id,
-        execution_time=execution_time
+        execution_time=execution_time,
+        truncated=truncated
     )
     session.add(message)
+    _record_chatroom_activity(session=session, chatroom_id=chatroom_id, messages=[message])
     session.commit()
     session.refresh(message)
     return message
 
+def create_turn(
+        *,
+        session: Session,
+        chatroom_id: int,
+        question: str,
+        answer: str,
+        execution_time: int = None,
+        truncated: bool = False,
+        sources: list[tuple[str, float | None]] = ()
+    ) -> tuple[Message, Message]:
+    """
+    Persist a question and its answer, and the chatroom activity, in one transaction.
+
+    ``sources`` are the ``(node_id, score)`` pairs the answer was generated
+    from, in rank order; only their ids are stored.
+    """
+    user_message = Message(sender=MessageSenderEnum.USER, content=question, chatroom_id=chatroom_id)
+    session.add(user_message)
+    # The answer references the question's id
+    session.flush()
+    assistant_message = Message(
+        sender=MessageSenderEnum.ASSISTANT,
+        content=answer,
+        chatroom_id=chatroom_id,
+        previous_message_id=user_message.id,
+        execution_time=execution_time,
+        truncated=truncated
+    )
+    session.add(assistant_message)
+    if sources:
+        session.flush()
+        session.add_all([
+            MessageSource(message_id=assistant_message.id, rank=rank, node_id=node_id, score=score)
+            for rank, (node_id, score) in enumerate(sources, start=1)
+        ])
+    _record_chatroom_activity(session=session, chatroom_id=chatroom_id, messages=[user_message, assistant_message])
+    session.commit()
+    session.refresh(user_message)
+    session.refresh(assistant_message)
+    return user_message, assistant_message
+
+def _record_chatroom_activity(*, session: Session, chatroom_id: int, messages: list[Message]):
+    """Bump the chatroom's denormalized message count, last activity and preview."""
+    last = messages[-1]
+    # A single atomic UPDATE, so concurrent turns in one chatroom never lose a count
+    session.exec(
+        update(Chatroom)
+        .where(Chatroom.id == chatroom_id)
+        .values(
+            message_count=Chatroom.message_count + len(messages),
+            last_message_at=last.created_at,
+            last_message_preview=last.content[:CHATROOM_PREVIEW_CHARS],
+        )
+        .execution_options(synchronize_session=False)
+    )
+
 def update_chatroom_comment(*, session: Session, chatroom_id: int, title: str, description: str):
     """Update a chatroom comment."""
     chatroom_to_update = session.exec(select(Chatroom).where(Chatroom.id == chatroom_id)).first()
@@ -93,21 +225,132 @@ def update_chatroom_comment(*, session: Session, chatroom_id: int, title: str, d
         session.add(chatroom_to_update)
         session.commit()
 
-def update_message_comment(*, session: Session, message_id: int, comment_reaction: str, comment_content: str):
-    """Update a message comment."""
-    message_to_update = session.exec(select(Message).where(Message.id == message_id)).first()
+def _message_by_id(id: int, created_at: datetime | None = None):
+    """
+    Select the message ``id``. The id alone is not the partition key, so
+    without ``created_at`` every monthly partition is probed; with it, only
+    the partition of that month is read.
+    """
+    statement = select(Message).where(Message.id == id)
+    if created_at is not None:
+        if created_at.tzinfo is not None:
+            # Stored as naive UTC
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        start = month_start(created_at)
+        statement = statement.where(Message.created_at >= start, Message.created_at < add_months(start, 1))
+    return statement
+
+def update_message_comment(
+        *,
+        session: Session,
+        message_id: int,
+        comment_reaction: str,
+        comment_content: str,
+        created_at: datetime | None = None
+    ):
+    """Update a message comment and the feedback aggregates."""
+    # Locked so concurrent updates of one message apply their aggregate deltas in turn
+    message_to_update = session.exec(_message_by_id(message_id, created_at).with_for_update()).first()
     
     if message_to_update:
+        previous_reaction = message_to_update.comment_reaction
         message_to_update.comment_reaction = comment_reaction
         message_to_update.comment_content = comment_content
         session.add(message_to_update)
+        if _reaction_value(previous_reaction) != _reaction_value(comment_reaction):
+            day = message_to_update.created_at.date()
+            execution_time = message_to_update.execution_time
+            _apply_feedback_deltas(session=session, deltas=[
+                (day, previous_reaction, execution_time, -1),
+                (day, comment_reaction, execution_time, 1),
+            ])
         session.commit()
 
-def get_messages_with_comment(*, session: Session, limit: int, offset: int):
+def _reaction_value(reaction) -> str | None:
+    return reaction.value if isinstance(reaction, MessageCommentReactionEnum) else reaction
+
+def _latency_bucket(execution_time: int) -> int:
+    """Lower bound of the FEEDBACK_LATENCY_BUCKETS bucket holding ``execution_time``."""
+    return FEEDBACK_LATENCY_BUCKETS[max(0, bisect_right(FEEDBACK_LATENCY_BUCKETS, execution_time) - 1)]
+
+def _apply_feedback_deltas(*, session: Session, deltas):
+    """Add ``(day, reaction, execution_time, delta)`` changes to the feedback aggregate tables."""
+    daily = Counter()
+    latency = Counter()
+    for day, reaction, execution_time, delta in deltas:
+        reaction = _reaction_value(reaction)
+        if reaction is None:
+            continue
+        daily[(day, reaction)] += delta
+        if execution_time is not None:
+            latency[(day, reaction, _latency_bucket(execution_time))] += delta
+
+    # Upserts add to the stored counts atomically, so concurrent feedback never loses an update
+    for (day, reaction), delta in daily.items():
+        if delta:
+            statement = pg_insert(FeedbackDaily).values(day=day, reaction=reaction, count=delta)
+            session.exec(statement.on_conflict_do_update(
+                index_elements=["day", "reaction"],
+                set_={"count": FeedbackDaily.count + statement.excluded.count},
+            ))
+    for (day, reaction, bucket), delta in latency.items():
+        if delta:
+            statement = pg_insert(FeedbackLatency).values(day=day, reaction=reaction, latency_bucket=bucket, count=delta)
+            session.exec(statement.on_conflict_do_update(
+                index_elements=["day", "reaction", "latency_bucket"],
+                set_={"count": FeedbackLatency.count + statement.excluded.count},
+            ))
+
+def get_feedback_analytics(*, session: Session, start: date | None = None, end: date | None = None):
+    """Daily reaction counts and latency histograms per reaction, read from the aggregate tables."""
+    daily_query = select(FeedbackDaily.day, FeedbackDaily.reaction, FeedbackDaily.count).where(FeedbackDaily.count != 0)
+    latency_query = (
+        select(FeedbackLatency.reaction, FeedbackLatency.latency_bucket, func.sum(FeedbackLatency.count))
+        .group_by(FeedbackLatency.reaction, FeedbackLatency.latency_bucket)
+    )
+    if start is not None:
+        daily_query = daily_query.where(FeedbackDaily.day >= start)
+        latency_query = latency_query.where(FeedbackLatency.day >= start)
+    if end is not None:
+        daily_query = daily_query.where(FeedbackDaily.day <= end)
+        latency_query = latency_query.where(FeedbackLatency.day <= end)
+
+    days = {}
+    totals = Counter()
+    for day, reaction, count in session.exec(daily_query.order_by(FeedbackDaily.day)).all():
+        days.setdefault(day, Counter())[reaction] += count
+        totals[reaction] += count
+
+    def with_rate(counts):
+        rated = counts[MessageCommentReactionEnum.LIKE.value] + counts[MessageCommentReactionEnum.DISLIKE.value]
+        return {
+            **{reaction.value: counts[reaction.value] for reaction in MessageCommentReactionEnum},
+            "like_rate": counts[MessageCommentReactionEnum.LIKE.value] / rated if rated else None,
+        }
+
+    latency = {reaction.value: [] for reaction in MessageCommentReactionEnum}
+    for reaction, bucket, count in session.exec(latency_query.order_by(FeedbackLatency.latency_bucket)).all():
+        if count:
+            latency.setdefault(reaction, []).append({"latency_seconds_gte": bucket, "count": count})
+
+    return {
+        "totals": with_rate(totals),
+        "daily": [{"day": day, **with_rate(counts)} for day, counts in days.items()],
+        "latency": latency,
+    }
+
+def get_messages_with_comment(*, session: Session, limit: int, offset: int, preview_chars: int | None = None):
     """Retrieve messages with comment."""
-    raw_messages = session.exec(
-        select(Message)
-        .options(joinedload(Message.previous_message))
+    previous = aliased(Message)
+    columns = _message_columns(Message, preview_chars)
+    previous_columns = _message_columns(previous, preview_chars)
+    rows = session.exec(
+        select(*columns, *previous_columns)
+        # The upper bound on created_at lets each probe skip later partitions
+        .outerjoin(
+            previous,
+            (Message.previous_message_id == previous.id) & (previous.created_at <= Message.created_at),
+        )
         .where(
             (Message.comment_reaction.isnot(None)) | 
             (Message.comment_content.isnot(None))
@@ -117,13 +360,14 @@ def get_messages_with_comment(*, session: Session, limit: int, offset: int):
         .offset(offset)
     ).all()
 
-    messages = [
-        {
-            **to_dict(message),
-            "previous_message": to_dict(message.previous_message),
-        }
-        for message in raw_messages
-    ]
+    names = [column.key for column in columns]
+    width = len(names)
+    messages = []
+    for row in rows:
+        message = dict(zip(names, row[:width]))
+        # The previous message's id is NULL when there is none (outer join)
+        message["previous_message"] = dict(zip(names, row[width:])) if row[width] is not None else None
+        messages.append(message)
 
     total_count = session.exec(
         select(func.count())
@@ -139,11 +383,18 @@ def get_messages_with_comment(*, session: Session, limit: int, offset: int):
         "total": total_count
     }
 
-def get_message(*, session: Session, id: int):
-    statement = select(Message).where(Message.id == id)
-    message = session.exec(statement).first()
+def get_message(*, session: Session, id: int, created_at: datetime | None = None):
+    message = session.exec(_message_by_id(id, created_at)).first()
     return message
 
+def get_message_sources(*, session: Session, message_id: int):
+    """Ranked ``(rank, node_id, score)`` sources of an assistant message."""
+    return session.exec(
+        select(MessageSource.rank, MessageSource.node_id, MessageSource.score)
+        .where(MessageSource.message_id == message_id)
+        .order_by(MessageSource.rank)
+    ).all()
+
 def get_chatroom(*, session: Session, id: int):
     statement = select(Chatroom).where(Chatroom.id == id)
     chatroom = session.exec(statement).first()
@@ -1,5 +1,6 @@
+from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Optional, TypedDict
 
 from pydantic import BaseModel
 
@@ -14,3 +15,34 @@ class MessageCommentReactionEnum(str, Enum):
 class MessageCommentUpdateRequest(BaseModel):
   comment_reaction: Optional[MessageCommentReactionEnum] = None
   comment_content: Optional[str] = None
+  # The message's created_at as listed; narrows the lookup to its month's partition
+  created_at: Optional[datetime] = None
+
+# Lightweight list items: plain dicts built from selected row tuples and
+# rendered by ORJSONResponse without per-field validation
+
+class ChatroomListItem(TypedDict):
+  id: int
+  title: Optional[str]
+  description: Optional[str]
+  created_at: datetime
+  updated_at: datetime
+  last_message_at: Optional[datetime]
+  message_count: int
+  last_message_preview: Optional[str]
+
+class MessageListItem(TypedDict):
+  id: int
+  sender: str
+  content: str
+  chatroom_id: int
+  previous_message_id: Optional[int]
+  execution_time: Optional[int]
+  truncated: bool
+  comment_reaction: Optional[str]
+  comment_content: Optional[str]
+  created_at: datetime
+  updated_at: datetime
+
+class CommentedMessageListItem(MessageListItem):
+  previous_message: Optional[MessageListItem]
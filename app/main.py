@@ -1,72 +1,63 @@
-import sentry_sdk
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
-import pickle
 from contextlib import asynccontextmanager
-from llama_index.core.query_engine import RetrieverQueryEngine
-from llama_index.core.retrievers import VectorIndexRetriever
-from llama_index.core.response_synthesizers import get_response_synthesizer
-from llama_index.core.postprocessor import SimilarityPostprocessor
-from llama_index.core.prompts import PromptTemplate
-import os
 
+from app.api.deps import ServerStarting, server_starting_handler
 from app.api.router import api_router
+from app.core.admission import AdmissionController
+from app.core.bulk import BulkLimiter
+from app.core.coalescing import SingleFlight
 from app.core.config import settings
+from app.core.partitions import run_partition_maintenance
+from app.core.profiling import ProfileStore, ProfilingMiddleware, Sampler
+from app.core.startup import StartupState, load_models, load_models_in_background
 
-def custom_generate_unique_id(route: APIRoute) -> str:
-    return f"{route.tags[0]}-{route.name}"
-
-def initialize_retriever(index, similarity_top_k=5):
-    return VectorIndexRetriever(
-        index=index,
-        similarity_top_k=similarity_top_k,
-    )
+logging.basicConfig(level=settings.LOG_LEVEL)
 
-def initialize_synthesizer(llm):
-    qa_prompt_tmpl = (
-        "You are a helpful assistant. Below is some context retrieved from documents, followed by the chat history. "
-        "Please respond to the user's message using the provided context. Format your response as bullet points, "
-        "and after each statement, reference the original sentence from the context that supports it by saying (Ref: sentence).\n\n"
-        "Context:\n"
-        "---------------------\n"
-        "{context_str}\n"
-        "---------------------\n"
-        "Given the context information and not prior knowledge, "
-        "answer the query.\n"
-        "Query: {query_str}\n"
-        "Answer: "
-    )
-    qa_prompt = PromptTemplate(qa_prompt_tmpl)
-    return get_response_synthesizer(llm=llm, streaming=True, text_qa_template=qa_prompt)
+if settings.SENTRY_DSN:
+    # Imported only when error reporting is configured
+    import sentry_sdk  # noqa
 
-def initialize_query_engine(retriever, synthesizer):
-    return RetrieverQueryEngine(
-        retriever=retriever,
-        response_synthesizer=synthesizer,
-        node_postprocessors=[SimilarityPostprocessor(similarity_cutoff=0.7)],
-    )
+def custom_generate_unique_id(route: APIRoute) -> str:
+    return f"{route.tags[0]}-{route.name}"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Load preprocessed data and index during startup
-    artifacts_dir = os.path.join(os.path.dirname(__file__), '..', 'artifacts')
-    try:
-        with open(os.path.join(artifacts_dir, "index.pkl"), "rb") as f:
-            app.state.index = pickle.load(f)
-        with open(os.path.join(artifacts_dir, "llm.pkl"), "rb") as f:
-            app.state.llm = pickle.load(f)
+    app.state.startup = StartupState()
+    app.state.chat_flights = SingleFlight()
+    app.state.chat_admission = AdmissionController(
+        max_in_flight=settings.CHAT_MAX_IN_FLIGHT,
+        max_queue=settings.CHAT_MAX_QUEUE,
+        queue_timeout=settings.CHAT_QUEUE_TIMEOUT_SECONDS,
+    )
+    app.state.bulk_limiter = BulkLimiter.from_settings()
 
-        # Initialize retriever, synthesizer, and query engine
-        app.state.retriever = initialize_retriever(app.state.index)
-        app.state.synthesizer = initialize_synthesizer(app.state.llm)
-        app.state.query_engine = initialize_query_engine(app.state.retriever, app.state.synthesizer)
+    # Load preprocessed data and index, then warm the embedding model up
+    if settings.STARTUP_LOAD_IN_BACKGROUND:
+        # Serve liveness right away; readiness flips once loading finishes
+        load_models_in_background(app.state)
+    else:
+        try:
+            load_models(app.state)
+        except Exception as e:
+            raise RuntimeError("Failed to load preprocessed data and index") from e
 
-    except (FileNotFoundError, pickle.UnpicklingError) as e:
-        raise RuntimeError("Failed to load preprocessed data and index") from e
+    # Keep message partitions ahead of time and archive cold ones, unless
+    # this is left to the CLI (cron)
+    maintenance = None
+    if settings.MESSAGE_PARTITION_MAINTENANCE_ENABLED:
+        maintenance = asyncio.create_task(run_partition_maintenance(settings.MESSAGE_PARTITION_MAINTENANCE_SECONDS))
 
     yield
     # Perform any necessary cleanup during shutdown
+    if maintenance is not None:
+        maintenance.cancel()
+    app.state.bulk_limiter.close()
+    if getattr(app.state, "embed_batcher", None) is not None:
+        app.state.embed_batcher.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -85,4 +76,18 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+# Admin-only sampling profiler; without a token neither the middleware nor
+# the sampler exists, so profiling costs nothing
+if settings.PROFILING_ADMIN_TOKEN:
+    app.state.profiler = Sampler(interval=settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+    app.state.profiles = ProfileStore(max_entries=settings.PROFILING_MAX_STORED)
+    app.add_middleware(
+        ProfilingMiddleware,
+        sampler=app.state.profiler,
+        store=app.state.profiles,
+        admin_token=settings.PROFILING_ADMIN_TOKEN,
+        sample_rate=settings.PROFILING_REQUEST_SAMPLE_RATE,
+    )
+
+app.add_exception_handler(ServerStarting, server_starting_handler)
 app.include_router(api_router)
@@ -1,35 +1,113 @@
 from typing import Optional
 
 from pydantic import EmailStr
+from sqlalchemy import Column, Index, LargeBinary
 from sqlmodel import Field, Relationship, SQLModel
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 
 class BaseSQLModel(SQLModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False, sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)})
 
+# Characters of the latest message kept on the chatroom row for list previews
+CHATROOM_PREVIEW_CHARS = 200
+
 class Chatroom(BaseSQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     title: Optional[str] = Field(default=None)
     description: Optional[str] = Field(default=None)
+    # Denormalized from the messages, maintained by crud.create_message
+    last_message_at: Optional[datetime] = Field(default=None)
+    message_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    last_message_preview: Optional[str] = Field(default=None)
     messages: list["Message"] = Relationship(back_populates="chatroom")
 
+# Serves the "recent activity" ordering of the chatroom list
+Index(
+    "ix_chatroom_last_message_at",
+    Chatroom.last_message_at.desc().nullslast(),
+    Chatroom.id.desc(),
+)
+
 class Message(BaseSQLModel, table=True):
+    # Range-partitioned by month on created_at (see app.core.partitions): the
+    # database key is (id, created_at), and message ids cannot be referenced
+    # by foreign keys, so previous_message_id and message_source.message_id
+    # are plain indexed columns
     id: Optional[int] = Field(default=None, primary_key=True)
     sender: str
     content: str
     chatroom_id: int = Field(foreign_key="chatroom.id")
-    previous_message_id: Optional[int] = Field(
-        default=None,
-        foreign_key="message.id",
-        sa_column_kwargs={"unique": True}
-    )
+    previous_message_id: Optional[int] = Field(default=None, index=True)
     execution_time: Optional[int] = Field(default=None)
+    # Set when the client disconnected and only a partial answer was generated
+    truncated: bool = Field(default=False)
     comment_reaction: Optional[str] = Field(default=None)
     comment_content: Optional[str] = Field(default=None)
 
     chatroom: Chatroom = Relationship(back_populates="messages")
 
     previous_message: Optional["Message"] = Relationship(
-        sa_relationship_kwargs={"remote_side": "Message.id", "uselist": False}
-    )
\ No newline at end of file
+        sa_relationship_kwargs={
+            "primaryjoin": "remote(Message.id) == foreign(Message.previous_message_id)",
+            "uselist": False,
+            "viewonly": True,
+        }
+    )
+
+class MessageSource(SQLModel, table=True):
+    """A retrieved node an assistant answer was generated from; its text stays in the index."""
+    __tablename__ = "message_source"
+
+    message_id: int = Field(primary_key=True)
+    # 1-based position of the node among the answer's unique sources
+    rank: int = Field(primary_key=True)
+    node_id: str
+    score: Optional[float] = Field(default=None)
+
+class MessageArchive(SQLModel, table=True):
+    """A monthly message partition moved to a Parquet file by app.core.partitions."""
+    __tablename__ = "message_archive"
+
+    partition_name: str = Field(primary_key=True)
+    range_start: datetime
+    range_end: datetime
+    path: str
+    row_count: int
+    archived_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False)
+
+# Lower bounds (seconds) of the answer-latency buckets in feedback_latency;
+# the last bucket is open-ended
+FEEDBACK_LATENCY_BUCKETS = (0, 1, 2, 5, 10, 20, 30, 60)
+
+class FeedbackDaily(SQLModel, table=True):
+    """Reactions per day the answer was given, maintained by crud.update_message_comment."""
+    __tablename__ = "feedback_daily"
+
+    day: date = Field(primary_key=True)
+    reaction: str = Field(primary_key=True)
+    count: int = Field(default=0)
+
+class FeedbackLatency(SQLModel, table=True):
+    """Reactions per day and answer-latency bucket, maintained by crud.update_message_comment."""
+    __tablename__ = "feedback_latency"
+
+    day: date = Field(primary_key=True)
+    reaction: str = Field(primary_key=True)
+    latency_bucket: int = Field(primary_key=True)
+    count: int = Field(default=0)
+
+class CacheEntry(SQLModel, table=True):
+    """An entry of app.core.cache.PostgresCache; UNLOGGED, so it is emptied after a crash."""
+    __tablename__ = "cache_entry"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    cache: str = Field(primary_key=True)
+    key: str = Field(primary_key=True)
+    # Encoded by app.core.cache.encode_value
+    value: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    expires_at: Optional[float] = Field(default=None)
+    accessed_at: float
+
+# Eviction order of each cache
+Index("ix_cache_entry_accessed_at", CacheEntry.cache, CacheEntry.accessed_at)
@@ -1,6 +1,7 @@
 from math import ceil
 from typing import List
-import re
+
+from app.core.text_cleaner import get_text_cleaner
 
 def get_pagination_info(total: int, limit: int, offset: int):
     """
@@ -21,20 +22,8 @@ def to_dict(obj, exclude_fields: List[str] = []):
 def clean_text(text):
     """
     Clean the extracted text by removing headers, page numbers, and references.
+
+    The rules come from ``CLEAN_TEXT_RULES_PATH`` (or the built-in defaults)
+    and are compiled once per process.
     """
-    # Remove headers like "BIOM 255 (Leffert) - Discussion Feb. 1, 2007"
-    text = re.sub(r'BIOM 255 \(Leffert\) - Discussion Feb\. 1, 2007', '', text)
-    
-    # Remove page numbers (e.g., "Page 1 of 10" if present)
-    text = re.sub(r'Page \d+ of \d+', '', text)
-    
-    # Remove lines that are entirely in uppercase (likely headers)
-    text = re.sub(r'^[A-Z\s]+$', '', text, flags=re.MULTILINE)
-    
-    # Remove references section (heuristic: starts with "REFERENCES AND NOTES")
-    text = re.split(r'\nREFERENCES AND NOTES\n', text)[0]
-    
-    # Remove extra whitespace and empty lines
-    text = re.sub(r'\n+', '\n', text).strip()
-    
-    return text
\ No newline at end of file
+    return get_text_cleaner().clean(text)
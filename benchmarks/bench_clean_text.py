@@ -0,0 +1,69 @@
+"""
+Micro-benchmark for text cleaning throughput.
+
+Compares the original five-pass ``clean_text`` implementation against the
+precompiled ``TextCleaner`` (single document and parallel ``clean_many``) on
+the text of a PDF, reporting MB/s.
+
+    python benchmarks/bench_clean_text.py --pdf medical.pdf --repeat 50 --scale 20
+"""
+import argparse
+import os
+import re
+import time
+
+import fitz  # PyMuPDF
+
+from app.core.text_cleaner import get_text_cleaner
+
+
+def legacy_clean_text(text):
+    """The implementation clean_text used before the rule engine."""
+    text = re.sub(r'BIOM 255 \(Leffert\) - Discussion Feb\. 1, 2007', '', text)
+    text = re.sub(r'Page \d+ of \d+', '', text)
+    text = re.sub(r'^[A-Z\s]+$', '', text, flags=re.MULTILINE)
+    text = re.split(r'\nREFERENCES AND NOTES\n', text)[0]
+    text = re.sub(r'\n+', '\n', text).strip()
+    return text
+
+
+def load_pages(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return [page.get_text("text") for page in doc]
+
+
+def throughput(fn, pages, repeat):
+    size_mb = sum(len(page.encode()) for page in pages) / 1e6
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(pages)
+    elapsed = time.perf_counter() - start
+    return size_mb * repeat / elapsed
+
+
+def main():
+    default_pdf = os.path.join(os.path.dirname(__file__), "..", "medical.pdf")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=default_pdf)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--scale", type=int, default=20, help="Replicate the pages to simulate a larger corpus.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    pages = load_pages(args.pdf) * args.scale
+    cleaner = get_text_cleaner()
+
+    mismatches = sum(legacy_clean_text(page) != cleaner.clean(page) for page in pages)
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / 1e6:.2f} MB of text, {mismatches} pages differ from legacy output")
+
+    results = {
+        "legacy": throughput(lambda ps: [legacy_clean_text(p) for p in ps], pages, args.repeat),
+        "compiled": throughput(lambda ps: [cleaner.clean(p) for p in ps], pages, args.repeat),
+        "compiled_parallel": throughput(lambda ps: cleaner.clean_many(ps, workers=args.workers), pages, max(1, args.repeat // 10)),
+    }
+    for name, mb_per_s in results.items():
+        print(f"{name:>18}: {mb_per_s:8.2f} MB/s ({mb_per_s / results['legacy']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
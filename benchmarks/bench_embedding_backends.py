@@ -0,0 +1,69 @@
+"""
+Benchmark for embedding inference backends.
+
+For each backend (torch, ONNX Runtime, dynamically int8-quantized ONNX)
+reports single-query latency (the chat critical path), batch throughput
+(the preprocess path) and cosine agreement with the torch embeddings of the
+same texts.
+
+    python benchmarks/bench_embedding_backends.py --queries 200 --batch-size 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.embeddings import EMBEDDING_BACKENDS, VALIDATION_TEXTS, cosine_agreement, create_embed_model
+
+
+def query_latencies(embed_model, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embed_model.get_query_embedding(query)
+        latencies.append(time.perf_counter() - start)
+    return np.asarray(latencies) * 1000
+
+
+def batch_throughput(embed_model, texts, batch_size):
+    embed_model.embed_batch_size = batch_size
+    start = time.perf_counter()
+    embeddings = embed_model.get_text_embedding_batch(texts)
+    return len(texts) / (time.perf_counter() - start), embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.HUGGING_FACE_EMBEDDING_MODEL_NAME)
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--texts", type=int, default=1024)
+    args = parser.parse_args()
+
+    queries = [f"{VALIDATION_TEXTS[i % 3]} ({i})" for i in range(args.queries)]
+    texts = [f"{VALIDATION_TEXTS[i % len(VALIDATION_TEXTS)]} ({i})" for i in range(args.texts)]
+
+    reference = None
+    for backend in args.backends:
+        embed_model = create_embed_model(args.model, backend)
+        # The first call pays for graph setup and allocator warm-up
+        embed_model.get_query_embedding("warm-up")
+
+        latencies = query_latencies(embed_model, queries)
+        texts_per_s, embeddings = batch_throughput(embed_model, texts, args.batch_size)
+        if backend == "torch":
+            reference = embeddings
+        agreement = cosine_agreement(reference, embeddings) if reference is not None else None
+
+        print(
+            f"{backend:>10}: query p50 {np.percentile(latencies, 50):7.2f} ms"
+            f"  p95 {np.percentile(latencies, 95):7.2f} ms"
+            f"  batch {texts_per_s:8.1f} texts/s"
+            + (f"  cosine vs torch min {agreement.min():.4f} mean {agreement.mean():.4f}" if agreement is not None else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
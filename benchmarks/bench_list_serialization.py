@@ -0,0 +1,147 @@
+"""
+Per-page cost of the list endpoints' serialization.
+
+Builds one page of messages (``--page-size`` rows with ``--content-chars``
+of content each) and times the previous and current ways of turning it
+into a response body:
+
+  orm_jsonable      SQLModel entities through jsonable_encoder + JSONResponse
+                    (GET /chatrooms/{id}/messages before)
+  orm_to_dict       to_dict per entity and previous message + JSONResponse
+                    (GET /chatrooms/messages/comments before)
+  tuples_orjson     row tuples zipped into dicts + ORJSONResponse (now)
+  tuples_preview    same with content cut to --preview-chars (?preview_chars=)
+
+With ``--database`` the query is included: a page of ORM entities against
+a page of selected columns from the seeded chatrooms
+(``benchmarks/load/seed.py``).
+
+    python benchmarks/bench_list_serialization.py --page-size 100 --content-chars 8000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.crud import _message_columns
+from app.models import Message
+from app.utils import to_dict
+
+COLUMN_NAMES = [column.key for column in _message_columns(Message)]
+
+
+def make_page(page_size, content_chars):
+    now = datetime.now(timezone.utc)
+    content = ("Amplification of the HER-2/neu gene was a significant predictor of relapse. " * (content_chars // 76 + 1))[:content_chars]
+    messages = []
+    for i in range(page_size):
+        question = Message(id=2 * i + 1, sender="USER", content="Which oncogene predicts relapse?", chatroom_id=1,
+                           created_at=now - timedelta(minutes=i), updated_at=now)
+        answer = Message(id=2 * i + 2, sender="ASSISTANT", content=content, chatroom_id=1,
+                         previous_message_id=question.id, execution_time=3, comment_reaction="LIKE",
+                         created_at=now - timedelta(minutes=i), updated_at=now)
+        answer.previous_message = question
+        messages.append(answer)
+    return messages
+
+
+def as_row(message, preview_chars=None):
+    content = message.content if preview_chars is None else message.content[:preview_chars]
+    return tuple(content if name == "content" else getattr(message, name) for name in COLUMN_NAMES)
+
+
+def page_body(data):
+    return {"data": data, "pagination": {"count": len(data), "total": 10_000, "page": 1, "pageCount": 100}}
+
+
+def orm_jsonable(messages, rows):
+    return JSONResponse(jsonable_encoder(page_body(messages))).body
+
+
+def orm_to_dict(messages, rows):
+    data = [{**to_dict(message), "previous_message": to_dict(message.previous_message)} for message in messages]
+    return JSONResponse(jsonable_encoder(page_body(data))).body
+
+
+def tuples_orjson(messages, rows):
+    return ORJSONResponse(page_body([dict(zip(COLUMN_NAMES, row)) for row in rows])).body
+
+
+def timed(fn, messages, rows, repeat):
+    body = fn(messages, rows)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(messages, rows)
+    return 1000 * (time.perf_counter() - start) / repeat, len(body)
+
+
+def bench_database(page_size, repeat):
+    from sqlmodel import Session, desc, select
+
+    from app.core.db import engine
+    from app.models import Chatroom
+
+    columns = _message_columns(Message)
+    with Session(engine) as session:
+        chatroom_id = session.exec(
+            select(Chatroom.id).where(Chatroom.title.startswith("[loadtest]")).limit(1)
+        ).first()
+        if chatroom_id is None:
+            print("No seeded chatrooms; run benchmarks/load/seed.py first")
+            return
+
+        def orm():
+            session.expunge_all()
+            messages = session.exec(
+                select(Message).where(Message.chatroom_id == chatroom_id)
+                .order_by(desc(Message.created_at)).limit(page_size)
+            ).all()
+            return JSONResponse(jsonable_encoder(page_body(messages))).body
+
+        def tuples():
+            rows = session.exec(
+                select(*columns).where(Message.chatroom_id == chatroom_id)
+                .order_by(desc(Message.created_at)).limit(page_size)
+            ).all()
+            return ORJSONResponse(page_body([dict(zip(COLUMN_NAMES, row)) for row in rows])).body
+
+        for name, fn in (("db_orm_jsonable", orm), ("db_tuples_orjson", tuples)):
+            fn()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fn()
+            print(f"{name:>18}: {1000 * (time.perf_counter() - start) / repeat:8.3f} ms/page")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--content-chars", type=int, default=8000)
+    parser.add_argument("--preview-chars", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--database", action="store_true", help="Also time query + serialization against Postgres.")
+    args = parser.parse_args()
+
+    messages = make_page(args.page_size, args.content_chars)
+    rows = [as_row(message) for message in messages]
+    preview_rows = [as_row(message, args.preview_chars) for message in messages]
+
+    baseline = None
+    for name, fn, page_rows in (
+        ("orm_jsonable", orm_jsonable, rows),
+        ("orm_to_dict", orm_to_dict, rows),
+        ("tuples_orjson", tuples_orjson, rows),
+        ("tuples_preview", tuples_orjson, preview_rows),
+    ):
+        ms, size = timed(fn, messages, page_rows, args.repeat)
+        baseline = baseline or ms
+        print(f"{name:>18}: {ms:8.3f} ms/page  {size / 1e3:9.1f} KB  ({baseline / ms:5.1f}x)")
+
+    if args.database:
+        bench_database(args.page_size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Retrieval micro-benchmark across retriever implementations and corpus sizes.
+
+Generates synthetic corpora (clustered 768-dim embeddings with typed
+nodes) and, per size and retriever, records build time, memory footprint
+and per-query time split into vector scan and postprocessing (node fetch
+plus the serving SimilarityPostprocessor). Query embedding is timed
+separately with the real model because it does not depend on corpus size.
+
+Retrievers:
+  vector_index      VectorIndexRetriever over an in-memory VectorStoreIndex (pickle mode)
+  store_<dtype>     EmbeddingStoreRetriever over the on-disk store (float32/float16/int8)
+  store_int8_rescore  int8 scan with float32 re-scoring of the top candidates
+  store_filtered    float32 store restricted to one node_type (filtered mode)
+  batch             BatchRetriever, amortized per query over a batch
+  pgvector_exact / pgvector_hnsw
+                    Postgres sequential and HNSW search (only with --pgvector-dsn)
+
+    python benchmarks/bench_retrieval.py --sizes 10000 100000 1000000 --output results/retrieval.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from llama_index.core import VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.postprocessor import SimilarityPostprocessor
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores import VectorStoreQuery
+
+from app.core.batch_retrieval import BatchRetriever
+from app.core.config import settings
+from app.core.embedding_store import NODE_TYPES, EmbeddingStore, EmbeddingStoreWriter
+
+DIM = 768
+TOP_K = 5
+# Share of text / table / figure nodes in the synthetic corpus
+NODE_TYPE_WEIGHTS = (0.85, 0.1, 0.05)
+GENERATE_CHUNK = 50_000
+
+
+def rss_bytes():
+    """Resident set size of this process (Linux), or None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def synthetic_chunks(size, rng, clusters=256):
+    """Yield ``(start, embeddings, node_types)`` blocks of a clustered synthetic corpus."""
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    for start in range(0, size, GENERATE_CHUNK):
+        count = min(GENERATE_CHUNK, size - start)
+        assignment = rng.integers(0, clusters, count)
+        embeddings = centers[assignment] + 0.5 * rng.standard_normal((count, DIM)).astype(np.float32)
+        node_types = rng.choice(NODE_TYPES, size=count, p=NODE_TYPE_WEIGHTS)
+        yield start, embeddings, node_types
+
+
+def make_nodes(start, embeddings, node_types, with_embedding=False):
+    return [
+        TextNode(
+            id_=f"node-{start + i}",
+            text=f"Synthetic chunk {start + i}",
+            metadata={"node_type": str(node_type)},
+            embedding=embedding.tolist() if with_embedding else None,
+        )
+        for i, (embedding, node_type) in enumerate(zip(embeddings, node_types))
+    ]
+
+
+def time_queries(queries, scan, post):
+    scan_times, post_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = scan(query)
+        scanned = time.perf_counter()
+        post(query, hits)
+        scan_times.append(scanned - start)
+        post_times.append(time.perf_counter() - scanned)
+    return {
+        "scan_ms_p50": 1000 * float(np.percentile(scan_times, 50)),
+        "scan_ms_p95": 1000 * float(np.percentile(scan_times, 95)),
+        "post_ms_p50": 1000 * float(np.percentile(post_times, 50)),
+    }
+
+
+def postprocess(nodes_with_scores):
+    return SimilarityPostprocessor(similarity_cutoff=0.7).postprocess_nodes(nodes_with_scores)
+
+
+def bench_vector_index(size, seed, queries):
+    rng = np.random.default_rng(seed)
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    nodes = []
+    for chunk_start, embeddings, node_types in synthetic_chunks(size, rng):
+        nodes.extend(make_nodes(chunk_start, embeddings, node_types, with_embedding=True))
+    # Nodes carrying embeddings are inserted without calling the embed model;
+    # the mock only keeps llama_index from resolving a default one
+    index = VectorStoreIndex(nodes=nodes, embed_model=MockEmbedding(embed_dim=DIM))
+    build_seconds = time.perf_counter() - start
+    rss_after = rss_bytes()
+
+    def scan(query):
+        return index.vector_store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=TOP_K))
+
+    def post(query, result):
+        return postprocess([
+            NodeWithScore(node=index.docstore.get_node(node_id), score=score)
+            for node_id, score in zip(result.ids, result.similarities)
+        ])
+
+    return {"build_seconds": build_seconds, "memory_bytes": rss_after - rss_before if rss_before else None,
+            **time_queries(queries, scan, post)}
+
+
+def build_store(size, seed, path, dtype):
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    writer = EmbeddingStoreWriter(path, model_name="synthetic", dtype=dtype)
+    for chunk_start, embeddings, node_types in synthetic_chunks(size, rng):
+        writer.append(make_nodes(chunk_start, embeddings, node_types), embeddings)
+    writer.close()
+    return EmbeddingStore(path), time.perf_counter() - start
+
+
+def bench_store(store, build_seconds, queries, node_types=None, rescore_factor=0):
+    def scan(query):
+        return store.search(query, TOP_K, node_types, rescore_factor)
+
+    def post(query, hits):
+        return postprocess([NodeWithScore(node=store.node(shard, row), score=score) for score, shard, row in hits])
+
+    # Touch every page once so the scan is timed warm, as in a serving process
+    scan(queries[0])
+    return {"build_seconds": build_seconds, "memory_bytes": store.nbytes, **time_queries(queries, scan, post)}
+
+
+def bench_batch(store, queries):
+    start = time.perf_counter()
+    retriever = BatchRetriever.from_store(store)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    indices, _ = retriever.search(queries, TOP_K)
+    scan_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for row in indices:
+        postprocess([NodeWithScore(node=retriever.node(i), score=1.0) for i in row])
+    post_seconds = time.perf_counter() - start
+    return {
+        "build_seconds": build_seconds,
+        "memory_bytes": retriever.nbytes,
+        "scan_ms_p50": 1000 * scan_seconds / len(queries),
+        "scan_ms_p95": None,
+        "post_ms_p50": 1000 * post_seconds / len(queries),
+    }
+
+
+def bench_pgvector(dsn, size, seed, queries, hnsw):
+    import psycopg
+
+    rng = np.random.default_rng(seed)
+    table = "bench_retrieval_chunk"
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} (id bigint PRIMARY KEY, node_type text, embedding vector({DIM}))")
+        start = time.perf_counter()
+        with conn.cursor().copy(f"COPY {table} (id, node_type, embedding) FROM STDIN") as copy:
+            for chunk_start, embeddings, node_types in synthetic_chunks(size, rng):
+                for i, (embedding, node_type) in enumerate(zip(embeddings, node_types)):
+                    copy.write_row((chunk_start + i, str(node_type), "[" + ",".join(map(str, embedding)) + "]"))
+        if hnsw:
+            conn.execute(f"CREATE INDEX ON {table} USING hnsw (embedding vector_cosine_ops)")
+        conn.execute(f"ANALYZE {table}")
+        build_seconds = time.perf_counter() - start
+        memory_bytes = conn.execute(f"SELECT pg_total_relation_size('{table}')").fetchone()[0]
+
+        def scan(query):
+            literal = "[" + ",".join(map(str, query)) + "]"
+            return conn.execute(
+                f"SELECT id, 1 - (embedding <=> %s::vector) FROM {table} ORDER BY embedding <=> %s::vector LIMIT {TOP_K}",
+                (literal, literal),
+            ).fetchall()
+
+        def post(query, rows):
+            return postprocess([NodeWithScore(node=TextNode(id_=f"node-{i}", text=""), score=s) for i, s in rows])
+
+        result = {"build_seconds": build_seconds, "memory_bytes": memory_bytes, **time_queries(queries, scan, post)}
+        conn.execute(f"DROP TABLE {table}")
+    return result
+
+
+def bench_query_embedding(model_name, repeat=50):
+    from app.core.embeddings import create_embed_model
+
+    embed_model = create_embed_model(model_name)
+    embed_model.get_query_embedding("warm-up")
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        embed_model.get_query_embedding(f"Which oncogene correlates with relapse in breast cancer? ({i})")
+        times.append(time.perf_counter() - start)
+    return {"p50_ms": 1000 * float(np.percentile(times, 50)), "p95_ms": 1000 * float(np.percentile(times, 95))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-vector-index-size", type=int, default=100_000,
+                        help="Skip VectorIndexRetriever above this size (it holds every vector as a Python list).")
+    parser.add_argument("--embed-model", default=settings.HUGGING_FACE_EMBEDDING_MODEL_NAME,
+                        help="Model for the query embedding timing; pass an empty string to skip.")
+    parser.add_argument("--pgvector-dsn", help="Also benchmark pgvector (needs the vector extension).")
+    parser.add_argument("--output", help="Write results as JSON.")
+    args = parser.parse_args()
+
+    report = {"dim": DIM, "top_k": TOP_K, "query_embedding": None, "results": []}
+    if args.embed_model:
+        report["query_embedding"] = bench_query_embedding(args.embed_model)
+        print(f"query embedding: {report['query_embedding']}")
+
+    queries = np.random.default_rng(args.seed + 1).standard_normal((args.queries, DIM)).astype(np.float32)
+    for size in args.sizes:
+        cases = {}
+        if size <= args.max_vector_index_size:
+            cases["vector_index"] = bench_vector_index(size, args.seed, queries)
+        with tempfile.TemporaryDirectory() as tmp:
+            for dtype in ("float32", "float16", "int8"):
+                store, build_seconds = build_store(size, args.seed, os.path.join(tmp, dtype), dtype)
+                cases[f"store_{dtype}"] = bench_store(store, build_seconds, queries)
+                if dtype == "int8":
+                    cases["store_int8_rescore"] = bench_store(
+                        store, build_seconds, queries, rescore_factor=settings.EMBEDDING_STORE_RESCORE_FACTOR
+                    )
+                if dtype == "float32":
+                    cases["store_filtered"] = bench_store(store, build_seconds, queries, node_types=["table"])
+                    cases["batch"] = bench_batch(store, queries)
+        if args.pgvector_dsn:
+            cases["pgvector_exact"] = bench_pgvector(args.pgvector_dsn, size, args.seed, queries, hnsw=False)
+            cases["pgvector_hnsw"] = bench_pgvector(args.pgvector_dsn, size, args.seed, queries, hnsw=True)
+
+        for name, result in cases.items():
+            report["results"].append({"size": size, "retriever": name, **result})
+            memory = f"{result['memory_bytes'] / 1e6:9.1f} MB" if result["memory_bytes"] is not None else "      n/a"
+            print(f"{size:>9} {name:>20}: build {result['build_seconds']:8.2f}s  {memory}  "
+                  f"scan p50 {result['scan_ms_p50']:8.2f} ms  post p50 {result['post_ms_p50']:6.2f} ms")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark for semantic chunking throughput.
+
+Splits the cleaned pages of a PDF with llama_index's
+``SemanticSplitterNodeParser`` (one document per call, as ingest used to)
+and with ``VectorizedSemanticSplitter`` (a batch of documents per call),
+reporting pages/s and how many pages were chunked differently.
+
+    python benchmarks/bench_semantic_splitter.py --pdf medical.pdf --batch-size 32
+"""
+import argparse
+import os
+import sys
+import time
+
+import fitz  # PyMuPDF
+from llama_index.core import Document
+from llama_index.core.node_parser import SemanticSplitterNodeParser
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from app.core.config import settings
+from app.core.text_cleaner import get_text_cleaner
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "preprocess"))
+from semantic_splitter import VectorizedSemanticSplitter  # noqa: E402
+
+
+def load_documents(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        pages = [page.get_text("text") for page in doc]
+    return [Document(text=text) for text in get_text_cleaner().clean_many(pages)]
+
+
+def chunk_texts(nodes_per_document):
+    return [[node.get_content() for node in nodes] for nodes in nodes_per_document]
+
+
+def main():
+    default_pdf = os.path.join(os.path.dirname(__file__), "..", "medical.pdf")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=default_pdf)
+    parser.add_argument("--batch-size", type=int, default=32, help="Documents per vectorized splitter call.")
+    args = parser.parse_args()
+
+    documents = load_documents(args.pdf)
+    embed_model = HuggingFaceEmbedding(model_name=settings.HUGGING_FACE_EMBEDDING_MODEL_NAME)
+    # Warm the model up so the first timed run does not pay for loading it
+    embed_model.get_text_embedding("warm-up")
+
+    reference = SemanticSplitterNodeParser(embed_model=embed_model, breakpoint_percentile_threshold=95, buffer_size=1)
+    vectorized = VectorizedSemanticSplitter(embed_model=embed_model, breakpoint_percentile_threshold=95, buffer_size=1)
+
+    start = time.perf_counter()
+    expected = chunk_texts(reference.get_nodes_from_documents([doc]) for doc in documents)
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = []
+    for i in range(0, len(documents), args.batch_size):
+        batch = documents[i:i + args.batch_size]
+        nodes = vectorized.get_nodes_from_documents(batch)
+        for doc in batch:
+            actual.append([node for node in nodes if node.ref_doc_id == doc.doc_id])
+    actual = chunk_texts(actual)
+    vectorized_seconds = time.perf_counter() - start
+
+    mismatches = sum(a != e for a, e in zip(actual, expected))
+    print(f"{len(documents)} pages, {mismatches} chunked differently from SemanticSplitterNodeParser")
+    for name, seconds in (("reference", reference_seconds), ("vectorized", vectorized_seconds)):
+        print(f"{name:>10}: {len(documents) / seconds:8.2f} pages/s ({reference_seconds / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Concurrent SSE load generator for ``POST /chatrooms/{id}/chat``.
+
+Keeps ``--concurrency`` chat streams open at once against the seeded
+chatrooms until ``--requests`` have completed (or ``--duration`` seconds
+have passed), and samples ``/utils/metrics`` meanwhile. Reports
+throughput, time to first token, gap between streamed frames, total
+latency, error rate and DB pool / admission saturation, and saves
+everything as JSON. With ``--baseline`` the headline numbers are compared
+against an earlier run.
+
+    python benchmarks/load/chat_load.py --chatrooms-file loadtest-chatrooms.json \
+        --concurrency 64 --requests 2000 --output results/load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "evaluations"))
+from dataset import load_dataset  # noqa: E402
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(__file__), "..", "..", "evaluations", "llamaindextestset.jsonl")
+
+# Metrics sampled from /utils/metrics during the run
+SAMPLED_GAUGES = ("db_pool_checked_out", "db_pool_capacity", "chat_generations_in_flight", "chat_admission_queue_depth")
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]
+
+    return {
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": ordered[-1],
+        "mean": sum(ordered) / len(ordered),
+    }
+
+
+async def run_chat(client, chatroom_id, question, timeout):
+    """One chat request; returns timings in seconds and an error label (or None)."""
+    result = {"chatroom_id": chatroom_id, "status": None, "error": None, "ttft": None, "gaps": [], "total": None}
+    start = time.perf_counter()
+    last_frame = None
+    try:
+        async with client.stream(
+            "POST", f"/chatrooms/{chatroom_id}/chat", json={"message": question}, timeout=timeout
+        ) as response:
+            result["status"] = response.status_code
+            if response.status_code != 200:
+                result["error"] = f"http_{response.status_code}"
+                await response.aread()
+                return result
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue  # Blank separators and keep-alive comments
+                event = json.loads(line[len("data: "):])
+                now = time.perf_counter()
+                if event.get("type") == "message":
+                    if result["ttft"] is None:
+                        result["ttft"] = now - start
+                    elif last_frame is not None:
+                        result["gaps"].append(now - last_frame)
+                    last_frame = now
+                elif event.get("type") == "error" or (event.get("type") == "done" and event.get("content")):
+                    result["error"] = "stream_error"
+                elif event.get("type") == "done":
+                    break
+    except httpx.TimeoutException:
+        result["error"] = "timeout"
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+    result["total"] = time.perf_counter() - start
+    return result
+
+
+async def sample_metrics(client, interval, samples, stop):
+    while not stop.is_set():
+        try:
+            response = await client.get("/utils/metrics", timeout=interval * 4)
+            sample = {"t": time.time()}
+            for line in response.text.splitlines():
+                name, _, value = line.partition(" ")
+                if name in SAMPLED_GAUGES:
+                    sample[name] = float(value)
+            samples.append(sample)
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def summarize_pool(samples):
+    checked_out = [s["db_pool_checked_out"] for s in samples if "db_pool_checked_out" in s]
+    capacity = next((s["db_pool_capacity"] for s in samples if s.get("db_pool_capacity")), None)
+    summary = {
+        "samples": len(samples),
+        "capacity": capacity,
+        "checked_out": percentiles(checked_out),
+        "in_flight": percentiles([s["chat_generations_in_flight"] for s in samples if "chat_generations_in_flight" in s]),
+        "admission_queue": percentiles([s["chat_admission_queue_depth"] for s in samples if "chat_admission_queue_depth" in s]),
+    }
+    if capacity and checked_out:
+        # Share of samples with every pooled connection in use
+        summary["saturated_fraction"] = sum(value >= capacity for value in checked_out) / len(checked_out)
+    return summary
+
+
+async def run(args):
+    with open(args.chatrooms_file) as f:
+        chatroom_ids = json.load(f)["chatroom_ids"]
+    questions = [query.query for query in load_dataset(args.questions)]
+    rng = random.Random(args.seed)
+
+    results = []
+    samples = []
+    stop = asyncio.Event()
+    issued = 0
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits) as client:
+
+        async def worker():
+            nonlocal issued
+            while issued < args.requests and (deadline is None or time.monotonic() < deadline):
+                issued += 1
+                question = rng.choice(questions)
+                if args.distinct_questions:
+                    # Defeat request coalescing so every stream costs one generation
+                    question = f"{question} (#{issued})"
+                results.append(await run_chat(client, rng.choice(chatroom_ids), question, args.timeout))
+
+        sampler = asyncio.create_task(sample_metrics(client, args.sample_interval, samples, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    errors = Counter(result["error"] for result in results if result["error"])
+    ok = [result for result in results if not result["error"]]
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "git_commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - elapsed)),
+        "elapsed_seconds": elapsed,
+        "requests": len(results),
+        "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "errors": dict(errors),
+        "ttft_seconds": percentiles([result["ttft"] for result in ok if result["ttft"] is not None]),
+        "inter_frame_seconds": percentiles([gap for result in ok for gap in result["gaps"]]),
+        "total_seconds": percentiles([result["total"] for result in ok]),
+        "pool": summarize_pool(samples),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print relative change of the headline numbers against a previous report."""
+    rows = [("throughput_rps", None)] + [
+        (metric, q) for metric in ("ttft_seconds", "inter_frame_seconds", "total_seconds") for q in ("p50", "p95", "p99")
+    ] + [("error_rate", None)]
+    for metric, q in rows:
+        current = report[metric][q] if q else report[metric]
+        previous = (baseline.get(metric) or {}).get(q) if q else baseline.get(metric)
+        if current is None or previous is None:
+            continue
+        change = (current - previous) / previous * 100 if previous else 0.0
+        label = f"{metric}.{q}" if q else metric
+        print(f"{label:>26}: {previous:10.4f} -> {current:10.4f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--chatrooms-file", default="loadtest-chatrooms.json")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="Evaluation dataset whose queries are asked.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--duration", type=float, help="Stop issuing requests after this many seconds.")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--distinct-questions", action="store_true")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join("results", f"load-{time.strftime('%Y%m%d-%H%M%S')}.json"))
+    parser.add_argument("--baseline", help="Earlier report to compare against.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{report['requests']} requests in {report['elapsed_seconds']:.1f}s "
+          f"({report['throughput_rps']:.2f} req/s), error rate {report['error_rate']:.2%} {report['errors']}")
+    for metric in ("ttft_seconds", "inter_frame_seconds", "total_seconds"):
+        if report[metric]:
+            print(f"{metric:>20}: " + "  ".join(f"{q} {report[metric][q] * 1000:8.1f} ms" for q in ("p50", "p95", "p99")))
+    pool = report["pool"]
+    if pool.get("checked_out"):
+        print(f"{'db pool':>20}: max {pool['checked_out']['max']:.0f}/{pool['capacity']:.0f} checked out, "
+              f"saturated {pool.get('saturated_fraction', 0):.1%} of samples")
+    print(f"Report saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Seed Postgres with chatrooms and message history for load tests.
+
+Creates ``--chatrooms`` chatrooms titled ``[loadtest] N`` with
+``--turns`` user/assistant message pairs each (spread over the last
+``--days`` days) and writes their ids to ``--output`` for ``chat_load.py``.
+``--reset`` first deletes everything a previous seed created.
+
+    python benchmarks/load/seed.py --chatrooms 1000 --turns 20 --output loadtest-chatrooms.json
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, delete, select
+
+from app.core.db import engine
+from app.dto_models.chatroom import MessageSenderEnum
+from app.models import CHATROOM_PREVIEW_CHARS, Chatroom, Message
+
+TITLE_PREFIX = "[loadtest]"
+
+# Chatrooms committed per transaction
+SEED_BATCH_SIZE = 100
+
+
+def reset(session):
+    chatroom_ids = select(Chatroom.id).where(Chatroom.title.startswith(TITLE_PREFIX))
+    session.exec(delete(Message).where(Message.chatroom_id.in_(chatroom_ids)))
+    session.exec(delete(Chatroom).where(Chatroom.title.startswith(TITLE_PREFIX)))
+    session.commit()
+
+
+def seed_batch(session, first, count, turns, days, rng):
+    now = datetime.now(timezone.utc)
+    chatrooms = [
+        Chatroom(title=f"{TITLE_PREFIX} {first + i}", description="Seeded load-test chatroom")
+        for i in range(count)
+    ]
+    session.add_all(chatrooms)
+    session.flush()
+
+    # User messages first so assistant replies can reference their ids
+    turns_by_chatroom = []
+    for chatroom in chatrooms:
+        started = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        user_messages = [
+            Message(
+                sender=MessageSenderEnum.USER,
+                content=f"Seeded question {turn} about gene amplification and relapse?",
+                chatroom_id=chatroom.id,
+                created_at=started + timedelta(minutes=2 * turn),
+            )
+            for turn in range(turns)
+        ]
+        session.add_all(user_messages)
+        turns_by_chatroom.append(user_messages)
+    session.flush()
+
+    for chatroom, user_messages in zip(chatrooms, turns_by_chatroom):
+        answers = [
+            Message(
+                sender=MessageSenderEnum.ASSISTANT,
+                content="- Seeded answer citing the context (Ref: seeded sentence).",
+                chatroom_id=user_message.chatroom_id,
+                previous_message_id=user_message.id,
+                execution_time=rng.randint(1, 10),
+                created_at=user_message.created_at + timedelta(seconds=30),
+            )
+            for user_message in user_messages
+        ]
+        session.add_all(answers)
+        # Denormalized activity, as crud.create_turn maintains it
+        chatroom.message_count = 2 * turns
+        if answers:
+            chatroom.last_message_at = answers[-1].created_at
+            chatroom.last_message_preview = answers[-1].content[:CHATROOM_PREVIEW_CHARS]
+    session.commit()
+    return [chatroom.id for chatroom in chatrooms]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chatrooms", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true")
+    parser.add_argument("--output", default="loadtest-chatrooms.json")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chatroom_ids = []
+    with Session(engine) as session:
+        if args.reset:
+            reset(session)
+        for first in range(0, args.chatrooms, SEED_BATCH_SIZE):
+            count = min(SEED_BATCH_SIZE, args.chatrooms - first)
+            chatroom_ids.extend(seed_batch(session, first, count, args.turns, args.days, rng))
+
+    with open(args.output, "w") as f:
+        json.dump({"chatroom_ids": chatroom_ids}, f)
+    print(f"Seeded {len(chatroom_ids)} chatrooms with {args.turns} turns each; ids in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Stub OpenAI-compatible LLM server for load tests.
+
+Streams a fixed answer from ``/v1/chat/completions`` (and ``/v1/completions``)
+with a configurable time to first token, token rate and jitter, so chat
+latency can be measured without paying for or depending on a real model.
+Point the API at it with ``LLM_API_BASE_OVERRIDE=http://127.0.0.1:9000/v1``.
+
+    python benchmarks/load/stub_llm.py --port 9000 --first-token-ms 300 --tokens-per-second 40 --tokens 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "amplification of the gene was a significant predictor of overall survival and time to relapse "
+    "in patients with breast cancer and positive lymph nodes"
+).split()
+
+
+def create_app(first_token_ms: float, tokens_per_second: float, tokens: int, jitter: float) -> FastAPI:
+    app = FastAPI()
+
+    def answer_tokens():
+        return [f"{WORDS[i % len(WORDS)]} " for i in range(tokens)]
+
+    async def token_stream(make_chunk):
+        await asyncio.sleep(first_token_ms / 1000)
+        interval = 1 / tokens_per_second if tokens_per_second > 0 else 0
+        for i, token in enumerate(answer_tokens()):
+            if i and interval:
+                await asyncio.sleep(max(0.0, interval * (1 + random.uniform(-jitter, jitter))))
+            yield f"data: {json.dumps(make_chunk(token, None))}\n\n"
+        yield f"data: {json.dumps(make_chunk('', 'stop'))}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def usage():
+        return {"prompt_tokens": 0, "completion_tokens": tokens, "total_tokens": tokens}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        created = int(time.time())
+        model = body.get("model", "stub")
+
+        def chunk(token, finish_reason):
+            delta = {"role": "assistant", "content": token} if token else {}
+            return {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        if body.get("stream"):
+            return StreamingResponse(token_stream(chunk), media_type="text/event-stream")
+        await asyncio.sleep(first_token_ms / 1000 + tokens / max(tokens_per_second, 1e-9))
+        return JSONResponse({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(answer_tokens())},
+                "finish_reason": "stop",
+            }],
+            "usage": usage(),
+        })
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        created = int(time.time())
+        model = body.get("model", "stub")
+
+        def chunk(token, finish_reason):
+            return {
+                "id": "cmpl-stub",
+                "object": "text_completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "text": token, "finish_reason": finish_reason}],
+            }
+
+        if body.get("stream"):
+            return StreamingResponse(token_stream(chunk), media_type="text/event-stream")
+        await asyncio.sleep(first_token_ms / 1000 + tokens / max(tokens_per_second, 1e-9))
+        return JSONResponse({**chunk("".join(answer_tokens()), "stop"), "usage": usage()})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative jitter applied to each token interval.")
+    args = parser.parse_args()
+
+    app = create_app(args.first_token_ms, args.tokens_per_second, args.tokens, args.jitter)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
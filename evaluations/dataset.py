@@ -0,0 +1,77 @@
+"""
+Typed retrieval evaluation dataset.
+
+One record per query with ``query_id``, ``query`` and ``expected_ids`` (the
+node ids a retriever should return), stored as JSONL or Parquet. The
+legacy ``llamaindextestset.csv`` layout (stringified ``(name, value)``
+tuples per cell) is still readable so old results can be converted.
+"""
+import ast
+import csv
+import json
+import os
+from dataclasses import asdict, dataclass
+
+
+@dataclass(frozen=True)
+class EvalQuery:
+    query_id: str
+    query: str
+    expected_ids: list[str]
+
+
+def from_qa_dataset(qa_dataset):
+    """Records from a llama_index ``EmbeddingQAFinetuneDataset``."""
+    return [
+        EvalQuery(query_id=query_id, query=query, expected_ids=list(qa_dataset.relevant_docs[query_id]))
+        for query_id, query in qa_dataset.queries.items()
+    ]
+
+
+def _load_legacy_csv(path):
+    queries = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)  # Column numbers
+        for i, row in enumerate(reader):
+            fields = {}
+            for cell in row:
+                try:
+                    name, value = ast.literal_eval(cell)
+                except (SyntaxError, ValueError):
+                    # Cells holding object reprs (e.g. the eval mode enum) are not needed
+                    continue
+                fields[name] = value
+            queries.append(EvalQuery(query_id=f"q{i}", query=fields["query"], expected_ids=fields["expected_ids"]))
+    return queries
+
+
+def load_dataset(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            return [EvalQuery(**json.loads(line)) for line in f if line.strip()]
+    if extension == ".parquet":
+        import pandas as pd
+
+        return [
+            EvalQuery(query_id=str(row.query_id), query=row.query, expected_ids=list(row.expected_ids))
+            for row in pd.read_parquet(path).itertuples(index=False)
+        ]
+    if extension == ".csv":
+        return _load_legacy_csv(path)
+    raise ValueError(f"Unsupported dataset format: {path}")
+
+
+def save_dataset(queries, path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for query in queries:
+                f.write(json.dumps(asdict(query)) + "\n")
+    elif extension == ".parquet":
+        import pandas as pd
+
+        pd.DataFrame([asdict(query) for query in queries]).to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Unsupported dataset format: {path}")
@@ -0,0 +1,173 @@
+"""
+Retrieval evaluation CLI.
+
+Loads a typed dataset (JSONL or Parquet, see ``dataset.py``), embeds all
+queries in batches, retrieves every batch with one matrix product over the
+whole corpus and scores hit_rate, mrr, precision, recall, ap and ndcg with
+NumPy. Retrieved ids are appended to a per-query cache as each batch
+finishes, so an interrupted run resumes where it stopped; the cache is keyed
+by index version, embedding model and top-k, so a rebuilt index is never
+scored from stale results.
+
+    python evaluations/evaluate.py --dataset evaluations/llamaindextestset.jsonl \
+        --output eval-results.json --fail-under hit_rate=0.8
+
+Convert a legacy results CSV to the typed format with ``--convert``.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from app.core.batch_retrieval import BatchRetriever
+from app.core.config import settings
+from app.core.embedding_store import EmbeddingStore
+from app.core.embeddings import create_embed_model, embed_queries
+from dataset import load_dataset, save_dataset
+from retrieval_metrics import METRICS, compute_metrics, mean_metrics, relevance_matrix
+
+
+def load_corpus(artifacts_dir, backend):
+    """Return ``(retriever, embed_model, index_version)`` for the chosen vector store backend."""
+    if backend == "embedding_store":
+        store = EmbeddingStore(os.path.join(artifacts_dir, "embedding_store"))
+        return BatchRetriever.from_store(store), create_embed_model(store.model_name), store.version
+
+    index_path = os.path.join(artifacts_dir, "index.pkl")
+    with open(index_path, "rb") as f:
+        index = pickle.load(f)
+    embed_model = index._embed_model
+    if settings.EMBEDDING_BACKEND != "torch":
+        embed_model = create_embed_model(embed_model.model_name)
+    index_stat = os.stat(index_path)
+    return BatchRetriever.from_index(index), embed_model, f"{index_stat.st_mtime_ns}-{index_stat.st_size}"
+
+
+def load_cache(path, key):
+    """Retrieved ids per query id from earlier runs with the same ``key``."""
+    cached = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a partial last line
+                    continue
+                if record["key"] == key:
+                    cached[record["query_id"]] = record["retrieved_ids"]
+    return cached
+
+
+def retrieve_all(queries, retriever, embed_model, top_k, batch_size, cache_path, cache_key):
+    retrieved = load_cache(cache_path, cache_key)
+    pending = [query for query in queries if query.query_id not in retrieved]
+    print(f"{len(queries)} queries, {len(queries) - len(pending)} cached, {len(pending)} to retrieve")
+
+    cache_file = open(cache_path, "a", encoding="utf-8") if cache_path else None
+    try:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            embeddings = np.asarray(embed_queries(embed_model, [query.query for query in batch]), dtype=np.float32)
+            indices, _ = retriever.search(embeddings, top_k)
+            for query, row in zip(batch, indices):
+                retrieved[query.query_id] = [retriever.node_ids[i] for i in row]
+                if cache_file:
+                    record = {"key": cache_key, "query_id": query.query_id, "retrieved_ids": retrieved[query.query_id]}
+                    cache_file.write(json.dumps(record) + "\n")
+            if cache_file:
+                cache_file.flush()
+    finally:
+        if cache_file:
+            cache_file.close()
+    return [retrieved[query.query_id] for query in queries]
+
+
+def parse_thresholds(values):
+    thresholds = {}
+    for value in values:
+        name, _, threshold = value.partition("=")
+        if name not in METRICS:
+            raise SystemExit(f"Unknown metric in --fail-under: {name}")
+        thresholds[name] = float(threshold)
+    return thresholds
+
+
+def main():
+    current_folder = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=os.path.join(current_folder, "llamaindextestset.jsonl"))
+    parser.add_argument("--artifacts", default=os.path.join(current_folder, "..", "artifacts"))
+    parser.add_argument("--backend", choices=["index", "embedding_store"], default=settings.VECTOR_STORE_BACKEND)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--cache", default=os.path.join(current_folder, ".eval_cache.jsonl"),
+                        help="Per-query result cache used to resume; pass an empty string to disable.")
+    parser.add_argument("--output", help="Write summary and per-query metrics as JSON.")
+    parser.add_argument("--fail-under", action="append", default=[], metavar="METRIC=VALUE",
+                        help="Exit non-zero when a mean metric is below VALUE (repeatable).")
+    parser.add_argument("--convert", metavar="OUTPUT",
+                        help="Only convert --dataset (e.g. the legacy CSV) to OUTPUT (.jsonl or .parquet).")
+    args = parser.parse_args()
+
+    queries = load_dataset(args.dataset)
+    if args.convert:
+        save_dataset(queries, args.convert)
+        print(f"Wrote {len(queries)} queries to {args.convert}")
+        return
+    thresholds = parse_thresholds(args.fail_under)
+
+    start = time.perf_counter()
+    retriever, embed_model, index_version = load_corpus(args.artifacts, args.backend)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cache_key = f"{index_version}:{getattr(embed_model, 'model_name', '')}:{args.top_k}"
+    retrieved_ids = retrieve_all(
+        queries, retriever, embed_model, args.top_k, args.batch_size, args.cache or None, cache_key
+    )
+    retrieve_seconds = time.perf_counter() - start
+
+    relevance = relevance_matrix(retrieved_ids, [query.expected_ids for query in queries])
+    per_query = compute_metrics(
+        relevance,
+        expected_counts=[len(set(query.expected_ids)) for query in queries],
+        retrieved_counts=[len(ids) for ids in retrieved_ids],
+    )
+    summary = mean_metrics(per_query)
+
+    print(f"Loaded corpus of {len(retriever)} nodes in {load_seconds:.2f}s, "
+          f"evaluated {len(queries)} queries in {retrieve_seconds:.2f}s")
+    for name in METRICS:
+        print(f"{name:>10}: {summary[name]:.4f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "dataset": args.dataset,
+                "backend": args.backend,
+                "index_version": index_version,
+                "top_k": args.top_k,
+                "metrics": summary,
+                "queries": [
+                    {
+                        "query_id": query.query_id,
+                        "retrieved_ids": ids,
+                        **{name: float(per_query[name][i]) for name in METRICS},
+                    }
+                    for i, (query, ids) in enumerate(zip(queries, retrieved_ids))
+                ],
+            }, f, indent=2)
+
+    failed = {name: summary[name] for name, threshold in thresholds.items() if summary[name] < threshold}
+    if failed:
+        print(f"Below threshold: {failed}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,46 +3,15 @@ import pandas as pd
 import asyncio
 import pickle
 from dotenv import load_dotenv
-from llama_index.core.evaluation import RetrieverEvaluator
+from llama_index.core.evaluation import EmbeddingQAFinetuneDataset, RetrieverEvaluator
 from llama_index.core.retrievers import VectorIndexRetriever
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Set OpenAI API key
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
-os.environ["OPENAI_API_KEY"] = openai_api_key
-
-# Load preprocessed data and index during startup
-artifacts_dir = os.path.join(os.path.dirname(__file__), '..', 'artifacts')
-try:
-    with open(os.path.join(artifacts_dir, "index.pkl"), "rb") as f:
-        index = pickle.load(f)
-    with open(os.path.join(artifacts_dir, "llm.pkl"), "rb") as f:
-        llm = pickle.load(f)
-    with open(os.path.join(artifacts_dir, "nodes.pkl"), "rb") as f:
-        nodes = pickle.load(f)
-
-    retriever = VectorIndexRetriever(
-        index=index,
-        similarity_top_k=5,
-    )
-
-except (FileNotFoundError, pickle.UnpicklingError) as e:
-    raise RuntimeError("Failed to load preprocessed data and index") from e
+from dataset import load_dataset
 
 metrics = ["hit_rate", "mrr", "precision", "recall", "ap", "ndcg"]
 
-retriever_evaluator = RetrieverEvaluator.from_metric_names(
-    metrics, retriever=retriever
-)
-
-# Load the testset
-current_folder = os.path.dirname(os.path.abspath(__file__))
-csv_file_path = os.path.join(current_folder, "llamaindextestset.csv")
-qa_dataset = pd.read_csv(csv_file_path)
+# Concurrent retrievals while evaluating
+EVAL_WORKERS = 8
 
 def display_results(name, eval_results):
     """Display results from evaluate."""
@@ -62,13 +31,50 @@ def display_results(name, eval_results):
 
     return metric_df
 
+def load_retriever():
+    # Load preprocessed data and index
+    artifacts_dir = os.path.join(os.path.dirname(__file__), '..', 'artifacts')
+    try:
+        with open(os.path.join(artifacts_dir, "index.pkl"), "rb") as f:
+            index = pickle.load(f)
+    except (FileNotFoundError, pickle.UnpicklingError) as e:
+        raise RuntimeError("Failed to load preprocessed data and index") from e
+
+    return VectorIndexRetriever(
+        index=index,
+        similarity_top_k=5,
+    )
+
 async def main():
-    eval_results = await retriever_evaluator.aevaluate_dataset(qa_dataset)
-    print(eval_results)
-    display_results("top-2 eval", eval_results)
-    df = pd.DataFrame(eval_results)
-    print("df is", df)
-    df.to_csv("llamaindextestset.csv", index=False)
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Set OpenAI API key
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+    os.environ["OPENAI_API_KEY"] = openai_api_key
+
+    retriever_evaluator = RetrieverEvaluator.from_metric_names(
+        metrics, retriever=load_retriever()
+    )
+
+    # Load the testset
+    current_folder = os.path.dirname(os.path.abspath(__file__))
+    queries = load_dataset(os.path.join(current_folder, "llamaindextestset.jsonl"))
+    qa_dataset = EmbeddingQAFinetuneDataset(
+        queries={query.query_id: query.query for query in queries},
+        corpus={},
+        relevant_docs={query.query_id: query.expected_ids for query in queries},
+    )
+
+    eval_results = await retriever_evaluator.aevaluate_dataset(qa_dataset, workers=EVAL_WORKERS)
+    print(display_results("top-5 eval", eval_results))
+
+    # Results go next to, never over, the dataset they were computed from
+    df = pd.DataFrame([eval_result.dict() for eval_result in eval_results])
+    df.to_csv(os.path.join(current_folder, "llamaindextestset_results.csv"), index=False)
 
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Recall impact of quantized embedding storage.
+
+Copies the pickled index into embedding stores of each dtype, runs the
+queries of the evaluation dataset against every variant (with and without
+float32 re-scoring) and reports the retrieval metrics used by
+``evaluate_and_display_results.py`` next to the scanned matrix size and the
+mean search time. Query embeddings are computed once and shared by every
+variant, so only the storage differs.
+
+    python evaluations/evaluate_quantization.py --artifacts preprocess/artifacts
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from llama_index.core.evaluation.retrieval.metrics import resolve_metrics
+
+from app.core.embedding_store import write_index_to_store
+from app.core.embeddings import embed_queries
+from dataset import load_dataset
+
+# Same metrics as evaluate_and_display_results.py
+metrics = ["hit_rate", "mrr", "precision", "recall", "ap", "ndcg"]
+
+# (name, dtype, rescore_factor)
+VARIANTS = [
+    ("float32", "float32", 0),
+    ("float16", "float16", 0),
+    ("float16+rescore", "float16", 4),
+    ("int8", "int8", 0),
+    ("int8+rescore", "int8", 4),
+]
+
+
+def evaluate_variant(name, store, query_embeddings, queries, top_k, rescore_factor):
+    metric_fns = [metric_cls() for metric_cls in resolve_metrics(metrics)]
+    metric_dicts = []
+    elapsed = 0.0
+    for embedding, eval_query in zip(query_embeddings, queries):
+        start = time.perf_counter()
+        hits = store.search(embedding, top_k, rescore_factor=rescore_factor)
+        elapsed += time.perf_counter() - start
+        retrieved_ids = [store.shards[shard].node(row).node_id for _, shard, row in hits]
+        metric_dicts.append({
+            metric.metric_name: metric.compute(
+                query=eval_query.query, expected_ids=eval_query.expected_ids, retrieved_ids=retrieved_ids
+            ).score
+            for metric in metric_fns
+        })
+
+    full_df = pd.DataFrame(metric_dicts)
+    return {
+        "retrievers": name,
+        **{k: full_df[k].mean() for k in metrics},
+        "matrix_mb": store.nbytes / 1e6,
+        "search_ms": 1000 * elapsed / len(queries),
+    }
+
+
+def main():
+    current_folder = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--artifacts", default=os.path.join(current_folder, "..", "artifacts"))
+    parser.add_argument("--dataset", default=os.path.join(current_folder, "llamaindextestset.jsonl"))
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(os.path.join(args.artifacts, "index.pkl"), "rb") as f:
+        index = pickle.load(f)
+    embed_model = index._embed_model
+    queries = load_dataset(args.dataset)
+    query_embeddings = np.asarray(
+        embed_queries(embed_model, [query.query for query in queries]), dtype=np.float32
+    )
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {}
+        for name, dtype, rescore_factor in VARIANTS:
+            if dtype not in stores:
+                stores[dtype] = write_index_to_store(
+                    index, os.path.join(tmp, dtype), embed_model.model_name, dtype=dtype
+                )
+            rows.append(evaluate_variant(
+                name, stores[dtype], query_embeddings, queries, args.top_k, rescore_factor
+            ))
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
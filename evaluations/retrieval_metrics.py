@@ -0,0 +1,58 @@
+"""
+Retrieval metrics over a whole result set at once.
+
+Same definitions as llama_index's ``RetrieverEvaluator`` metrics (hit_rate,
+mrr, precision, recall, ap, ndcg with linear gain), computed with NumPy
+from a ``(queries x top_k)`` relevance matrix instead of one Python call
+per query and metric.
+"""
+import numpy as np
+
+METRICS = ["hit_rate", "mrr", "precision", "recall", "ap", "ndcg"]
+
+
+def relevance_matrix(retrieved_ids, expected_ids):
+    """``relevance[i, j]`` is whether the j-th result of query i is one of its expected ids."""
+    width = max((len(ids) for ids in retrieved_ids), default=0)
+    relevance = np.zeros((len(retrieved_ids), width), dtype=bool)
+    for i, (retrieved, expected) in enumerate(zip(retrieved_ids, expected_ids)):
+        expected = set(expected)
+        relevance[i, :len(retrieved)] = [node_id in expected for node_id in retrieved]
+    return relevance
+
+
+def compute_metrics(relevance, expected_counts, retrieved_counts=None):
+    """
+    Per-query scores for every metric in ``METRICS``.
+
+    ``expected_counts`` is the number of distinct expected ids per query and
+    ``retrieved_counts`` the number of results actually returned (defaults
+    to the matrix width).
+    """
+    relevance = np.asarray(relevance, dtype=bool)
+    n_queries, width = relevance.shape
+    expected_counts = np.maximum(np.asarray(expected_counts, dtype=np.float64), 1)
+    if retrieved_counts is None:
+        retrieved_counts = np.full(n_queries, width)
+    retrieved_counts = np.maximum(np.asarray(retrieved_counts, dtype=np.float64), 1)
+
+    ranks = np.arange(1, width + 1)
+    hits = relevance.any(axis=1)
+    relevant = relevance.sum(axis=1)
+
+    discounts = 1 / np.log2(ranks + 1)
+    ideal_lengths = np.minimum(expected_counts, retrieved_counts).astype(np.int64)
+    ideal_dcg = np.concatenate([[0.0], np.cumsum(discounts)])[ideal_lengths] if width else np.ones(n_queries)
+
+    return {
+        "hit_rate": hits.astype(np.float64),
+        "mrr": np.where(hits, 1 / (relevance.argmax(axis=1) + 1), 0.0),
+        "precision": relevant / retrieved_counts,
+        "recall": relevant / expected_counts,
+        "ap": (np.cumsum(relevance, axis=1) / ranks * relevance).sum(axis=1) / expected_counts,
+        "ndcg": (relevance * discounts).sum(axis=1) / np.maximum(ideal_dcg, 1e-12),
+    }
+
+
+def mean_metrics(per_query):
+    return {name: float(np.mean(values)) if len(values) else 0.0 for name, values in per_query.items()}
@@ -0,0 +1,85 @@
+"""
+Smoke check of the evaluation CLI against both vector store backends.
+
+Builds a small synthetic corpus as an in-memory ``VectorStoreIndex`` (the
+``index`` backend) and as embedding stores of every dtype (the
+``embedding_store`` backend, split over several shards), runs
+``evaluate.retrieve_all`` and the metrics over each, and checks that every
+backend reports the full corpus and returns the same node ids. Query
+embeddings are fixed vectors, so no embedding model is loaded.
+
+    python evaluations/smoke_backends.py
+"""
+import sys
+import tempfile
+
+import numpy as np
+from llama_index.core import VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import TextNode
+
+from app.core.batch_retrieval import BatchRetriever
+from app.core.embedding_store import EMBEDDING_DTYPES, write_index_to_store
+from dataset import EvalQuery
+from evaluate import retrieve_all
+from retrieval_metrics import compute_metrics, mean_metrics, relevance_matrix
+
+DIM = 64
+CORPUS_SIZE = 1000
+QUERIES = 50
+TOP_K = 5
+
+
+class FixedQueryEmbedding:
+    """Embedding model stand-in returning a precomputed vector per query text."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def get_query_embedding(self, text):
+        return self.embeddings[text]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    corpus = rng.standard_normal((CORPUS_SIZE, DIM)).astype(np.float32)
+    nodes = [
+        TextNode(id_=f"node-{i}", text=f"Chunk {i}", metadata={"node_type": "text"}, embedding=embedding.tolist())
+        for i, embedding in enumerate(corpus)
+    ]
+    index = VectorStoreIndex(nodes, embed_model=MockEmbedding(embed_dim=DIM))
+
+    # Each query is a slightly perturbed corpus row, which it is expected to retrieve
+    targets = rng.choice(CORPUS_SIZE, QUERIES, replace=False)
+    queries = [EvalQuery(query_id=f"q{i}", query=f"query {i}", expected_ids=[f"node-{t}"]) for i, t in enumerate(targets)]
+    embed_model = FixedQueryEmbedding({
+        query.query: (corpus[t] + 0.01 * rng.standard_normal(DIM)).tolist() for query, t in zip(queries, targets)
+    })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        retrievers = {"index": BatchRetriever.from_index(index)}
+        for dtype in EMBEDDING_DTYPES:
+            store = write_index_to_store(index, f"{tmp}/{dtype}", "smoke", shard_size=256, dtype=dtype)
+            retrievers[f"embedding_store/{dtype}"] = BatchRetriever.from_store(store)
+
+        results = {}
+        for name, retriever in retrievers.items():
+            retrieved_ids = retrieve_all(queries, retriever, embed_model, TOP_K, 16, None, None)
+            relevance = relevance_matrix(retrieved_ids, [query.expected_ids for query in queries])
+            summary = mean_metrics(compute_metrics(
+                relevance,
+                expected_counts=[len(query.expected_ids) for query in queries],
+                retrieved_counts=[len(ids) for ids in retrieved_ids],
+            ))
+            print(f"{name:>24}: {len(retriever)} nodes, hit_rate {summary['hit_rate']:.3f}")
+            results[name] = (len(retriever), [ids[0] for ids in retrieved_ids], summary["hit_rate"])
+
+    expected = (CORPUS_SIZE, [query.expected_ids[0] for query in queries], 1.0)
+    failed = [name for name, result in results.items() if result != expected]
+    if failed:
+        print(f"Backends disagree with the expected results: {failed}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
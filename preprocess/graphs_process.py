@@ -1,47 +1,60 @@
-import fitz  # PyMuPDF
-from paddleocr import PaddleOCR
 import pandas as pd
-from transformers import BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
 import re
-from io import StringIO
+import hashlib
+import logging
 import os
+from functools import lru_cache
+from io import BytesIO, StringIO
 
-# Initialize PaddleOCR for text extraction (if needed for images)
-ocr = PaddleOCR(use_angle_cls=True, lang='en')
+from app.core.cache import SQLiteCache
+from app.core.config import settings
+from pdf_extract import extract_pdf_pages, join_pages
 
-# Initialize BLIP model for image captioning (multimodal LLM)
-processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
+logger = logging.getLogger(__name__)
+
+BLIP_MODEL_NAME = "Salesforce/blip-image-captioning-base"
+
+# Models are only loaded the first time a PDF actually contains images
+@lru_cache(maxsize=None)
+def get_ocr():
+    """Initialize PaddleOCR for text extraction from images."""
+    from paddleocr import PaddleOCR
+
+    return PaddleOCR(use_angle_cls=True, lang='en')
+
+@lru_cache(maxsize=None)
+def get_blip():
+    """Initialize the BLIP model for image captioning (multimodal LLM)."""
+    import torch
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+
+    if settings.CAPTION_NUM_THREADS:
+        torch.set_num_threads(settings.CAPTION_NUM_THREADS)
+    processor = BlipProcessor.from_pretrained(BLIP_MODEL_NAME)
+    model = BlipForConditionalGeneration.from_pretrained(BLIP_MODEL_NAME)
+    model.eval()
+    return processor, model
+
+@lru_cache(maxsize=None)
+def get_caption_cache():
+    """Captions keyed by image content hash, persisted next to the other artifacts."""
+    artifacts_dir = os.path.join(os.path.dirname(__file__), 'artifacts')
+    os.makedirs(artifacts_dir, exist_ok=True)
+    return SQLiteCache(
+        "image_caption",
+        path=os.path.join(artifacts_dir, "caption_cache.sqlite3"),
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        default_ttl=None,
+    )
 
 # Function to extract text and images from PDF
-def extract_pdf_content(pdf_path):
-    doc = fitz.open(pdf_path)
-    text_content = ""
-    images = []
-    
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        # Extract text
-        text_content += f"\nPage {page_num + 1}:\n{page.get_text('text')}\n"
-        
-        # Extract images
-        image_list = page.get_images(full=True)
-        for img_index, img in enumerate(image_list):
-            xref = img[0]
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-            image_ext = base_image["ext"]
-            image_filename = f"image_page{page_num + 1}_{img_index}.{image_ext}"
-            with open(image_filename, "wb") as img_file:
-                img_file.write(image_bytes)
-            images.append({"page": page_num + 1, "filename": image_filename})
-    
-    doc.close()
-    return text_content, images
+def extract_pdf_content(pdf_path, workers=None):
+    """Return the per-page text list and in-memory images of a PDF."""
+    return extract_pdf_pages(pdf_path, workers=workers)
 
 # Function to extract tables from text using regex and pandas
-def extract_tables(text):
+def extract_tables(text, page=None):
     tables = []
     table_pattern = r"Table \d+\..*?(?=\n\n|\Z)"  # Adjust regex based on table format
     matches = re.finditer(table_pattern, text, re.DOTALL)
@@ -64,54 +77,128 @@ def extract_tables(text):
         
         if table_data and headers:
             df = pd.DataFrame(table_data, columns=headers)
-            tables.append({"title": title, "data": df})
+            tables.append({"title": title, "data": df, "page": page})
     
     return tables
 
 # Function to interpret tables
-def interpret_tables(tables):
+def interpret_tables(tables, start=1):
     interpretations = []
-    for i, table in enumerate(tables):
+    for i, table in enumerate(tables, start=start - 1):
         title = table["title"]
         data_str = table["data"].to_string()
         interpretation = f"Table {i+1}: {title}\nDescription: This table presents data on {title.lower()}. The columns include {', '.join(table['data'].columns)}. Key observations: {data_str[:200]}..."
-        interpretations.append({"metadata": f"Table {i+1}", "interpretation": interpretation})
+        interpretations.append({"metadata": f"Table {i+1}", "interpretation": interpretation, "page": table.get("page")})
     return interpretations
 
+def _caption_batch(images):
+    """Caption a batch of PIL images with a single ``generate`` call."""
+    import torch
+
+    processor, model = get_blip()
+    # The processor resizes every image, so the batch is one fixed-size tensor
+    inputs = processor(images=images, return_tensors="pt")
+    with torch.inference_mode():
+        out = model.generate(**inputs)
+    return processor.batch_decode(out, skip_special_tokens=True)
+
+def _ocr_text(image):
+    """Return the text PaddleOCR recognizes in a PIL image."""
+    import numpy as np
+
+    result = get_ocr().ocr(np.array(image), cls=True)
+    lines = result[0] if result and result[0] else []
+    return " ".join(line[1][0] for line in lines)
+
 # Function to interpret images using BLIP
-def interpret_images(images):
+def interpret_images(images, batch_size=None):
+    """
+    Caption (and OCR) every image, reusing cached results for unchanged images.
+
+    Images that cannot be decoded are logged and skipped rather than indexed.
+    """
+    batch_size = batch_size or settings.CAPTION_BATCH_SIZE
+    cache = get_caption_cache()
+
+    results = {}
+    pending = []
+    for i, img_info in enumerate(images):
+        key = f"{BLIP_MODEL_NAME}:{settings.CAPTION_OCR_ENABLED}:{hashlib.sha256(img_info['bytes']).hexdigest()}"
+        cached = cache.get(key)
+        if cached is not None:
+            results[i] = cached
+            continue
+        # Only the key is kept here; images are decoded a batch at a time
+        pending.append((i, key))
+
+    for start in range(0, len(pending), batch_size):
+        batch = []
+        for i, key in pending[start:start + batch_size]:
+            try:
+                image = Image.open(BytesIO(images[i]["bytes"])).convert("RGB")
+            except Exception as e:
+                logger.warning(f"Skipping unreadable image on page {images[i]['page']}: {e}")
+                continue
+            batch.append((i, key, image))
+        if not batch:
+            continue
+        captions = _caption_batch([image for _, _, image in batch])
+        for (i, key, image), caption in zip(batch, captions):
+            if settings.CAPTION_OCR_ENABLED:
+                ocr_text = _ocr_text(image)
+                if ocr_text:
+                    caption = f"{caption}. Text in figure: {ocr_text}"
+            cache.set(key, caption)
+            results[i] = caption
+
     interpretations = []
     for i, img_info in enumerate(images):
-        img_path = img_info["filename"]
+        if i not in results:
+            continue
         page_num = img_info["page"]
-        try:
-            image = Image.open(img_path).convert("RGB")
-            inputs = processor(images=image, return_tensors="pt")
-            out = model.generate(**inputs)
-            caption = processor.decode(out[0], skip_special_tokens=True)
-            interpretation = f"Figure {i+1} (Page {page_num}): {caption}"
-            interpretations.append({"metadata": f"Figure {i+1} (Page {page_num})", "interpretation": interpretation})
-        except Exception as e:
-            interpretations.append({"metadata": f"Figure {i+1} (Page {page_num})", "interpretation": f"Error processing image: {str(e)}"})
+        interpretation = f"Figure {i+1} (Page {page_num}): {results[i]}"
+        interpretations.append({"metadata": f"Figure {i+1} (Page {page_num})", "interpretation": interpretation, "page": page_num})
     return interpretations
 
 # Function to extract figure references from text (if no images are present)
-def extract_and_interpret_figure_references(text):
+def extract_and_interpret_figure_references(text, start=1, page=None):
     figures = []
     figure_pattern = r"Fig\. \d+\..*?(?=\n\n|\Z)"
     matches = re.finditer(figure_pattern, text, re.DOTALL)
     
-    for i, match in enumerate(matches):
+    for i, match in enumerate(matches, start=start - 1):
         fig_text = match.group()
         interpretation = f"Figure {i+1}: {fig_text[:100]}... (Assuming a plot or diagram related to HER-2/neu amplification analysis based on context.)"
-        figures.append({"metadata": f"Figure {i+1}", "interpretation": interpretation})
+        figures.append({"metadata": f"Figure {i+1}", "interpretation": interpretation, "page": page})
     
     return figures
 
+# Streaming stages used by the ingest pipeline: interpretations are yielded
+# page by page, numbered across the whole document
+def iter_table_interpretations(pages):
+    count = 0
+    for page_num, page_text in enumerate(pages, start=1):
+        interpretations = interpret_tables(extract_tables(page_text, page=page_num), start=count + 1)
+        count += len(interpretations)
+        yield from interpretations
+
+def iter_figure_interpretations(pages, images):
+    # Interpret images if present (batched across the document), otherwise
+    # extract figure references from the page text
+    if images:
+        yield from interpret_images(images)
+        return
+    count = 0
+    for page_num, page_text in enumerate(pages, start=1):
+        figures = extract_and_interpret_figure_references(page_text, start=count + 1, page=page_num)
+        count += len(figures)
+        yield from figures
+
 # Main function to process PDF
 def process_pdf(pdf_path):
-    # Extract text and images
-    text_content, images = extract_pdf_content(pdf_path)
+    # Extract per-page text and in-memory images
+    pages, images = extract_pdf_content(pdf_path)
+    text_content = join_pages(pages)
     
     # Extract and interpret tables
     tables = extract_tables(text_content)
@@ -127,13 +214,10 @@ def process_pdf(pdf_path):
     result = {
         "tables": table_interpretations,
         "figures": figure_interpretations,
+        "pages": pages,
         "raw_text": text_content[:500] + "..."  # Truncated for brevity
     }
     
-    # Clean up extracted image files
-    for img in images:
-        os.remove(img["filename"])
-    
     return result
 
 # Example usage
@@ -0,0 +1,68 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+
+import fitz  # PyMuPDF
+
+# Below this many pages a process pool costs more than it saves
+MIN_PAGES_FOR_POOL = 16
+
+
+def _extract_page_range(pdf_path, start, end):
+    """Extract text and images for pages [start, end) of one PDF."""
+    pages = []
+    images = []
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(start, end):
+            page = doc[page_num]
+            pages.append(page.get_text("text"))
+
+            for img_index, img in enumerate(page.get_images(full=True)):
+                base_image = doc.extract_image(img[0])
+                images.append({
+                    "page": page_num + 1,
+                    "index": img_index,
+                    "ext": base_image["ext"],
+                    "bytes": base_image["image"],
+                })
+    return pages, images
+
+
+def page_ranges(page_count, shard_count):
+    """Split ``page_count`` pages into at most ``shard_count`` contiguous ranges."""
+    pages_per_shard = max(1, ceil(page_count / max(1, shard_count)))
+    return [(start, min(start + pages_per_shard, page_count)) for start in range(0, page_count, pages_per_shard)]
+
+
+def extract_pdf_pages(pdf_path, workers=None):
+    """
+    Extract per-page text and in-memory images from a PDF.
+
+    Page ranges are extracted in parallel by a process pool, each worker
+    opening its own handle on the document. Returns ``(pages, images)`` where
+    ``pages[i]`` is the text of page ``i + 1`` and each image is a dict with
+    ``page``, ``index``, ``ext`` and raw ``bytes``.
+    """
+    workers = workers or os.cpu_count() or 1
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+
+    if workers == 1 or page_count < MIN_PAGES_FOR_POOL:
+        return _extract_page_range(pdf_path, 0, page_count)
+
+    # A few shards per worker keeps the pool busy when pages differ in cost
+    ranges = page_ranges(page_count, workers * 4)
+    pages = []
+    images = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
+        for future in futures:
+            shard_pages, shard_images = future.result()
+            pages.extend(shard_pages)
+            images.extend(shard_images)
+    return pages, images
+
+
+def join_pages(pages):
+    """Render per-page text as one string with ``Page N:`` markers."""
+    return "".join(f"\nPage {page_num}:\n{text}\n" for page_num, text in enumerate(pages, start=1))
@@ -1,12 +1,166 @@
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, Settings as LlamaSettings
+from llama_index.core import Document, VectorStoreIndex, Settings as LlamaSettings
+from llama_index.core.schema import TextNode
 from llama_index.llms.deepseek import DeepSeek
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.core.node_parser import SemanticSplitterNodeParser
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from app.core.config import settings
-from app.utils import clean_text
+from app.core.embedding_store import EmbeddingStoreWriter, embed_text
+from app.core.embeddings import create_embed_model
+from app.core.text_cleaner import get_text_cleaner
+from graphs_process import iter_figure_interpretations, iter_table_interpretations
+from pdf_extract import extract_pdf_pages
+from semantic_splitter import VectorizedSemanticSplitter
+from itertools import islice
+import argparse
 import pickle
 import os
+import queue
+import threading
+
+# Nodes are embedded and inserted into the index this many at a time
+INSERT_BATCH_SIZE = 64
+
+# Page documents whose sentence windows are embedded in one batch while splitting
+SPLIT_BATCH_DOCUMENTS = 32
+
+# Items buffered between two streaming ingest stages
+STAGE_QUEUE_SIZE = 8
+
+# Nodes per on-disk embedding store shard
+STORE_SHARD_SIZE = 4096
+
+# Bookkeeping metadata that should not influence embeddings or prompts
+EXCLUDED_METADATA_KEYS = ["file_name", "page"]
+
+
+def text_documents(pdf_path, pages):
+    """Stage 1: one cleaned Document per page."""
+    file_name = os.path.basename(pdf_path)
+    # Large documents are cleaned across a process pool
+    cleaned_pages = get_text_cleaner().clean_many(pages)
+    for page_num, page_text in enumerate(cleaned_pages, start=1):
+        yield Document(
+            text=page_text,
+            metadata={"file_name": file_name, "page": page_num, "node_type": "text"},
+            excluded_embed_metadata_keys=EXCLUDED_METADATA_KEYS,
+            excluded_llm_metadata_keys=EXCLUDED_METADATA_KEYS,
+        )
+
+
+def split_nodes(items, parser, batch_size=SPLIT_BATCH_DOCUMENTS):
+    """Stage 2: split documents into semantic text nodes, a batch of documents at a time."""
+    documents = []
+    for item in items:
+        if isinstance(item, Document):
+            documents.append(item)
+            if len(documents) >= batch_size:
+                yield from parser.get_nodes_from_documents(documents)
+                documents = []
+            continue
+        if documents:
+            # Keep text nodes ahead of the table and figure nodes that followed them
+            yield from parser.get_nodes_from_documents(documents)
+            documents = []
+        # Table and figure nodes are already one chunk each
+        yield item
+    if documents:
+        yield from parser.get_nodes_from_documents(documents)
+
+
+def semantic_parser(embed_model):
+    """Semantic splitter shared by both ingest modes."""
+    return VectorizedSemanticSplitter(
+        embed_model=embed_model,   # Embedding model for similarity-based chunking
+        breakpoint_percentile_threshold=95,  # Adjust to control chunk granularity
+        buffer_size=1  # Context buffer (adjust based on needs)
+    )
+
+
+def interpretation_nodes(pdf_path, interpretations, node_type):
+    """Turn table or figure interpretations into typed nodes."""
+    file_name = os.path.basename(pdf_path)
+    for interpretation in interpretations:
+        yield TextNode(
+            text=interpretation["interpretation"],
+            metadata={
+                "file_name": file_name,
+                "page": interpretation["page"],
+                "node_type": node_type,
+                "label": interpretation["metadata"],
+            },
+            excluded_embed_metadata_keys=EXCLUDED_METADATA_KEYS,
+            excluded_llm_metadata_keys=EXCLUDED_METADATA_KEYS,
+        )
+
+
+def iter_pdf_paths(path):
+    """Yield ``path`` itself, or every PDF under it when it is a directory."""
+    if not os.path.isdir(path):
+        yield path
+        return
+    for root, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(root, name)
+
+
+def ingest_items(pdf_paths):
+    """Stage 1: per PDF, cleaned page documents followed by typed table and figure nodes."""
+    for pdf_path in pdf_paths:
+        # Extract per-page text and images once; every stage reads from them
+        pages, images = extract_pdf_pages(pdf_path)
+        yield from text_documents(pdf_path, pages)
+        yield from interpretation_nodes(pdf_path, iter_table_interpretations(pages), "table")
+        yield from interpretation_nodes(pdf_path, iter_figure_interpretations(pages, images), "figure")
+
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+
+_STAGE_DONE = object()
+
+
+def threaded(iterable, maxsize=STAGE_QUEUE_SIZE):
+    """
+    Run ``iterable`` in a background thread and hand items over a bounded queue.
+
+    The producer blocks once ``maxsize`` items are waiting, so a slow
+    downstream stage throttles the stages before it instead of letting
+    intermediate results pile up in memory.
+    """
+    handoff = queue.Queue(maxsize=maxsize)
+
+    def produce():
+        try:
+            for item in iterable:
+                handoff.put(item)
+        except BaseException as e:
+            handoff.put(_StageError(e))
+        else:
+            handoff.put(_STAGE_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = handoff.get()
+        if item is _STAGE_DONE:
+            return
+        if isinstance(item, _StageError):
+            raise item.error
+        yield item
+
+
+def embed_batches(nodes, embed_model, batch_size=INSERT_BATCH_SIZE):
+    """Stage 3: embed nodes in batches."""
+    for batch in batched(nodes, batch_size):
+        yield batch, embed_model.get_text_embedding_batch([embed_text(node) for node in batch])
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
 def preprocess_data():
@@ -19,32 +173,19 @@ def preprocess_data():
         model_name=settings.HUGGING_FACE_EMBEDDING_MODEL_NAME
     )
 
-    reader = SimpleDirectoryReader(input_files=[settings.PDF_FILE_PATH])
-    data = reader.load_data()
-
-    # Clean the text of each document and create new Document objects
-    cleaned_data = []
-    for doc in data:
-        cleaned_text = clean_text(doc.text)
-        cleaned_doc = doc.copy(update={"text": cleaned_text})
-        cleaned_data.append(cleaned_doc)
-    
-    
-    # Initialize Semantic Splitter Node Parser
-    parser = SemanticSplitterNodeParser(
-        embed_model=LlamaSettings.embed_model,   # Embedding model for similarity-based chunking
-        breakpoint_percentile_threshold=95,  # Adjust to control chunk granularity
-        buffer_size=1  # Context buffer (adjust based on needs)
-    )
-
-    # Parse Documents into Semantic Nodes
-    nodes = parser.get_nodes_from_documents(cleaned_data)
+    # Initialize the semantic splitter
+    parser = semantic_parser(LlamaSettings.embed_model)
 
+    # Text, table and figure stages stream typed nodes (with page metadata)
+    # into the same index so they can be filtered on node_type at query time
+    node_stream = split_nodes(ingest_items(iter_pdf_paths(settings.PDF_FILE_PATH)), parser)
 
-    # Create the vector store index
-    index = VectorStoreIndex(
-        nodes=nodes,
-    )
+    # Create the vector store index, embedding nodes batch by batch
+    index = VectorStoreIndex(nodes=[])
+    nodes = []
+    for batch in batched(node_stream, INSERT_BATCH_SIZE):
+        index.insert_nodes(batch)
+        nodes.extend(batch)
 
     # Ensure the artifacts directory exists
     artifacts_dir = os.path.join(os.path.dirname(__file__), 'artifacts')
@@ -60,5 +201,52 @@ def preprocess_data():
     with open(os.path.join(artifacts_dir, "nodes.pkl"), "wb") as f:
         pickle.dump(nodes, f)
 
+def preprocess_data_streaming():
+    """
+    Ingest with constant memory, however large the corpus.
+
+    Documents stream through extract/clean -> split -> embed -> write stages
+    connected by bounded queues, and embeddings are appended shard by shard
+    to an on-disk embedding store instead of an in-memory index. Serve it
+    with VECTOR_STORE_BACKEND=embedding_store.
+    """
+    llm = DeepSeek(
+        model=settings.DEEPSEEK_MODEL_NAME,
+        api_key=settings.DEEPSEEK_API_KEY,
+        api_base=settings.DEEPSEEK_API_BASE
+    )
+    # Nothing is pickled in this mode, so the ONNX backends can be used here
+    embed_model = create_embed_model()
+
+    parser = semantic_parser(embed_model)
+
+    artifacts_dir = os.path.join(os.path.dirname(__file__), 'artifacts')
+    os.makedirs(artifacts_dir, exist_ok=True)
+
+    writer = EmbeddingStoreWriter(
+        os.path.join(artifacts_dir, "embedding_store"),
+        model_name=settings.HUGGING_FACE_EMBEDDING_MODEL_NAME,
+        shard_size=STORE_SHARD_SIZE,
+        dtype=settings.EMBEDDING_STORE_DTYPE,
+    )
+    items = threaded(ingest_items(iter_pdf_paths(settings.PDF_FILE_PATH)))
+    nodes = threaded(split_nodes(items, parser))
+    for batch, embeddings in threaded(embed_batches(nodes, embed_model)):
+        writer.append(batch, embeddings)
+    writer.close()
+
+    with open(os.path.join(artifacts_dir, "llm.pkl"), "wb") as f:
+        pickle.dump(llm, f)
+
 if __name__ == "__main__":
-    preprocess_data()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Preprocess PDFs into a retrievable index.")
+    arg_parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Stream into the on-disk embedding store with bounded memory.",
+    )
+    args = arg_parser.parse_args()
+    if args.streaming:
+        preprocess_data_streaming()
+    else:
+        preprocess_data()
@@ -0,0 +1,133 @@
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, SerializeAsAny
+from llama_index.core.node_parser import NodeParser
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.node_parser.text.utils import split_by_sentence_tokenizer
+from llama_index.core.schema import BaseNode
+
+
+class VectorizedSemanticSplitter(NodeParser):
+    """
+    Semantic chunking equivalent to ``SemanticSplitterNodeParser``, vectorized.
+
+    The sentence windows of every document in a call are embedded with one
+    batched ``get_text_embedding_batch`` call, adjacent-window cosine
+    distances are computed as a single NumPy operation, and breakpoints are
+    the distances above the document's ``breakpoint_percentile_threshold``
+    percentile. With the default size limits the chunks are the same as
+    ``SemanticSplitterNodeParser`` produces.
+    """
+
+    sentence_splitter: Callable[[str], List[str]] = Field(
+        default_factory=split_by_sentence_tokenizer,
+        description="The text splitter to use when splitting documents.",
+        exclude=True,
+    )
+    embed_model: SerializeAsAny[BaseEmbedding] = Field(
+        description="The embedding model to use for semantic comparison.",
+    )
+    buffer_size: int = Field(
+        default=1,
+        description="Number of sentences on each side of a sentence included when embedding it.",
+    )
+    breakpoint_percentile_threshold: int = Field(
+        default=95,
+        description="Percentile of cosine dissimilarity a distance must exceed to start a new chunk.",
+    )
+    min_chunk_chars: int = Field(
+        default=0,
+        description="Chunks shorter than this are merged into their neighbour.",
+    )
+    max_chunk_chars: Optional[int] = Field(
+        default=None,
+        description="Chunks longer than this are split at sentence boundaries.",
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "VectorizedSemanticSplitter"
+
+    def _windows(self, sentences: List[str]) -> List[str]:
+        return [
+            "".join(sentences[max(0, i - self.buffer_size):i + 1 + self.buffer_size])
+            for i in range(len(sentences))
+        ]
+
+    def _breakpoints(self, embeddings: np.ndarray) -> np.ndarray:
+        """Indices ``i`` such that a chunk ends after sentence ``i``."""
+        if len(embeddings) < 2:
+            return np.empty(0, dtype=np.int64)
+        norms = np.linalg.norm(embeddings, axis=1)
+        similarities = np.einsum("ij,ij->i", embeddings[:-1], embeddings[1:]) / np.maximum(
+            norms[:-1] * norms[1:], 1e-12
+        )
+        distances = 1 - similarities
+        threshold = np.percentile(distances, self.breakpoint_percentile_threshold)
+        return np.flatnonzero(distances > threshold)
+
+    def _apply_size_limits(self, groups: List[List[str]]) -> List[List[str]]:
+        if self.max_chunk_chars:
+            limited = []
+            for group in groups:
+                current: List[str] = []
+                length = 0
+                for sentence in group:
+                    if current and length + len(sentence) > self.max_chunk_chars:
+                        limited.append(current)
+                        current, length = [], 0
+                    current.append(sentence)
+                    length += len(sentence)
+                limited.append(current)
+            groups = limited
+
+        if self.min_chunk_chars:
+            merged: List[List[str]] = []
+            for group in groups:
+                if merged and sum(len(s) for s in merged[-1]) < self.min_chunk_chars:
+                    merged[-1] = merged[-1] + group
+                else:
+                    merged.append(group)
+            if len(merged) > 1 and sum(len(s) for s in merged[-1]) < self.min_chunk_chars:
+                last = merged.pop()
+                merged[-1] = merged[-1] + last
+            groups = merged
+        return groups
+
+    def _chunks(self, sentences: List[str], embeddings: np.ndarray) -> List[str]:
+        if len(sentences) < 2:
+            return [" ".join(sentences)]
+        groups = []
+        start = 0
+        for index in self._breakpoints(embeddings):
+            groups.append(sentences[start:index + 1])
+            start = index + 1
+        if start < len(sentences):
+            groups.append(sentences[start:])
+        return ["".join(group) for group in self._apply_size_limits(groups)]
+
+    def _parse_nodes(
+        self,
+        nodes: Sequence[BaseNode],
+        show_progress: bool = False,
+        **kwargs: Any,
+    ) -> List[BaseNode]:
+        splits = [self.sentence_splitter(node.text) for node in nodes]
+        windows = [window for sentences in splits for window in self._windows(sentences)]
+
+        # One forward-pass batch for every window of every document
+        embeddings = np.asarray(
+            self.embed_model.get_text_embedding_batch(windows, show_progress=show_progress) if windows else [],
+            dtype=np.float32,
+        )
+
+        all_nodes: List[BaseNode] = []
+        offset = 0
+        for node, sentences in zip(nodes, splits):
+            document_embeddings = embeddings[offset:offset + len(sentences)]
+            offset += len(sentences)
+            chunks = self._chunks(sentences, document_embeddings)
+            all_nodes.extend(build_nodes_from_splits(chunks, node, id_func=self.id_func))
+        return all_nodes